@@ -0,0 +1,310 @@
+"""
+Streaming analysis of checkers positions on every core.
+
+Positions are read one at a time from a file or stdin, analyzed on a process
+pool and written as JSON lines in input order. At most a fixed window of
+positions is in flight, so memory stays bounded however long the input is.
+Each analysis lists the legal moves of the player to move and the best move
+and score of a fixed-depth search; scores are from the point of view of
+the player to move.
+
+Input is one of:
+    json  JSON lines, each with a "snapshot" (the fields of
+          checkers.Snapshot, as a list or an object) or the "moves" played
+          from the start as named in notation.py, such as
+          ["3b-4a", "6c-5b"], with an optional "filled_rows" and an "id"
+          copied to the output
+    ckr   a binary game archive written by record.py
+    pdn   PDN games, as read by record.read_pdn
+Games are analyzed in their final position, or in every position with
+--each-ply.
+
+    python analyze.py games.ckr --format ckr --depth 6 --each-ply
+    python analyze.py < positions.jsonl > analysis.jsonl
+"""
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import json
+import math
+import os
+import sys
+
+from checkers import Game, Player, Snapshot, check_snapshot
+from engine import Searcher
+from notation import format_move, parse_move
+from record import (UNFINISHED, GameRecord, decode, parse_pdn,
+                    read_record_data, replay, split_pdn)
+from transposition import TranspositionTable
+
+FORMATS = ('json', 'ckr', 'pdn')
+
+# Largest number of filled rows accepted, as in the server, since a board
+# takes memory and time quadratic in its size
+MAX_ROWS = 50
+
+# Options of the analysis in a worker process
+_options = None
+# The transposition table each worker reuses, cleared for every position
+_table = None
+
+
+def _init_worker(options):
+    """
+    Stores the analysis options in a worker process.
+    """
+    global _options, _table
+    _options = options
+    _table = TranspositionTable()
+
+
+def analyze(game, depth, time_limit=math.inf, table=None):
+    """
+    Returns the analysis of the position of a game.
+
+    Parameters:
+        game (Game): The game being analyzed, restored before returning
+        depth (int): The depth of the search
+        time_limit (float): The wall-clock budget of the search in seconds
+        table (TranspositionTable): A table to clear and reuse, a new one
+        by default
+
+    Returns:
+        dict: The board size, player to move (1 or 2), legal moves, best
+        move, score, depth reached, nodes and seconds of the search
+    """
+    if table is not None:
+        table.clear()
+    moves = game.get_legal_moves(game.current_player)
+    result = Searcher(table).search(game, time_limit, depth)
+    return {
+        'filled_rows': game.board.filled_rows,
+        'to_move': 1 if game.current_player is game.player1 else 2,
+        'moves': [format_move(move) for move in moves],
+        'best': format_move(result.move) if result.move else None,
+        'score': result.score,
+        'depth': result.depth,
+        'nodes': result.nodes,
+        'seconds': result.seconds,
+    }
+
+
+def _check_rows(filled_rows, max_rows):
+    """
+    Raises ValueError unless a board size is between 1 and max_rows.
+    """
+    if not isinstance(filled_rows, int) or not 1 <= filled_rows <= max_rows:
+        raise ValueError(f'filled_rows must be 1 to {max_rows}, not '
+                         f'{filled_rows!r}')
+
+
+def _json_record(line, max_rows=MAX_ROWS):
+    """
+    Returns the game of a JSON input line and its id.
+
+    Parameters:
+        line (str): A JSON object with a snapshot or moves
+        max_rows (int): The largest number of filled rows accepted
+
+    Returns:
+        (Game, object): The game in the position of the line and its id
+
+    Raises:
+        ValueError: If the line does not describe a legal position
+    """
+    data = json.loads(line)
+    if not isinstance(data, dict):
+        raise ValueError('expected a JSON object')
+    if 'snapshot' in data:
+        fields = data['snapshot']
+        if isinstance(fields, dict):
+            snapshot = Snapshot(**fields)
+        else:
+            snapshot = Snapshot(*fields)
+        _check_rows(snapshot.filled_rows, max_rows)
+        check_snapshot(snapshot)
+        game = Game.from_snapshot(snapshot, bitboard=True)
+    else:
+        filled_rows = data.get('filled_rows', 3)
+        _check_rows(filled_rows, max_rows)
+        moves = data.get('moves', [])
+        if not isinstance(moves, list) \
+                or not all(isinstance(move, str) for move in moves):
+            raise ValueError('moves must be a list of move names')
+        paths = [parse_move(move) for move in moves]
+        game = replay(GameRecord(filled_rows, ('Player 1', 'red'),
+                                 ('Player 2', 'white'), UNFINISHED, paths),
+                      bitboard=True)
+    return game, data.get('id')
+
+
+def _record_positions(record, each_ply):
+    """
+    Yields the positions of a game record to analyze.
+
+    Parameters:
+        record (GameRecord): The game
+        each_ply (bool): Whether every position is analyzed, or only the
+        final one
+
+    Yields:
+        (int, Game): The number of moves played and the game in that
+        position
+    """
+    if not each_ply:
+        yield len(record.moves), replay(record, bitboard=True)
+        return
+    game = Game(Player(*record.player1), Player(*record.player2),
+                record.filled_rows, bitboard=True)
+    for ply, path in enumerate(record.moves):
+        yield ply, game
+        for move in game.get_legal_moves(game.current_player):
+            if move.path == path:
+                break
+        else:
+            raise ValueError(f'Illegal move {ply + 1}: {path}')
+        game.push(move)
+    yield len(record.moves), game
+
+
+def _analyze_task(task):
+    """
+    Analyzes one input in a worker process.
+
+    Parameters:
+        task ((int, str, object)): The input number, its format and what
+        read_inputs yielded for it
+
+    Returns:
+        [dict]: The analysis of each position of the input, or its error
+    """
+    index, kind, item = task
+    depth, time_limit, each_ply, max_rows = _options
+    rv = []
+    try:
+        if isinstance(item, Exception):
+            raise item
+        if kind == 'json':
+            game, id_ = _json_record(item, max_rows)
+            analysis = {'index': index}
+            if id_ is not None:
+                analysis['id'] = id_
+            analysis.update(analyze(game, depth, time_limit, _table))
+            rv.append(analysis)
+        else:
+            record = decode(item) if kind == 'ckr' else parse_pdn(item)
+            _check_rows(record.filled_rows, max_rows)
+            for ply, game in _record_positions(record, each_ply):
+                analysis = {'index': index, 'ply': ply}
+                analysis.update(analyze(game, depth, time_limit, _table))
+                rv.append(analysis)
+    except Exception as error:
+        # A bad input, however it fails, only costs its own output line
+        rv.append({'index': index,
+                   'error': str(error) or type(error).__name__})
+    return rv
+
+
+def read_inputs(stream, kind):
+    """
+    Yields the inputs of a stream one at a time, unparsed, so that the
+    workers parse them and a bad input only costs its own error line.
+
+    Parameters:
+        stream: A binary file for ckr, a text file otherwise
+        kind (str): One of FORMATS
+
+    Yields:
+        str, bytes or ValueError: Each non-blank JSON line, the text of each
+        PDN game or the bytes of each archived game, and finally the error
+        of an archive that cannot be read to its end
+    """
+    if kind == 'ckr':
+        try:
+            yield from read_record_data(stream)
+        except ValueError as error:
+            yield error
+    elif kind == 'pdn':
+        yield from split_pdn(stream)
+    else:
+        for line in stream:
+            if line.strip():
+                yield line
+
+
+def analyze_stream(inputs, kind, depth=6, time_limit=math.inf,
+                   each_ply=False, workers=None, window=None,
+                   max_rows=MAX_ROWS):
+    """
+    Analyzes inputs on a process pool, keeping at most window inputs in
+    flight.
+
+    Parameters:
+        inputs: An iterable of inputs, as yielded by read_inputs
+        kind (str): The format of the inputs, one of FORMATS
+        depth (int): The depth of every search
+        time_limit (float): The wall-clock budget of every search
+        each_ply (bool): Whether every position of a game is analyzed
+        workers (int): The number of processes, one per core by default
+        window (int): The number of inputs in flight, 4 per worker by
+        default
+        max_rows (int): The largest number of filled rows accepted; larger
+        boards are reported as errors
+
+    Yields:
+        dict: The analysis of each position, in input order
+    """
+    workers = workers or os.cpu_count() or 1
+    window = window or 4 * workers
+    pending = deque()
+    with ProcessPoolExecutor(workers, initializer=_init_worker,
+                             initargs=((depth, time_limit, each_ply,
+                                        max_rows),)) \
+            as executor:
+        for index, item in enumerate(inputs):
+            if len(pending) >= window:
+                yield from pending.popleft().result()
+            pending.append(executor.submit(_analyze_task,
+                                           (index, kind, item)))
+        while pending:
+            yield from pending.popleft().result()
+
+
+def main():
+    """
+    Streams the analysis of every input position as JSON lines.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('input', nargs='?', default='-',
+                        help="file to read, '-' for stdin")
+    parser.add_argument('--format', choices=FORMATS, default='json')
+    parser.add_argument('--depth', type=int, default=6)
+    parser.add_argument('--time-limit', type=float, default=math.inf,
+                        help='seconds per search, unlimited by default')
+    parser.add_argument('--each-ply', action='store_true',
+                        help='analyze every position of each game')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--window', type=int, default=None,
+                        help='inputs in flight, 4 per worker by default')
+    parser.add_argument('--max-rows', type=int, default=MAX_ROWS,
+                        help='largest filled_rows accepted')
+    args = parser.parse_args()
+    binary = args.format == 'ckr'
+    if args.input == '-':
+        stream = sys.stdin.buffer if binary else sys.stdin
+    else:
+        stream = open(args.input, 'rb' if binary else 'r')
+    try:
+        for analysis in analyze_stream(read_inputs(stream, args.format),
+                                       args.format, args.depth,
+                                       args.time_limit, args.each_ply,
+                                       args.workers, args.window,
+                                       args.max_rows):
+            print(json.dumps(analysis), flush=True)
+    finally:
+        if stream not in (sys.stdin, sys.stdin.buffer):
+            stream.close()
+
+
+if __name__ == '__main__':
+    main()
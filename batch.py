@@ -0,0 +1,335 @@
+"""
+Vectorized move generation over many checkers boards at once.
+
+A BoardBatch holds N independent positions as an (N, L, L) int8 array:
+0 for an empty square, 1 for a man and 2 for a king, positive for the
+player moving down the board (player1 in Game) and negative for the player
+moving up. Steps, first jumps and promotions are found for every board in
+one NumPy pass per direction; capture chains are then extended for every
+board together, one jump level at a time. The moves agree with
+Game.get_legal_moves on the same position.
+"""
+import numpy as np
+
+from bitboard import DIRECTIONS
+from checkers import Move
+
+EMPTY = 0
+MAN = 1
+KING = 2
+# Padding around the board so neighbours two squares away can be indexed
+PAD = 2
+
+
+class BoardBatch:
+    """
+    A class that represents many checkers positions stepped in lockstep.
+    """
+    def __init__(self, cells, side):
+        """
+        Initializes a batch from its arrays.
+
+        Parameters:
+            cells (numpy.ndarray): The (N, L, L) int8 pieces of every board
+            side (numpy.ndarray): The (N,) int8 player to move of every
+            board, 1 for the player moving down and -1 otherwise
+        """
+        self.cells = np.asarray(cells, dtype=np.int8)
+        self.side = np.asarray(side, dtype=np.int8)
+        self.length = self.cells.shape[1]
+
+    @classmethod
+    def initial(cls, count, filled_rows=3):
+        """
+        Creates a batch of starting positions.
+
+        Parameters:
+            count (int): The number of boards
+            filled_rows (int): The number of rows with pieces for each player
+
+        Returns:
+            BoardBatch: The batch with the first player to move everywhere
+        """
+        length = 2 * filled_rows + 2
+        rows, cols = np.indices((length, length))
+        dark = rows % 2 != cols % 2
+        board = np.zeros((length, length), dtype=np.int8)
+        board[dark & (rows < filled_rows)] = MAN
+        board[dark & (rows > filled_rows + 1)] = -MAN
+        cells = np.repeat(board[None], count, axis=0)
+        return cls(cells, np.ones(count, dtype=np.int8))
+
+    @classmethod
+    def from_games(cls, games):
+        """
+        Creates a batch from the positions of games of the same board size.
+
+        Parameters:
+            games ([Game]): The games being copied
+
+        Returns:
+            BoardBatch: The batch with each game's player to move
+        """
+        length = games[0].board.length
+        cells = np.zeros((len(games), length, length), dtype=np.int8)
+        side = np.ones(len(games), dtype=np.int8)
+        for i, game in enumerate(games):
+            for row, pieces in enumerate(game.board.squares):
+                for col, piece in enumerate(pieces):
+                    if piece is not None:
+                        value = KING if piece.is_king else MAN
+                        if piece.color != game.player1.color:
+                            value = -value
+                        cells[i, row, col] = value
+            if game.current_player is game.player2:
+                side[i] = -1
+        return cls(cells, side)
+
+    def __len__(self):
+        """
+        Returns the number of boards.
+        """
+        return len(self.cells)
+
+    def _masks(self):
+        """
+        Returns padded masks of the squares that are empty, hold a piece of
+        the player to move, or hold a piece of the opponent. Squares off the
+        board are in none of them.
+
+        Parameters: None
+
+        Returns:
+            (numpy.ndarray, numpy.ndarray, numpy.ndarray): The empty, own and
+            enemy masks, each (N, L + 4, L + 4)
+        """
+        signed = self.cells * self.side[:, None, None]
+        width = ((0, 0), (PAD, PAD), (PAD, PAD))
+        empty = np.pad(self.cells == EMPTY, width)
+        own = np.pad(signed > 0, width)
+        enemy = np.pad(signed < 0, width)
+        return empty, own, enemy
+
+    def _allowed(self, d_row):
+        """
+        Returns the mask of pieces of the player to move that may move in a
+        row direction: kings, and men moving forward.
+
+        Parameters:
+            d_row (int): The row direction, 1 or -1
+
+        Returns:
+            numpy.ndarray: The (N, L, L) boolean mask
+        """
+        signed = self.cells * self.side[:, None, None]
+        forward = (self.side == d_row)[:, None, None]
+        return (signed == KING) | ((signed == MAN) & forward)
+
+    def _window(self, padded, d_row, d_col, distance):
+        """
+        Returns the padded mask shifted so each square sees its neighbour a
+        number of steps along a diagonal.
+        """
+        row = PAD + distance * d_row
+        col = PAD + distance * d_col
+        return padded[:, row:row + self.length, col:col + self.length]
+
+    def mobility(self):
+        """
+        Returns which boards' player to move has a step or a capture.
+
+        Parameters: None
+
+        Returns:
+            numpy.ndarray: The (N,) boolean mask of boards with a legal move
+        """
+        empty, _, enemy = self._masks()
+        rv = np.zeros(len(self), dtype=bool)
+        for d_row, d_col in DIRECTIONS:
+            allowed = self._allowed(d_row)
+            step = allowed & self._window(empty, d_row, d_col, 1)
+            jump = allowed & self._window(enemy, d_row, d_col, 1) \
+                & self._window(empty, d_row, d_col, 2)
+            rv |= (step | jump).any(axis=(1, 2))
+        return rv
+
+    def winners(self):
+        """
+        Returns the winner of every board by the rule of Game.get_winner: the
+        first player loses when it has no legal move, whoever is to move,
+        and otherwise the second player loses when it has none.
+
+        Parameters: None
+
+        Returns:
+            numpy.ndarray: The (N,) int8 winner of each board, 1 for the
+            first player, -1 for the second and 0 while the game goes on
+        """
+        mobile = self.mobility()
+        waiting = BoardBatch(self.cells, -self.side).mobility()
+        first = np.where(self.side == 1, mobile, waiting)
+        second = np.where(self.side == 1, waiting, mobile)
+        return np.where(first, np.where(second, 0, 1), -1).astype(np.int8)
+
+    def legal_moves(self):
+        """
+        Returns the moves of the player to move on every board, including
+        each jump of a capture chain.
+
+        Parameters: None
+
+        Returns:
+            [[Move]]: The moves of each board
+        """
+        moves = [[] for _ in range(len(self))]
+        empty, own, enemy = self._masks()
+        last_row = self.length - 1
+        # Steps of every piece in every direction in one pass
+        for d_row, d_col in DIRECTIONS:
+            step = self._allowed(d_row) & self._window(empty, d_row, d_col, 1)
+            boards, rows, cols = np.nonzero(step)
+            kings = np.abs(self.cells[boards, rows, cols]) == KING
+            for b, r, c, king in zip(boards.tolist(), rows.tolist(),
+                                     cols.tolist(), kings.tolist()):
+                end = (r + d_row, c + d_col)
+                moves[b].append(Move(((r, c), end), (),
+                                     not king and end[0] in (0, last_row)))
+        self._capture_chains(moves, empty, own, enemy)
+        return moves
+
+    def _capture_chains(self, moves, empty, own, enemy):
+        """
+        Appends every capture chain of every board, extending all chains of
+        all boards by one jump per iteration.
+
+        Parameters:
+            moves ([[Move]]): The moves of each board, appended to
+            empty (numpy.ndarray): The padded mask of empty squares
+            own (numpy.ndarray): The padded mask of pieces of the player to
+            move
+            enemy (numpy.ndarray): The padded mask of opposing pieces
+
+        Returns: None
+        """
+        last_row = self.length - 1
+        size = self.length + 2 * PAD
+        boards, rows, cols = np.nonzero(own[:, PAD:-PAD, PAD:-PAD])
+        kings = np.abs(self.cells[boards, rows, cols]) == KING
+        origin_rows, origin_cols = rows.copy(), cols.copy()
+        captured = np.zeros((len(boards), size, size), dtype=bool)
+        # Path and captured squares of every chain in the frontier
+        chains = [(((r, c),), ()) for r, c in zip(rows.tolist(),
+                                                   cols.tolist())]
+        while len(boards):
+            next_frontier = []
+            for d_row, d_col in DIRECTIONS:
+                mid_rows, mid_cols = rows + d_row, cols + d_col
+                end_rows, end_cols = rows + 2 * d_row, cols + 2 * d_col
+                ok = kings | (self.side[boards] == d_row)
+                ok &= enemy[boards, mid_rows + PAD, mid_cols + PAD]
+                ok &= ~captured[np.arange(len(boards)), mid_rows + PAD,
+                                mid_cols + PAD]
+                # The moving piece no longer blocks its own starting square
+                ok &= empty[boards, end_rows + PAD, end_cols + PAD] \
+                    | ((end_rows == origin_rows) & (end_cols == origin_cols))
+                chosen = np.nonzero(ok)[0]
+                if not len(chosen):
+                    continue
+                promotion = ~kings[chosen] & ((end_rows[chosen] == 0)
+                                              | (end_rows[chosen] == last_row))
+                new_captured = captured[chosen]
+                new_captured[np.arange(len(chosen)), mid_rows[chosen] + PAD,
+                             mid_cols[chosen] + PAD] = True
+                new_chains = []
+                for i, k in enumerate(chosen.tolist()):
+                    path, taken = chains[k]
+                    end = (int(end_rows[k]), int(end_cols[k]))
+                    mid = (int(mid_rows[k]), int(mid_cols[k]))
+                    chain = (path + (end,), taken + (mid,))
+                    new_chains.append(chain)
+                    moves[int(boards[k])].append(
+                        Move(chain[0], chain[1], bool(promotion[i])))
+                # A man reaching the last row is crowned and stops
+                keep = ~promotion
+                next_frontier.append((
+                    boards[chosen][keep], end_rows[chosen][keep],
+                    end_cols[chosen][keep], kings[chosen][keep],
+                    origin_rows[chosen][keep], origin_cols[chosen][keep],
+                    new_captured[keep],
+                    [chain for chain, k in zip(new_chains, keep) if k]))
+            if not next_frontier:
+                break
+            boards = np.concatenate([f[0] for f in next_frontier])
+            rows = np.concatenate([f[1] for f in next_frontier])
+            cols = np.concatenate([f[2] for f in next_frontier])
+            kings = np.concatenate([f[3] for f in next_frontier])
+            origin_rows = np.concatenate([f[4] for f in next_frontier])
+            origin_cols = np.concatenate([f[5] for f in next_frontier])
+            captured = np.concatenate([f[6] for f in next_frontier])
+            chains = [chain for f in next_frontier for chain in f[7]]
+
+    def apply(self, moves):
+        """
+        Makes one move on every board at once and passes the turn there.
+
+        Parameters:
+            moves ([Move]): One move per board, or None to leave a board
+            unchanged
+
+        Returns: None
+        """
+        boards = [i for i, move in enumerate(moves) if move is not None]
+        if not boards:
+            return
+        starts = np.array([moves[i].path[0] for i in boards])
+        ends = np.array([moves[i].path[-1] for i in boards])
+        captured = [(i, square) for i in boards
+                    for square in moves[i].captured]
+        boards = np.array(boards)
+        pieces = self.cells[boards, starts[:, 0], starts[:, 1]]
+        self.cells[boards, starts[:, 0], starts[:, 1]] = EMPTY
+        if captured:
+            taken = np.array([square for _, square in captured])
+            self.cells[[i for i, _ in captured], taken[:, 0],
+                       taken[:, 1]] = EMPTY
+        promote = (np.abs(pieces) == MAN) & ((ends[:, 0] == 0)
+                                             | (ends[:, 0] == self.length - 1))
+        pieces = np.where(promote, pieces * KING, pieces).astype(np.int8)
+        self.cells[boards, ends[:, 0], ends[:, 1]] = pieces
+        self.side[boards] *= -1
+
+
+def play_random(count, filled_rows=3, max_moves=200, seed=None):
+    """
+    Plays many random games in lockstep.
+
+    Parameters:
+        count (int): The number of games
+        filled_rows (int): The number of rows with pieces for each player
+        max_moves (int): The number of moves after which a game is drawn
+        seed (int): The seed of the random generator
+
+    Returns:
+        (numpy.ndarray, numpy.ndarray): The winner of each game (1 for the
+        first player, -1 for the second, 0 for a draw) and its length, with
+        games ended as in simulate.play_game
+    """
+    rng = np.random.default_rng(seed)
+    batch = BoardBatch.initial(count, filled_rows)
+    winners = np.zeros(count, dtype=np.int8)
+    lengths = np.zeros(count, dtype=np.int32)
+    active = np.ones(count, dtype=bool)
+    for _ in range(max_moves):
+        result = batch.winners()
+        ended = active & (result != 0)
+        winners[ended] = result[ended]
+        active &= ~ended
+        if not active.any():
+            break
+        chosen = [None] * count
+        for i, moves in enumerate(batch.legal_moves()):
+            if active[i]:
+                chosen[i] = moves[rng.integers(len(moves))]
+        batch.apply(chosen)
+        lengths[active] += 1
+    return winners, lengths
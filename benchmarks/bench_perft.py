@@ -0,0 +1,18 @@
+"""
+Perft throughput benchmarks, checked against the reference leaf counts.
+"""
+import pytest
+
+from perft import REFERENCE, new_game, perft
+
+DEPTH = 4
+
+
+@pytest.mark.parametrize('backend', ('grid', 'bitboard'))
+@pytest.mark.parametrize('filled_rows', (2, 3))
+def bench_perft(bench, backend, filled_rows):
+    game = new_game(filled_rows, backend == 'bitboard')
+
+    def run(_):
+        assert perft(game, DEPTH) == REFERENCE[filled_rows][DEPTH]
+    bench(run, operations=REFERENCE[filled_rows][DEPTH])
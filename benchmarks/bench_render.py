@@ -0,0 +1,37 @@
+"""
+Terminal rendering benchmarks: whole frames, and diff frames after one move.
+"""
+import io
+
+import pytest
+
+from positions import middlegame
+from render import BoardRenderer
+
+sizes = pytest.mark.parametrize('filled_rows', (3, 10, 20))
+
+
+@sizes
+def bench_render_frame(bench, filled_rows):
+    renderer = BoardRenderer(middlegame(filled_rows), io.StringIO())
+
+    def run(_):
+        renderer.draw()
+    bench(run)
+
+
+@sizes
+def bench_render_diff(bench, filled_rows):
+    game = middlegame(filled_rows)
+    renderer = BoardRenderer(game, io.StringIO(), diff=True)
+    move = game.get_legal_moves(game.current_player)[0]
+
+    def setup():
+        renderer.invalidate()
+        renderer.draw()
+        game.push(move)
+
+    def run(_):
+        renderer.draw()
+        game.pop()
+    bench(run, setup)
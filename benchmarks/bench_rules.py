@@ -0,0 +1,119 @@
+"""
+Benchmarks of the hot paths of checkers.Game.
+"""
+import copy
+
+import pytest
+
+from checkers import Game
+from positions import SCENARIOS
+
+SIZES = (2, 3, 5)
+BACKENDS = ('grid', 'bitboard')
+# Times each per-piece benchmark walks over the pieces in one round
+REPEAT = 20
+# Games copied for each benchmark that changes the game
+COPIES = 50
+
+positions = pytest.mark.parametrize('filled_rows', SIZES)
+scenarios = pytest.mark.parametrize('scenario', sorted(SCENARIOS))
+backends = pytest.mark.parametrize('backend', BACKENDS)
+
+
+def position(backend, scenario, filled_rows):
+    return SCENARIOS[scenario](filled_rows, backend == 'bitboard')
+
+
+@backends
+@scenarios
+@positions
+def bench_all_moves(bench, backend, scenario, filled_rows):
+    game = position(backend, scenario, filled_rows)
+    pieces = list(game.current_player.pieces)
+
+    def run(_):
+        for _ in range(REPEAT):
+            for piece in pieces:
+                game.all_moves(piece)
+    bench(run, operations=REPEAT * len(pieces))
+
+
+@backends
+@scenarios
+@positions
+def bench_get_all_moves(bench, backend, scenario, filled_rows):
+    game = position(backend, scenario, filled_rows)
+
+    def run(_):
+        for _ in range(REPEAT):
+            game.get_all_moves(game.current_player)
+    bench(run, operations=REPEAT)
+
+
+@backends
+@scenarios
+@positions
+def bench_is_capture_possible(bench, backend, scenario, filled_rows):
+    game = position(backend, scenario, filled_rows)
+    checks = [(piece.position, end, piece.is_king)
+              for piece in game.current_player.pieces
+              for end in game.all_moves(piece)]
+
+    def run(_):
+        for _ in range(REPEAT):
+            for start, end, is_king in checks:
+                game.is_capture_possible(start, end, is_king)
+    bench(run, operations=REPEAT * max(1, len(checks)))
+
+
+@backends
+@scenarios
+@positions
+def bench_make_move(bench, backend, scenario, filled_rows):
+    game = position(backend, scenario, filled_rows)
+    move = game.get_legal_moves(game.current_player)[0]
+    row, col = move.path[0]
+
+    def run(games):
+        for copied in games:
+            copied.make_move(copied.board.squares[row][col], move.path[-1])
+    bench(run, lambda: [copy.deepcopy(game) for _ in range(COPIES)],
+          operations=COPIES)
+
+
+@backends
+@scenarios
+@positions
+def bench_get_winner(bench, backend, scenario, filled_rows):
+    game = position(backend, scenario, filled_rows)
+
+    def run(games):
+        for copied in games:
+            copied.get_winner()
+    bench(run, lambda: [copy.deepcopy(game) for _ in range(COPIES)],
+          operations=COPIES)
+
+
+@backends
+@scenarios
+@positions
+def bench_snapshot_round_trip(bench, backend, scenario, filled_rows):
+    game = position(backend, scenario, filled_rows)
+    options = {'bitboard': backend == 'bitboard'}
+
+    def run(_):
+        for _ in range(COPIES):
+            Game.from_snapshot(game.snapshot(), **options)
+    bench(run, operations=COPIES)
+
+
+@backends
+@scenarios
+@positions
+def bench_clone(bench, backend, scenario, filled_rows):
+    game = position(backend, scenario, filled_rows)
+
+    def run(_):
+        for _ in range(COPIES):
+            game.clone()
+    bench(run, operations=COPIES)
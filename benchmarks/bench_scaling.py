@@ -0,0 +1,39 @@
+"""
+Scaling of move generation with board size, for the dense grid and the
+sparse board. Every position has the same six kings, so only the board area
+changes between sizes.
+"""
+import pytest
+
+from positions import king_endgame
+
+SIZES = (3, 10, 20, 35, 50)
+REPEAT = 20
+
+sizes = pytest.mark.parametrize('filled_rows', SIZES)
+layouts = pytest.mark.parametrize('layout', ('dense', 'sparse'))
+
+
+@layouts
+@sizes
+def bench_scaling_get_all_moves(bench, layout, filled_rows):
+    game = king_endgame(filled_rows, sparse=layout == 'sparse')
+
+    def run(_):
+        for _ in range(REPEAT):
+            game.get_all_moves(game.current_player)
+    bench(run, operations=REPEAT)
+
+
+@layouts
+@sizes
+def bench_scaling_push_pop(bench, layout, filled_rows):
+    game = king_endgame(filled_rows, sparse=layout == 'sparse')
+    moves = game.get_legal_moves(game.current_player)
+
+    def run(_):
+        for _ in range(REPEAT):
+            for move in moves:
+                game.push(move)
+                game.pop()
+    bench(run, operations=REPEAT * len(moves))
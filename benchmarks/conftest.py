@@ -0,0 +1,198 @@
+"""
+Timing, JSON output and baseline comparison for the benchmark suite.
+
+Run from the repository root with:
+
+    python -m pytest benchmarks
+
+Each benchmark's best round is divided by the time of a fixed calibration
+workload measured just before it, so results from different machines, and
+from the same machine under different load, can be compared. A benchmark
+fails when its calibrated time exceeds the saved baseline by more than the
+tolerance. Pass --bench-save-baseline to add the current results to the
+baseline: the baseline keeps the calibrated times of the last BASELINE_RUNS
+saved sessions and compares against their median, so one unusually fast or
+slow session does not set the bar.
+
+Rounds run with the garbage collector off, as in timeit. Quick benchmarks
+without a setup are repeated within each round, and every benchmark runs
+extra rounds until it has been timed for at least MIN_TIMED seconds, or
+for MAX_EXTRA seconds of rounds and setup, so sub-millisecond cases do not
+fail on timer and scheduler noise.
+"""
+import gc
+import json
+import os
+import platform
+import statistics
+import time
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Shortest round, in seconds, of a benchmark without setup
+MIN_ROUND = 0.02
+# Shortest total time, in seconds, over the rounds of a benchmark
+MIN_TIMED = 0.1
+# Longest time, in seconds, spent on extra rounds to reach MIN_TIMED,
+# counting their setup
+MAX_EXTRA = 1.0
+# Saved sessions whose median calibrated time is a benchmark's baseline
+BASELINE_RUNS = 5
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('benchmarks')
+    group.addoption('--bench-json', default=os.path.join(HERE, 'results.json'),
+                    help='file the results are written to as JSON')
+    group.addoption('--bench-baseline',
+                    default=os.path.join(HERE, 'baseline.json'),
+                    help='saved results to compare against')
+    group.addoption('--bench-save-baseline', action='store_true',
+                    help='add these results to the baseline')
+    group.addoption('--bench-tolerance', type=float, default=2.0,
+                    help='allowed slowdown factor before a benchmark fails')
+    group.addoption('--bench-rounds', type=int, default=5,
+                    help='rounds per benchmark, the fastest is kept')
+
+
+def _calibrate(rounds=5):
+    """
+    Returns the best time of a fixed pure-Python workload.
+    """
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        squares = {}
+        for i in range(100000):
+            squares[(i % 8, i % 7)] = i * 3 // 2
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+class Recorder:
+    """
+    A class that times benchmarks and compares them with a baseline.
+    """
+    def __init__(self, config):
+        self.config = config
+        self.results = {}
+        self.baseline = {}
+        path = config.getoption('bench_baseline')
+        if os.path.exists(path):
+            with open(path) as f:
+                self.baseline = json.load(f)['results']
+
+    def measure(self, name, run, setup=None, operations=1):
+        """
+        Times a benchmark and fails it if it regressed against the baseline.
+
+        Parameters:
+            name (str): The name the result is stored under
+            run (callable): The code being timed, called with the value
+            returned by setup
+            setup (callable): Untimed preparation run before every round
+            operations (int): The number of operations run performs
+
+        Returns: None
+        """
+        calibration = _calibrate(3)
+        # Repeats quick benchmarks within a round so timer noise stays small
+        number = 1
+        if setup is None:
+            start = time.perf_counter()
+            run(None)
+            once = time.perf_counter() - start
+            number = max(1, int(MIN_ROUND / once) if once else 1)
+        rounds = self.config.getoption('bench_rounds')
+        best = float('inf')
+        timed = 0.0
+        done = 0
+        began = time.perf_counter()
+        while done < rounds or (timed < MIN_TIMED and
+                                time.perf_counter() - began < MAX_EXTRA):
+            state = setup() if setup is not None else None
+            enabled = gc.isenabled()
+            gc.disable()
+            try:
+                start = time.perf_counter()
+                for _ in range(number):
+                    run(state)
+                seconds = time.perf_counter() - start
+            finally:
+                if enabled:
+                    gc.enable()
+            best = min(best, seconds / number)
+            timed += seconds
+            done += 1
+        result = {
+            'seconds': best,
+            'per_operation': best / operations,
+            'operations': operations,
+            'calibration': calibration,
+            'relative': best / calibration,
+        }
+        self.results[name] = result
+        saved = self.baseline.get(name)
+        if saved is None or self.config.getoption('bench_save_baseline'):
+            return
+        limit = saved['relative'] * self.config.getoption('bench_tolerance')
+        if result['relative'] > limit:
+            pytest.fail(f'{name} regressed: {result["relative"]:.3f} '
+                        f'calibrated units against a baseline of '
+                        f'{saved["relative"]:.3f}')
+
+    def report(self):
+        """
+        Returns the results of the session as a JSON-ready dict.
+        """
+        return {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'results': self.results,
+        }
+
+    def merged_baseline(self):
+        """
+        Returns the baseline with this session's results added, each
+        benchmark keeping the calibrated times of its last BASELINE_RUNS
+        sessions and their median as its relative time. Benchmarks not run
+        this session keep their saved baseline.
+        """
+        results = dict(self.baseline)
+        for name, result in self.results.items():
+            runs = self.baseline.get(name, {}).get('runs', [])
+            runs = runs[-(BASELINE_RUNS - 1):] + [result['relative']]
+            results[name] = dict(result, relative=statistics.median(runs),
+                                 runs=runs)
+        return dict(self.report(), results=results)
+
+
+@pytest.fixture(scope='session')
+def recorder(request):
+    recorder = Recorder(request.config)
+    request.config._bench_recorder = recorder
+    return recorder
+
+
+@pytest.fixture
+def bench(recorder, request):
+    """
+    Times a benchmark under the name of the requesting test.
+    """
+    def measure(run, setup=None, operations=1):
+        recorder.measure(request.node.name, run, setup, operations)
+    return measure
+
+
+def pytest_sessionfinish(session):
+    recorder = getattr(session.config, '_bench_recorder', None)
+    if recorder is None or not recorder.results:
+        return
+    report = recorder.report()
+    with open(session.config.getoption('bench_json'), 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    if session.config.getoption('bench_save_baseline'):
+        with open(session.config.getoption('bench_baseline'), 'w') as f:
+            json.dump(recorder.merged_baseline(), f, indent=2,
+                      sort_keys=True)
@@ -0,0 +1,87 @@
+"""
+Reproducible positions for the rules engine benchmarks.
+"""
+import random
+
+from checkers import Game, Piece, Player
+
+
+def new_game(filled_rows, bitboard=False, sparse=False):
+    """
+    Returns a game in its starting position.
+
+    Parameters:
+        filled_rows (int): The number of rows with pieces for each player
+        bitboard (bool): Whether the game runs on the bitboard core
+        sparse (bool): Whether the board only stores occupied squares
+
+    Returns:
+        Game: The new game
+    """
+    return Game(Player('Player 1', 'red'), Player('Player 2', 'white'),
+                filled_rows, bitboard, sparse)
+
+
+def opening(filled_rows, bitboard=False):
+    """
+    Returns the starting position.
+    """
+    return new_game(filled_rows, bitboard)
+
+
+def middlegame(filled_rows, bitboard=False, seed=0):
+    """
+    Returns the first position of a seeded random game, after both sides have
+    developed, in which the player to move has several captures.
+    """
+    rng = random.Random(seed)
+    game = new_game(filled_rows, bitboard)
+    best, best_captures = 0, -1
+    history = []
+    for ply in range(400):
+        moves = game.get_legal_moves(game.current_player)
+        if not moves:
+            break
+        captures = sum(1 for move in moves if move.captured)
+        if ply >= 2 * filled_rows:
+            if captures >= 2:
+                return game
+            if captures > best_captures:
+                best, best_captures = ply, captures
+        history.append(rng.choice(moves))
+        game.push(history[-1])
+    # Falls back to the most capture-heavy position of the game
+    while len(game.history) > best:
+        game.pop()
+    return game
+
+
+def king_endgame(filled_rows, bitboard=False, sparse=False):
+    """
+    Returns a position with three kings for each player spread over the
+    board and nothing else.
+    """
+    game = new_game(filled_rows, bitboard, sparse)
+    for player in (game.player1, game.player2):
+        for piece in list(player.pieces):
+            game.board.remove_piece(piece)
+            game._remove_piece_from_player(piece)
+    length = game.board.length
+    dark = [(row, col) for row in range(length) for col in range(length)
+            if row % 2 != col % 2]
+    step = len(dark) // 6
+    for i, player in enumerate((game.player1, game.player2,
+                                game.player1, game.player2,
+                                game.player1, game.player2)):
+        piece = Piece(player.color, dark[i * step + step // 2])
+        piece.become_king()
+        game.board.place_piece(piece)
+        player.pieces.append(piece)
+    return game
+
+
+SCENARIOS = {
+    'opening': opening,
+    'middlegame': middlegame,
+    'king_endgame': king_endgame,
+}
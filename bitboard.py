@@ -0,0 +1,508 @@
+"""
+Bitboard position core for the checkers game.
+
+Each side's men and kings are stored as integer bitmasks over the
+length x length grid, where bit row * length + col stands for the square
+(row, col). Whole sets of pieces are moved by shifting a mask along a
+diagonal and masking out the squares that would fall off the board, so the
+same code works for every board size Board(filled_rows) can produce.
+
+Side 0 is the player whose men move towards higher rows (player1 in Game),
+side 1 is the player whose men move towards lower rows.
+"""
+from collections import namedtuple
+
+# A move as the squares visited, the squares captured and whether the piece
+# is crowned by it
+Move = namedtuple('Move', ['path', 'captured', 'promotion'])
+
+DIRECTIONS = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+FORWARD = (1, -1)
+
+# Masks and square tables of each board size, shared by every bitboard
+_tables = {}
+
+
+class BitBoard:
+    """
+    A class that represents a checkers position as integer bitmasks.
+    """
+    def __init__(self, length, down_color, up_color):
+        """
+        Initializes an empty bitboard.
+
+        Parameters:
+            length (int): The number of rows and columns on the board
+            down_color (str): The color of the side moving to higher rows
+            up_color (str): The color of the side moving to lower rows
+        """
+        self.length = length
+        self.colors = (down_color, up_color)
+        self.men = [0, 0]
+        self.kings = [0, 0]
+        self.full = (1 << length * length) - 1
+        if length not in _tables:
+            _tables[length] = self._build_tables()
+        (self.step_mask, self.jump_mask, self.rays, self.piece_rays,
+         self.squares, self.last_rows) = _tables[length]
+
+    def _build_tables(self):
+        """
+        Returns the masks and tables of the board size.
+
+        Parameters: None
+
+        Returns:
+            tuple: The step and jump source masks by direction, the
+            (direction, shift, step mask, jump mask) rays of the four
+            directions, the rays a piece of each side moves along as a man
+            and as a king, the square of each bit index and the mask of the
+            crowning rows
+        """
+        step_mask = {d: self._source_mask(d, 1) for d in DIRECTIONS}
+        jump_mask = {d: self._source_mask(d, 2) for d in DIRECTIONS}
+        rays = tuple((d, d[0] * self.length + d[1], step_mask[d],
+                      jump_mask[d]) for d in DIRECTIONS)
+        piece_rays = tuple(
+            (tuple(ray for ray in rays if ray[0][0] == forward), rays)
+            for forward in FORWARD)
+        squares = [self.square(index)
+                   for index in range(self.length * self.length)]
+        row = (1 << self.length) - 1
+        last_rows = row | row << self.length * (self.length - 1)
+        return step_mask, jump_mask, rays, piece_rays, squares, last_rows
+
+    def _source_mask(self, d, distance):
+        """
+        Returns the mask of squares that stay on the board after moving the
+        specified distance along a diagonal.
+
+        Parameters:
+            d ((int, int)): The row and column direction
+            distance (int): The number of diagonal steps
+
+        Returns:
+            int: The mask of valid source squares
+        """
+        mask = 0
+        for row in range(self.length):
+            for col in range(self.length):
+                end_row = row + distance * d[0]
+                end_col = col + distance * d[1]
+                if 0 <= end_row < self.length and 0 <= end_col < self.length:
+                    mask |= 1 << (row * self.length + col)
+        return mask
+
+    def _shift(self, mask, d, distance=1):
+        """
+        Shifts every bit of a mask along a diagonal. The mask must already be
+        restricted to valid source squares.
+
+        Parameters:
+            mask (int): The squares being shifted
+            d ((int, int)): The row and column direction
+            distance (int): The number of diagonal steps
+
+        Returns:
+            int: The shifted mask
+        """
+        amount = distance * (d[0] * self.length + d[1])
+        if amount > 0:
+            return mask << amount
+        return mask >> -amount
+
+    def index(self, square):
+        """
+        Returns the bit index of a square.
+
+        Parameters:
+            square ((int, int)): The row and column of the square
+
+        Returns:
+            int: The bit index of the square
+        """
+        return square[0] * self.length + square[1]
+
+    def square(self, index):
+        """
+        Returns the square of a bit index.
+
+        Parameters:
+            index (int): The bit index
+
+        Returns:
+            (int, int): The row and column of the square
+        """
+        return divmod(index, self.length)
+
+    def side_of(self, color):
+        """
+        Returns the side index of a color.
+
+        Parameters:
+            color (str): The color of a player
+
+        Returns:
+            int: 0 for the side moving down the board, 1 otherwise
+        """
+        return 0 if color == self.colors[0] else 1
+
+    def pieces(self, side):
+        """
+        Returns the mask of every piece of a side.
+
+        Parameters:
+            side (int): The side index
+
+        Returns:
+            int: The mask of the side's men and kings
+        """
+        return self.men[side] | self.kings[side]
+
+    def occupied(self):
+        """
+        Returns the mask of every occupied square.
+
+        Parameters: None
+
+        Returns:
+            int: The mask of occupied squares
+        """
+        return self.men[0] | self.men[1] | self.kings[0] | self.kings[1]
+
+    def empty(self):
+        """
+        Returns the mask of every empty square.
+
+        Parameters: None
+
+        Returns:
+            int: The mask of empty squares
+        """
+        return self.full & ~self.occupied()
+
+    def is_king(self, square):
+        """
+        Returns a boolean indicating if a king stands on the square.
+
+        Parameters:
+            square ((int, int)): The square being checked
+
+        Returns:
+            bool: True if there is a king on the square, False otherwise
+        """
+        bit = 1 << self.index(square)
+        return bool((self.kings[0] | self.kings[1]) & bit)
+
+    def add(self, color, square, is_king=False):
+        """
+        Places a piece on the bitboard.
+
+        Parameters:
+            color (str): The color of the piece
+            square ((int, int)): The square of the piece
+            is_king (bool): Whether the piece is a king
+
+        Returns: None
+        """
+        side = self.side_of(color)
+        bit = 1 << self.index(square)
+        if is_king:
+            self.kings[side] |= bit
+        else:
+            self.men[side] |= bit
+
+    def remove(self, square):
+        """
+        Clears a square of the bitboard.
+
+        Parameters:
+            square ((int, int)): The square being cleared
+
+        Returns: None
+        """
+        keep = ~(1 << self.index(square))
+        for side in (0, 1):
+            self.men[side] &= keep
+            self.kings[side] &= keep
+
+    def move(self, start, end):
+        """
+        Moves the piece standing on start to end.
+
+        Parameters:
+            start ((int, int)): The square the piece leaves
+            end ((int, int)): The square the piece lands on
+
+        Returns: None
+        """
+        if start == end:
+            # A king's capture chain may end where it started
+            return
+        start_bit = 1 << self.index(start)
+        end_bit = 1 << self.index(end)
+        for masks in (self.men, self.kings):
+            for side in (0, 1):
+                if masks[side] & start_bit:
+                    masks[side] ^= start_bit | end_bit
+                    return
+
+    def crown(self, square):
+        """
+        Turns the man standing on the square into a king.
+
+        Parameters:
+            square ((int, int)): The square of the piece
+
+        Returns: None
+        """
+        bit = 1 << self.index(square)
+        for side in (0, 1):
+            if self.men[side] & bit:
+                self.men[side] ^= bit
+                self.kings[side] |= bit
+
+    def uncrown(self, square):
+        """
+        Turns the king standing on the square back into a man.
+
+        Parameters:
+            square ((int, int)): The square of the piece
+
+        Returns: None
+        """
+        bit = 1 << self.index(square)
+        for side in (0, 1):
+            if self.kings[side] & bit:
+                self.kings[side] ^= bit
+                self.men[side] |= bit
+
+    def movers(self, side):
+        """
+        Returns the mask of a side's pieces that have a simple move.
+
+        Parameters:
+            side (int): The side index
+
+        Returns:
+            int: The mask of pieces with a one-step move
+        """
+        empty = self.empty()
+        rv = 0
+        for d in DIRECTIONS:
+            if d[0] == FORWARD[side]:
+                sources = self.pieces(side)
+            else:
+                sources = self.kings[side]
+            targets = self._shift(sources & self.step_mask[d], d) & empty
+            rv |= self._shift(targets, (-d[0], -d[1]))
+        return rv
+
+    def jumpers(self, side):
+        """
+        Returns the mask of a side's pieces that have a capture.
+
+        Parameters:
+            side (int): The side index
+
+        Returns:
+            int: The mask of pieces with at least one capture
+        """
+        empty = self.empty()
+        enemy = self.pieces(1 - side)
+        rv = 0
+        for d in DIRECTIONS:
+            if d[0] == FORWARD[side]:
+                sources = self.pieces(side)
+            else:
+                sources = self.kings[side]
+            middles = self._shift(sources & self.jump_mask[d], d) & enemy
+            landings = self._shift(middles, d) & empty
+            rv |= self._shift(landings, (-d[0], -d[1]), 2)
+        return rv
+
+    def has_moves(self, side):
+        """
+        Returns a boolean indicating if a side has any legal move, shifting
+        all its pieces at once and stopping at the first direction with a
+        step, or else with a capture.
+
+        Parameters:
+            side (int): The side index
+
+        Returns:
+            bool: True if the side can move, False otherwise
+        """
+        men = self.men[side]
+        kings = self.kings[side]
+        enemy = self.men[1 - side] | self.kings[1 - side]
+        empty = self.full & ~(men | kings | enemy)
+        forward = FORWARD[side]
+        for d, shift, step_mask, _ in self.rays:
+            sources = (men | kings if d[0] == forward else kings) & step_mask
+            if shift > 0:
+                if sources << shift & empty:
+                    return True
+            elif sources >> -shift & empty:
+                return True
+        for d, shift, _, jump_mask in self.rays:
+            sources = (men | kings if d[0] == forward else kings) & jump_mask
+            if shift > 0:
+                if (sources << shift & enemy) << shift & empty:
+                    return True
+            elif (sources >> -shift & enemy) >> -shift & empty:
+                return True
+        return False
+
+    def side_moves(self, side, sources=None):
+        """
+        Returns every move of a side's pieces. Steps and first jumps are
+        generated for all the pieces at once by shifting their mask along
+        each diagonal, then split per piece; only capture chains are
+        followed one piece at a time. Captures are listed for every jump of
+        a chain, so a player may stop a multiple jump early.
+
+        Parameters:
+            side (int): The side index
+            sources (int): The mask of the pieces whose moves are wanted,
+            every piece of the side by default
+
+        Returns:
+            {(int, int): [Move]}: The moves of each piece that can move, by
+            its square, in direction order with steps before captures
+        """
+        men = self.men[side]
+        kings = self.kings[side]
+        enemy = self.men[1 - side] | self.kings[1 - side]
+        empty = self.full & ~(men | kings | enemy)
+        if sources is not None:
+            men &= sources
+            kings &= sources
+        forward = FORWARD[side]
+        squares = self.squares
+        last_rows = self.last_rows
+        rv = {}
+        for d, shift, step_mask, _ in self.rays:
+            targets = (men | kings if d[0] == forward else kings) & step_mask
+            if shift > 0:
+                targets = targets << shift & empty
+            else:
+                targets = targets >> -shift & empty
+            while targets:
+                low = targets & -targets
+                targets ^= low
+                end = low.bit_length() - 1
+                start = end - shift
+                square = squares[start]
+                moves = rv.get(square)
+                if moves is None:
+                    moves = rv[square] = []
+                # Only a man moving forward can reach a crowning row
+                moves.append(Move((square, squares[end]), (),
+                                  bool(low & last_rows and men >> start & 1)))
+        for d, shift, _, jump_mask in self.rays:
+            landings = (men | kings if d[0] == forward else kings) \
+                & jump_mask
+            if shift > 0:
+                landings = (landings << shift & enemy) << shift & empty
+            else:
+                landings = (landings >> -shift & enemy) >> -shift & empty
+            while landings:
+                low = landings & -landings
+                landings ^= low
+                landing = low.bit_length() - 1
+                middle = landing - shift
+                start = middle - shift
+                is_king = bool(kings >> start & 1)
+                square = squares[start]
+                moves = rv.get(square)
+                if moves is None:
+                    moves = rv[square] = []
+                path = [square, squares[landing]]
+                captured = [squares[middle]]
+                # A man reaching the last row is crowned and stops
+                promotion = not is_king and bool(low & last_rows)
+                moves.append(Move((square, path[1]), (captured[0],),
+                                  promotion))
+                if not promotion:
+                    # The moving piece no longer blocks its starting square
+                    self._jumps(landing, self.piece_rays[side][is_king],
+                                enemy & ~(1 << middle), empty | 1 << start,
+                                is_king, path, captured, moves)
+        return rv
+
+    def piece_moves(self, square, side=None, is_king=None):
+        """
+        Returns every move of the piece standing on the square. Captures are
+        listed for every jump of a chain, so a player may stop a multiple
+        jump early. For a single piece the shifts of side_moves reduce to
+        one bit test per direction.
+
+        Parameters:
+            square ((int, int)): The square of the piece
+            side (int): The side of the piece, that of the piece on the
+            square by default
+            is_king (bool): Whether the piece is a king, as the piece on the
+            square by default
+
+        Returns:
+            [Move]: The moves, whose paths start with the square of the
+            piece
+        """
+        start = self.index(square)
+        bit = 1 << start
+        if side is None:
+            side = 0 if (self.men[0] | self.kings[0]) & bit else 1
+        if is_king is None:
+            is_king = bool(self.kings[side] & bit)
+        rays = self.piece_rays[side][is_king]
+        enemy = self.men[1 - side] | self.kings[1 - side]
+        empty = self.empty()
+        rv = []
+        for d, shift, step_mask, _ in rays:
+            end = start + shift
+            if bit & step_mask and empty >> end & 1:
+                rv.append(Move((square, self.squares[end]), (),
+                               not is_king and bool(self.last_rows >> end
+                                                    & 1)))
+        # The moving piece no longer blocks its own starting square
+        self._jumps(start, rays, enemy, empty | bit, is_king, [square], [],
+                    rv)
+        return rv
+
+    def _jumps(self, index, rays, enemy, empty, is_king, path, captured,
+               rv):
+        """
+        Appends every capture chain that continues from a square by DFS.
+
+        Parameters:
+            index (int): The bit index the piece currently stands on
+            rays (tuple): The rays of the directions the piece may jump in
+            enemy (int): The mask of opposing pieces not yet captured
+            empty (int): The mask of empty squares
+            is_king (bool): Whether the piece is a king
+            path ([(int, int)]): The squares visited so far
+            captured ([(int, int)]): The squares captured so far
+            rv (list): The list the moves are appended to
+
+        Returns: None
+        """
+        bit = 1 << index
+        for d, shift, _, jump_mask in rays:
+            if not bit & jump_mask:
+                continue
+            middle = index + shift
+            landing = middle + shift
+            if enemy >> middle & 1 and empty >> landing & 1:
+                landing_square = self.squares[landing]
+                path.append(landing_square)
+                captured.append(self.squares[middle])
+                # A man reaching the last row is crowned and stops
+                promotion = not is_king \
+                    and bool(self.last_rows >> landing & 1)
+                rv.append(Move(tuple(path), tuple(captured), promotion))
+                if not promotion:
+                    self._jumps(landing, rays, enemy & ~(1 << middle),
+                                empty, is_king, path, captured, rv)
+                path.pop()
+                captured.pop()
@@ -0,0 +1,235 @@
+"""
+Opening book built from recorded games.
+
+The builder replays the first plies of every game of one board size and
+counts, for each position and move played from it, the games, the wins of
+the player who made the move and the draws. The counts are written as
+fixed-width entries sorted by the position's Zobrist key (Game.key), so at
+play time OpeningBook finds a position with a binary search over the
+memory-mapped file, without loading it.
+
+Run as a script to build a book from game archives:
+
+    python book.py book.bin games.ckr more.ckr --max-ply 16 --min-games 2
+"""
+import argparse
+import mmap
+import struct
+
+from checkers import Game, Player
+from record import DRAW, read_records
+
+MAGIC = b'CKB1'
+# Filled rows and number of entries
+HEADER = struct.Struct('<4sBxxxQ')
+# Position key, start and end squares, games, wins of the mover and draws
+ENTRY = struct.Struct('<QHHIII')
+
+
+def _replay_moves(record, max_ply):
+    """
+    Yields the key of each position of a record within max_ply plies and the
+    move played from it.
+
+    Parameters:
+        record (GameRecord): The game being replayed
+        max_ply (int): The number of plies replayed
+
+    Yields:
+        (int, Move, int): The key of the position, the move played and the
+        number of the player who played it
+    """
+    game = Game(Player(*record.player1), Player(*record.player2),
+                record.filled_rows)
+    for ply, path in enumerate(record.moves[:max_ply]):
+        for move in game.get_legal_moves(game.current_player):
+            if move.path == path:
+                break
+        else:
+            raise ValueError(f'Illegal move {ply + 1}: {path}')
+        yield game.key, move, 1 if ply % 2 == 0 else 2
+        game.push(move)
+
+
+def build_book(records, path, filled_rows=3, max_ply=16, min_games=1):
+    """
+    Writes the opening book of the games of one board size.
+
+    Parameters:
+        records: An iterable of GameRecord, such as read_records(stream);
+        games of other board sizes are skipped
+        path (str): The path of the book being written
+        filled_rows (int): The board size of the book
+        max_ply (int): The number of plies of each game counted
+        min_games (int): Moves played in fewer games are left out
+
+    Returns:
+        int: The number of entries written
+    """
+    length = 2 * filled_rows + 2
+    counts = {}
+    for record in records:
+        if record.filled_rows != filled_rows:
+            continue
+        for key, move, mover in _replay_moves(record, max_ply):
+            start, end = move.path[0], move.path[-1]
+            squares = (start[0] * length + start[1],
+                       end[0] * length + end[1])
+            stats = counts.setdefault((key, squares), [0, 0, 0])
+            stats[0] += 1
+            if record.result == mover:
+                stats[1] += 1
+            elif record.result == DRAW:
+                stats[2] += 1
+    entries = sorted(item for item in counts.items()
+                     if item[1][0] >= min_games)
+    with open(path, 'wb') as book:
+        book.write(HEADER.pack(MAGIC, filled_rows, len(entries)))
+        for (key, (start, end)), (games, wins, draws) in entries:
+            book.write(ENTRY.pack(key, start, end, games, wins, draws))
+    return len(entries)
+
+
+class OpeningBook:
+    """
+    A class that represents a memory-mapped opening book.
+    """
+    def __init__(self, path):
+        """
+        Opens a book.
+
+        Parameters:
+            path (str): The path of a book written by build_book
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.filled_rows, self.count = HEADER.unpack_from(self._data)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError('Not an opening book')
+        self.length = 2 * self.filled_rows + 2
+
+    def __reduce__(self):
+        """
+        Pickles the book as its path, so worker processes map it themselves.
+        """
+        return (OpeningBook, (self.path,))
+
+    def _key_at(self, index):
+        """
+        Returns the position key of an entry.
+        """
+        return struct.unpack_from('<Q', self._data,
+                                  HEADER.size + index * ENTRY.size)[0]
+
+    def entries(self, key):
+        """
+        Returns the entries of a position.
+
+        Parameters:
+            key (int): The Zobrist key of the position
+
+        Returns:
+            [((int, int), (int, int), int, int, int)]: The start and end
+            squares, games, wins and draws of each move played from it
+        """
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        rv = []
+        for index in range(low, self.count):
+            entry = ENTRY.unpack_from(self._data,
+                                      HEADER.size + index * ENTRY.size)
+            if entry[0] != key:
+                break
+            _, start, end, games, wins, draws = entry
+            rv.append((divmod(start, self.length), divmod(end, self.length),
+                       games, wins, draws))
+        return rv
+
+    def moves(self, game):
+        """
+        Returns the book moves of the player to move.
+
+        Parameters:
+            game (Game): The game being played, of the book's board size
+
+        Returns:
+            [(Move, int, int, int)]: Each legal move of the book with its
+            games, wins and draws
+        """
+        if game.board.length != self.length:
+            return []
+        entries = self.entries(game.key)
+        if not entries:
+            return []
+        rv = []
+        legal = game.get_legal_moves(game.current_player)
+        for start, end, games, wins, draws in entries:
+            # As in Game.make_move, the longest chain between the squares
+            candidates = [move for move in legal
+                          if move.path[0] == start and move.path[-1] == end]
+            if candidates:
+                move = max(candidates, key=lambda move: len(move.captured))
+                rv.append((move, games, wins, draws))
+        return rv
+
+    def choose_move(self, game, rng=None):
+        """
+        Returns a book move of the player to move: the most played one, or a
+        random one weighted by games played if a generator is given.
+
+        Parameters:
+            game (Game): The game being played
+            rng (random.Random): The generator of a random choice
+
+        Returns:
+            Move: The chosen move, or None if the position is not in the book
+        """
+        moves = self.moves(game)
+        if not moves:
+            return None
+        if rng is not None:
+            return rng.choices([move for move, *_ in moves],
+                               [games for _, games, _, _ in moves])[0]
+        return max(moves, key=lambda item: (item[1], item[2] + item[3] / 2))[0]
+
+    def close(self):
+        """
+        Unmaps the book.
+
+        Parameters: None
+
+        Returns: None
+        """
+        self._data.close()
+        self._file.close()
+
+
+def main():
+    """
+    Builds a book from game archives and prints its number of entries.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('book')
+    parser.add_argument('archives', nargs='+')
+    parser.add_argument('--filled-rows', type=int, default=3)
+    parser.add_argument('--max-ply', type=int, default=16)
+    parser.add_argument('--min-games', type=int, default=1)
+    args = parser.parse_args()
+
+    def records():
+        for path in args.archives:
+            with open(path, 'rb') as archive:
+                yield from read_records(archive)
+    print(build_book(records(), args.book, args.filled_rows, args.max_ply,
+                     args.min_games))
+
+
+if __name__ == '__main__':
+    main()
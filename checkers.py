@@ -1,8 +1,70 @@
+from collections import namedtuple, OrderedDict
+from bitboard import BitBoard, DIRECTIONS, Move
+from zobrist import piece_keys, SIDE_KEY
+
+# The delta needed to take back a move made with Game.push
+Undo = namedtuple('Undo', ['move', 'piece', 'captured', 'was_king', 'player'])
+# An immutable position: the board size, the player to move (0 for player1),
+# and masks of the squares of each player's pieces and of the kings, with
+# square (row, col) as bit row * length + col
+Snapshot = namedtuple('Snapshot', ['filled_rows', 'side', 'player1', 'player2',
+                                   'kings'])
+
+# Why a game was won: the loser has no pieces left, or none that can move
+NO_PIECES = 'no_pieces'
+NO_MOVES = 'no_moves'
+# Masks of the dark squares, the first row and the last row of each board
+# length
+_snapshot_masks = {}
+
+def check_snapshot(snapshot):
+    """
+    Checks that a snapshot describes a position that can be set up.
+
+    Parameters:
+        snapshot (Snapshot): The position being checked
+
+    Returns: None
+
+    Raises:
+        ValueError: If the board size or player to move is invalid, the
+        players share a square, a piece stands on a light or off-board
+        square, a king is not one of the pieces, or a man stands on the row
+        where it would have been crowned
+    """
+    filled_rows = snapshot.filled_rows
+    if not isinstance(filled_rows, int) or filled_rows < 1:
+        raise ValueError(f'filled_rows must be a positive integer, not '
+                         f'{filled_rows!r}')
+    if snapshot.side not in (0, 1):
+        raise ValueError(f'side must be 0 or 1, not {snapshot.side!r}')
+    if snapshot.player1 & snapshot.player2:
+        raise ValueError('the players have pieces on the same squares')
+    length = 2 * filled_rows + 2
+    if length not in _snapshot_masks:
+        dark = 0
+        for row in range(length):
+            for col in range(1 - row % 2, length, 2):
+                dark |= 1 << row * length + col
+        row = (1 << length) - 1
+        _snapshot_masks[length] = (dark, row, row << (length - 1) * length)
+    dark, first_row, last_row = _snapshot_masks[length]
+    pieces = snapshot.player1 | snapshot.player2
+    if pieces & ~dark:
+        raise ValueError('pieces must stand on dark squares of the board')
+    if snapshot.kings & ~pieces:
+        raise ValueError('every king must be one of the pieces')
+    # Player 1's men crown on the last row, player 2's on the first
+    if (snapshot.player1 & last_row | snapshot.player2 & first_row) \
+            & ~snapshot.kings:
+        raise ValueError('men cannot stand on the row where they are crowned')
+
 class Game:
     """
     A class that represents the checkers game.
     """
-    def __init__(self, player1, player2, filled_rows = 3):
+    def __init__(self, player1, player2, filled_rows = 3, bitboard = False,
+                 sparse = False, move_cache = None, snapshot = None):
         """
         Initializes a new game of checkers with the specified players and board 
         size.
@@ -11,7 +73,22 @@ class Game:
             player1 (Player): First player
             player2 (Player): Second player
             filled_rows (int): The number of rows with pieces for each player
+            bitboard (bool): Whether move generation runs on integer bitmasks
+            instead of scanning the board squares
+            sparse (bool): Whether the board only stores occupied squares,
+            for very large boards
+            move_cache (int or MoveCache): The number of positions whose
+            legal moves are remembered, or a cache shared with other games
+            of the same size and colors; None to generate moves every time
+            snapshot (Snapshot): A position set up instead of the starting
+            one, whose board size replaces filled_rows
+
+        Raises:
+            ValueError: If the snapshot is not a valid position
         """
+        if snapshot is not None:
+            check_snapshot(snapshot)
+            filled_rows = snapshot.filled_rows
         # Adds players
         self.player1 = player1
         self.player2 = player2
@@ -21,11 +98,35 @@ class Game:
         self.loser = None
         self.tie = False
         # Creates board
-        self.board = Board(filled_rows)
-        self.initialize_pieces()
+        self.board = Board(filled_rows, (player1.color, player2.color), 
+                           sparse)
+        if bitboard:
+            self.board.bits = BitBoard(self.board.length, player1.color,
+                                       player2.color)
+        if snapshot is None:
+            self.initialize_pieces()
+        else:
+            self._set_up(snapshot)
         # Multiple jumps
         self.current_jump = []
         self.count = 0
+        # Moves made with push that can be taken back with pop
+        self.history = []
+        # Whether each player can move in the current board version
+        self._mobility = {}
+        self._mobility_version = None
+        if isinstance(move_cache, int):
+            move_cache = MoveCache(move_cache)
+        self.move_cache = move_cache
+
+    @property
+    def key(self):
+        """
+        The 64-bit Zobrist key of the position and the player to move.
+        """
+        if self.current_player is self.player2:
+            return self.board.key ^ SIDE_KEY
+        return self.board.key
 
     def _switch_player(self):
         """
@@ -40,6 +141,20 @@ class Game:
         else:
             self.current_player = self.player2
 
+    def _owner(self, piece):
+        """
+        Returns the player a piece belongs to.
+
+        Parameters:
+            piece (Piece): The piece being assessed
+
+        Returns:
+            Player: The player with the piece's color
+        """
+        if piece.color == self.player1.color:
+            return self.player1
+        return self.player2
+
     def _remove_piece_from_player(self, piece):
         """
         Removes the captured piece from the player class.
@@ -62,37 +177,128 @@ class Game:
 
         Returns: None
         """
-        for row in range(self.board.length):
-            for col in range(self.board.length):
-                if col % 2 != row % 2:
-                    if row < self.board.filled_rows:
-                        # Places pieces for player1
-                        pieces_position = []
-                        if len(self.player1.pieces) > 0:
-                            for p in self.player1.pieces:
-                                pieces_position.append(p.position)
-                            if (row, col) not in pieces_position:
-                                piece = Piece(self.player1.color, (row, col))
-                                self.board.squares[row][col] = piece
-                                self.player1.pieces.append(piece)
-                        else:
-                            piece = Piece(self.player1.color, (row, col))
-                            self.board.squares[row][col] = piece
-                            self.player1.pieces.append(piece)
-                    elif row > self.board.filled_rows + 1:
-                        # Places pieces for player2
-                        pieces_position = []
-                        if len(self.player2.pieces) > 0:
-                            for p in self.player2.pieces:
-                                pieces_position.append(p.position)
-                            if (row, col) not in pieces_position:
-                                piece = Piece(self.player2.color, (row, col))
-                                self.board.squares[row][col] = piece
-                                self.player2.pieces.append(piece)
-                        else:
-                            piece = Piece(self.player2.color, (row, col))
-                            self.board.squares[row][col] = piece
-                            self.player2.pieces.append(piece)
+        length = self.board.length
+        filled_rows = self.board.filled_rows
+        # Only the dark squares of the filled rows are visited
+        for player, rows in ((self.player1, range(filled_rows)),
+                             (self.player2, range(filled_rows + 2, length))):
+            for row in rows:
+                for col in range(1 - row % 2, length, 2):
+                    if player.pieces.at((row, col)) is None:
+                        piece = Piece(player.color, (row, col))
+                        self.board.place_piece(piece)
+                        player.pieces.append(piece)
+
+    def _set_up(self, snapshot):
+        """
+        Places the pieces of a snapshot on the empty board, replacing the
+        players' pieces, and gives the turn to its player to move.
+
+        Parameters:
+            snapshot (Snapshot): The position being set up
+
+        Returns: None
+        """
+        length = self.board.length
+        kings = snapshot.kings
+        # The bitboard takes the snapshot's masks at once below
+        bits = self.board.bits
+        self.board.bits = None
+        for player, mask in ((self.player1, snapshot.player1),
+                             (self.player2, snapshot.player2)):
+            player.pieces = []
+            pieces = player.pieces
+            while mask:
+                low = mask & -mask
+                mask ^= low
+                piece = Piece(player.color,
+                              divmod(low.bit_length() - 1, length))
+                piece.is_king = bool(kings & low)
+                self.board.place_piece(piece)
+                pieces.append(piece)
+        if bits is not None:
+            bits.men = [snapshot.player1 & ~kings, snapshot.player2 & ~kings]
+            bits.kings = [snapshot.player1 & kings, snapshot.player2 & kings]
+            self.board.bits = bits
+        self.current_player = self.player2 if snapshot.side else self.player1
+
+    def snapshot(self):
+        """
+        Returns the position as an immutable, hashable snapshot.
+
+        Parameters: None
+
+        Returns:
+            Snapshot: The pieces on the board and the player to move
+        """
+        side = 1 if self.current_player is self.player2 else 0
+        bits = self.board.bits
+        if bits is not None:
+            return Snapshot(self.board.filled_rows, side,
+                            bits.men[0] | bits.kings[0],
+                            bits.men[1] | bits.kings[1],
+                            bits.kings[0] | bits.kings[1])
+        length = self.board.length
+        masks = []
+        kings = 0
+        for player in (self.player1, self.player2):
+            mask = 0
+            for piece in player.pieces:
+                row, col = piece.position
+                bit = 1 << row * length + col
+                mask |= bit
+                if piece.is_king:
+                    kings |= bit
+            masks.append(mask)
+        return Snapshot(self.board.filled_rows, side, masks[0], masks[1],
+                        kings)
+
+    @classmethod
+    def from_snapshot(cls, snapshot, player1=None, player2=None, **options):
+        """
+        Returns a game set up in the position of a snapshot.
+
+        Parameters:
+            snapshot (Snapshot): The position being set up
+            player1 (Player): First player, 'Player 1' playing red by default
+            player2 (Player): Second player, 'Player 2' playing white by
+            default
+            **options: The bitboard, sparse and move_cache options of Game
+
+        Returns:
+            Game: The new game
+
+        Raises:
+            ValueError: If the snapshot is not a valid position
+        """
+        if player1 is None:
+            player1 = Player('Player 1', 'red')
+        if player2 is None:
+            player2 = Player('Player 2', 'white')
+        return cls(player1, player2, snapshot=snapshot, **options)
+
+    def clone(self):
+        """
+        Returns an independent copy of the game in its current position,
+        with new players of the same names and colors. The copy keeps the
+        board representation, shares the move cache and starts with no push
+        history.
+
+        Parameters: None
+
+        Returns:
+            Game: The copy
+        """
+        game = Game(Player(self.player1.name, self.player1.color),
+                    Player(self.player2.name, self.player2.color),
+                    bitboard=self.board.bits is not None,
+                    sparse=self.board.cells is not None,
+                    move_cache=self.move_cache, snapshot=self.snapshot())
+        game.winner = self.winner
+        game.loser = self.loser
+        game.tie = self.tie
+        game.count = self.count
+        return game
 
     def make_move(self, piece, end):
         """
@@ -101,41 +307,94 @@ class Game:
 
 		Parameters:
 	        piece (Piece): The starting piece
-	        end ((int, int)): The coordinates of the place the player wants
-            to move a piece to
+	        end ((int, int)) or Move: The coordinates of the place the player
+            wants to move a piece to, or a move returned by legal_moves
     
 		Returns:
 	        bool: True if the move was successful, False otherwise
         """
         if piece is None:
             return False
-        pos = piece.position
         if piece.color != self.current_player.color:
             return False
-        # Checks if move is legal and removes pieces if captures are possible
-        if self.move_legality(piece, end):
-            self.current_jump = []
-            if self.is_capture_possible(piece.position, end, piece.is_king):
-                self.current_jump.append(end)
-                if abs(end[0] - pos[0]) >= 2:
-                    for jump in self.current_jump: 
-                        mid_row = (jump[0] + pos[0]) // 2
-                        mid_col = (jump[1] + pos[1]) // 2
-                        mid_piece = self.board.squares[mid_row][mid_col]
-                        self.board.remove_piece(mid_piece)
-                        self._remove_piece_from_player(mid_piece)
-                        self.board.move_piece(piece, jump)
-                        pos = piece.position
-                    self.current_jump = []
-            else:
-                end_piece = self.board.squares[end[0]][end[1]]
-                if end_piece is not None:
-                    return False
-                else:
-                    self.board.move_piece(piece, end)
-            return True
+        if isinstance(end, Move):
+            # Validated against the moves of the piece, cached or generated
+            if end not in self.legal_moves(piece):
+                return False
+            move = end
         else:
-            return False
+            move = None
+            # Plays the longest capture chain ending on the square
+            for candidate in self.legal_moves(piece):
+                if candidate.path[-1] == end:
+                    if move is None \
+                    or len(candidate.captured) > len(move.captured):
+                        move = candidate
+            if move is None:
+                return False
+        self._apply_move(piece, move)
+        return True
+
+    def push(self, move):
+        """
+        Makes a move for the current player and passes the turn, remembering
+        only what is needed to take it back with pop.
+
+        Parameters:
+            move (Move): A move returned by legal_moves for the current
+            position
+
+        Returns: None
+        """
+        start = move.path[0]
+        piece = self.board.piece_at(start)
+        captured = [self.board.piece_at(square) for square in move.captured]
+        self.history.append(Undo(move, piece, captured, piece.is_king, 
+                                 self.current_player))
+        self._apply_move(piece, move)
+        self._switch_player()
+
+    def pop(self):
+        """
+        Takes back the last move made with push and restores the turn.
+
+        Parameters: None
+
+        Returns:
+            Move: The move that was taken back
+        """
+        move, piece, captured, was_king, player = self.history.pop()
+        end = piece.position
+        self.board.move_piece(piece, move.path[0])
+        self._owner(piece).pieces.relocate(piece, end)
+        if not was_king and piece.is_king:
+            self.board.demote_piece(piece)
+        for mid_piece in reversed(captured):
+            self.board.place_piece(mid_piece)
+            self._owner(mid_piece).pieces.append(mid_piece)
+        self.current_player = player
+        return move
+
+    def _apply_move(self, piece, move):
+        """
+        Moves the piece along the path of a move and removes every captured 
+        piece.
+
+        Parameters:
+            piece (Piece): The piece being moved
+            move (Move): The move being made
+
+        Returns: None
+        """
+        start = piece.position
+        if not move.captured:
+            self.board.move_piece(piece, move.path[-1])
+        for jump, square in zip(move.path[1:], move.captured):
+            mid_piece = self.board.piece_at(square)
+            self.board.remove_piece(mid_piece)
+            self._remove_piece_from_player(mid_piece)
+            self.board.move_piece(piece, jump)
+        self._owner(piece).pieces.relocate(piece, start)
 
     def move_legality(self, piece, end):
         """
@@ -175,7 +434,8 @@ class Game:
     def is_capture_possible(self, start, end, is_king):
         """
         Returns a boolean indicating if a capture is possible with the 
-        specified move.
+        specified move, for a piece of the player to move standing on start
+        whatever is on that square now.
 
         Parameters:
             start ((int, int)): A tuple containing the start position of a move
@@ -185,68 +445,289 @@ class Game:
         Returns:
             bool: True if a capture is possible, False otherwise
         """
-        # Checks for single capture (base case)
-        if abs(end[0] - start[0]) == 2:
-            mid_row = (end[0] + start[0]) // 2
-            mid_col = (end[1] + start[1]) // 2
-            end_piece = self.board.squares[end[0]][end[1]]
-            mid_piece = self.board.squares[mid_row][mid_col]
+        color = self.current_player.color
+        piece = self.board.piece_at(start)
+        # The cache only holds the moves of the pieces on the board
+        if self.move_cache is not None and piece is not None \
+                and piece.color == color and piece.is_king == is_king:
+            moves = self._player_moves(color).get(start, ())
+        elif self.board.bits is not None:
+            bits = self.board.bits
+            moves = bits.piece_moves(start, bits.side_of(color), is_king)
+        else:
+            moves = self._grid_moves(start, color, is_king)
+        for path, captured, _ in moves:
+            if captured and path[-1] == end:
+                return True
+        return False
+
+    def legal_moves(self, piece):
+        """
+        Returns every move of the piece, including each jump of a capture
+        chain so a player may stop a multiple jump early.
+
+        Parameters:
+            piece (Piece): The piece being assessed
+
+        Returns:
+            [Move]: The possible moves of the piece
+        """
+        if self.move_cache is not None:
+            return list(self._player_moves(piece.color).get(piece.position,
+                                                            ()))
+        return self._piece_moves(piece)
+
+    def _piece_moves(self, piece):
+        """
+        Generates every move of the piece, bypassing the move cache.
+
+        Parameters:
+            piece (Piece): The piece being assessed
+
+        Returns:
+            [Move]: The possible moves of the piece
+        """
+        if self.board.bits is not None:
+            return self.board.bits.piece_moves(piece.position)
+        moves = self._grid_moves(piece.position, piece.color, piece.is_king)
+        return [Move(*move) for move in moves]
+
+    def get_legal_moves(self, player):
+        """
+        Returns every move of every piece of a player.
+
+        Parameters: 
+            player (Player): The player being assessed
+
+        Returns:
+            [Move]: The possible moves of the player
+        """
+        if self.move_cache is not None:
+            by_start = self._player_moves(player.color)
+        elif self.board.bits is not None:
+            by_start = self._generate_moves(player)
+        else:
+            moves = []
+            for piece in player.pieces:
+                moves.extend(self._piece_moves(piece))
+            return moves
+        return [move for moves in by_start.values() for move in moves]
+
+    def _player_moves(self, color):
+        """
+        Returns the legal moves of a player in the current position, from
+        the move cache or generated and stored there.
+
+        Parameters:
+            color (str): The color of the player
+
+        Returns:
+            {(int, int): (Move)}: The moves of each piece that can move, by
+            its square
+        """
+        key = (self.board.key, color)
+        rv = self.move_cache.get(key)
+        if rv is None:
+            player = self.player1 if color == self.player1.color \
+                else self.player2
+            rv = self._generate_moves(player)
+            self.move_cache.put(key, rv)
+        return rv
+
+    def _generate_moves(self, player):
+        """
+        Generates the moves of every piece of a player, bypassing the move
+        cache. The bitboard generates them for all the pieces at once.
+
+        Parameters:
+            player (Player): The player being assessed
+
+        Returns:
+            {(int, int): (Move)}: The moves of each piece that can move, by
+            its square, in the order of the player's pieces
+        """
+        rv = {}
+        bits = self.board.bits
+        if bits is None:
+            for piece in player.pieces:
+                moves = self._grid_moves(piece.position, piece.color,
+                                         piece.is_king)
+                if moves:
+                    rv[piece.position] = tuple([Move(*move)
+                                                for move in moves])
+            return rv
+        by_start = bits.side_moves(bits.side_of(player.color))
+        for piece in player.pieces:
+            moves = by_start.get(piece.position)
+            if moves:
+                rv[piece.position] = tuple(moves)
+        return rv
+
+    def _grid_moves(self, start, color, is_king):
+        """
+        Returns the moves of a piece by walking only the diagonals reachable 
+        from its square.
+
+        Parameters:
+            start ((int, int)): The position of the piece
+            color (str): The color of the piece
+            is_king (bool): A boolean that verifies if a piece is a king
+
+        Returns:
+            [(((int, int)), ((int, int)), bool)]: The moves as 
+            (path, captured, promotion) triples
+        """
+        directions = self._directions(color, is_king)
+        moves = []
+        for d_row, d_col in directions:
+            end = (start[0] + d_row, start[1] + d_col)
+            if self._on_board(end) and self.board.piece_at(end) is None:
+                moves.append(((start, end), (), 
+                              not is_king and self._last_row(end)))
+        self._capture_chains(color, is_king, directions, [start], [], moves)
+        return moves
+
+    def _directions(self, color, is_king):
+        """
+        Returns the diagonal directions a piece may move in.
+
+        Parameters:
+            color (str): The color of the piece
+            is_king (bool): A boolean that verifies if a piece is a king
+
+        Returns:
+            [(int, int)]: The row and column directions
+        """
+        if color == self.player1.color:
+            forward = 1
+        else:
+            forward = -1
+        return [d for d in DIRECTIONS if is_king or d[0] == forward]
+
+    def _capture_chains(self, color, is_king, directions, path, captured, 
+                        moves):
+        """
+        Appends every capture chain continuing from the end of the path, 
+        searching the jump tree once by DFS. Captured pieces stay on the board
+        until the move is made, so none can be jumped twice.
+
+        Parameters:
+            color (str): The color of the moving piece
+            is_king (bool): A boolean that verifies if a piece is a king
+            directions ([(int, int)]): The directions the piece may jump in
+            path ([(int, int)]): The squares visited so far
+            captured ([(int, int)]): The squares captured so far
+            moves (list): The list the moves are appended to
+
+        Returns: None
+        """
+        row, col = path[-1]
+        for d_row, d_col in directions:
+            mid = (row + d_row, col + d_col)
+            end = (row + 2 * d_row, col + 2 * d_col)
+            if not self._on_board(end) or mid in captured:
+                continue
+            mid_piece = self.board.piece_at(mid)
+            if mid_piece is None or mid_piece.color == color:
+                continue
+            # The moving piece no longer blocks its own starting square
+            if self.board.piece_at(end) is not None and end != path[0]:
+                continue
+            path.append(end)
+            captured.append(mid)
+            # A man reaching the last row is crowned and stops
+            promotion = not is_king and self._last_row(end)
+            moves.append((tuple(path), tuple(captured), promotion))
+            if not promotion:
+                self._capture_chains(color, is_king, directions, path, 
+                                     captured, moves)
+            path.pop()
+            captured.pop()
+
+    def _on_board(self, pos):
+        """
+        Returns a boolean indicating if a position lies within the board.
+
+        Parameters:
+            pos ((int, int)): The position being checked
+
+        Returns:
+            bool: True if the position is on the board, False otherwise
+        """
+        return 0 <= pos[0] < self.board.length \
+            and 0 <= pos[1] < self.board.length
+
+    def _last_row(self, pos):
+        """
+        Returns a boolean indicating if a position lies on a crowning row.
+
+        Parameters:
+            pos ((int, int)): The position being checked
+
+        Returns:
+            bool: True if the position is on the first or last row
+        """
+        return pos[0] == 0 or pos[0] == self.board.length - 1
+
+    def has_moves(self, player):
+        """
+        Returns a boolean indicating if a player has any legal move. The
+        search stops at the first move found and the answer is remembered
+        until the board changes.
+
+        Parameters:
+            player (Player): The player being assessed
+
+        Returns:
+            bool: True if the player can move, False otherwise
+        """
+        # Moves already cached answer at once, otherwise the search below
+        # stops at the first move instead of filling the cache
+        if self.move_cache is not None:
+            moves = self.move_cache.peek((self.board.key, player.color))
+            if moves is not None:
+                return bool(moves)
+        # Only the current position is worth keeping
+        if self._mobility_version != self.board.version:
+            self._mobility_version = self.board.version
+            self._mobility = {}
+        if player.color in self._mobility:
+            return self._mobility[player.color]
+        if self.board.bits is not None:
+            rv = self.board.bits.has_moves(
+                self.board.bits.side_of(player.color))
+        else:
+            rv = False
+            for piece in player.pieces:
+                if self._can_move(piece):
+                    rv = True
+                    break
+        self._mobility[player.color] = rv
+        return rv
+
+    def _can_move(self, piece):
+        """
+        Returns a boolean indicating if a piece has a step or a first jump,
+        without following capture chains.
+
+        Parameters:
+            piece (Piece): The piece being assessed
+
+        Returns:
+            bool: True if the piece can move, False otherwise
+        """
+        row, col = piece.position
+        for d_row, d_col in self._directions(piece.color, piece.is_king):
+            end = (row + d_row, col + d_col)
+            if not self._on_board(end):
+                continue
+            end_piece = self.board.piece_at(end)
             if end_piece is None:
-                if mid_piece is None:
-                    return False
-                elif self.current_player.color == mid_piece.color:
-                    return False
-                elif self.current_player.color != mid_piece.color:
-                    return True
-                
-        # Checks multiple captures (recursive)    
-        elif abs(end[0] - start[0]) > 2 and abs(end[0] - start[0]) % 2 == 0\
-            and abs(end[1] - start[1]) % 2 == 0:
-            # Verifies captures for player1 or a king piece
-            if self.current_player == self.player1 or is_king:
-                # Verifies lower right captures
-                if start[0] + 2 < self.board.length - 1 \
-                and start[1] + 2 < self.board.length - 1:
-                    pos = (start[0] + 2, start[1] + 2)
-                    if pos not in self.current_jump:
-                        if self.is_capture_possible\
-                        (start, pos, is_king):
-                            self.current_jump.append(pos)
-                            if end not in self.current_jump:
-                                return self.is_capture_possible\
-                                (pos, end, is_king)
-                # Verifies lower left captures
-                if start[0] + 2 < self.board.length - 1 and start[1] - 2 > 0:
-                    pos = (start[0] + 2, start[1] - 2)
-                    if pos not in self.current_jump:                      
-                        if self.is_capture_possible\
-                        (start, pos, is_king):
-                            self.current_jump.append(pos)
-                            if end not in self.current_jump:                                                                   
-                                return self.is_capture_possible\
-                                (pos, end, is_king)
-            # Verifies captures for player2 or a king piece
-            if self.current_player == self.player2 or is_king:
-                # Verifies upper right captures
-                if start[0] - 2 > 0 and start[1] + 2 < self.board.length - 1:
-                    pos = (start[0] - 2, start[1] + 2)
-                    if pos not in self.current_jump:
-                        if self.is_capture_possible\
-                        (start, pos, is_king):
-                            self.current_jump.append(pos)    
-                            if end not in self.current_jump:                                                 
-                                return self.is_capture_possible\
-                                (pos, end, is_king)
-                # Verifies upper left captures
-                if start[0] - 2 > 0 and start[1] - 2 > 0:
-                    pos = (start[0] - 2, start[1] - 2)
-                    if pos not in self.current_jump:
-                        if self.is_capture_possible\
-                        (start, pos, is_king):
-                            self.current_jump.append(pos)            
-                            if end not in self.current_jump:      
-                                return self.is_capture_possible\
-                                (pos, end, is_king)
+                return True
+            jump = (row + 2 * d_row, col + 2 * d_col)
+            if end_piece.color != piece.color and self._on_board(jump) \
+            and self.board.piece_at(jump) is None:
+                return True
         return False
 
     def all_moves(self, piece):
@@ -261,25 +742,23 @@ class Game:
         Returns: 
             [(int, int)]: The possible moves as a list of tuples
         """
-        moves = []
-        for row, pieces in enumerate(self.board.squares):
-            for col, _ in enumerate(pieces):
-                end = (row, col)
-                pos = piece.position
-                if self.board.squares[row][col] != piece:
-                    if self.board.squares[row][col] is None:
-                        # Checks move legality
-                        if abs(end[0] - pos[0]) == 1:
-                            if self.move_legality(piece, end):
-                                moves.append(end)
-                        else:                        
-                        # Checks if capture is possible
-                            if self.move_legality(piece, end):
-                                self.current_jump = []
-                                if self.is_capture_possible\
-                                (pos, end, piece.is_king):
-                                    moves.append(end)
-        return moves
+        return self._ends(self.legal_moves(piece))
+
+    def _ends(self, moves):
+        """
+        Returns the distinct end squares of moves, in order.
+
+        Parameters:
+            moves ([Move]): The moves of a piece
+
+        Returns:
+            [(int, int)]: The end squares
+        """
+        ends = []
+        for move in moves:
+            if move.path[-1] not in ends:
+                ends.append(move.path[-1])
+        return ends
 
     def get_all_moves(self, player):
         """
@@ -296,8 +775,16 @@ class Game:
             moves
         """
         all_moves = {}
+        if self.move_cache is not None:
+            by_start = self._player_moves(player.color)
+        elif self.board.bits is not None:
+            by_start = self._generate_moves(player)
+        else:
+            for piece in player.pieces:
+                all_moves[piece] = self.all_moves(piece)
+            return all_moves
         for piece in player.pieces:
-            all_moves[piece] = self.all_moves(piece)
+            all_moves[piece] = self._ends(by_start.get(piece.position, ()))
         return all_moves
 
     def resign(self, player):
@@ -364,22 +851,14 @@ class Game:
             self.player2.losses += 1
             return self.player1.color
         # Player1 loses the match (no moves left)
-        loser = True
-        for _, moves in self.get_all_moves(self.player1).items():
-            if moves != []:
-                loser = False
-        if loser:
+        if not self.has_moves(self.player1):
             self.player2.wins += 1
             self.player1.losses += 1
             self.winner = self.player2.name
             self.loser = self.player1.name
             return self.player2.color
         # Player2 loses the match (no moves left)
-        loser = True
-        for _, moves in self.get_all_moves(self.player2).items():
-            if moves != []:
-                loser = False
-        if loser:
+        if not self.has_moves(self.player2):
             self.player1.wins += 1
             self.player2.losses += 1
             self.winner = self.player1.name
@@ -388,23 +867,190 @@ class Game:
         # Winner not determined yet
         return None
         
+class MoveCache:
+    """
+    A class that represents a bounded cache of legal moves keyed by position
+    and player, evicting the least recently used position when full.
+    """
+    def __init__(self, size=1024):
+        """
+        Initializes an empty cache.
+
+        Parameters:
+            size (int): The number of entries kept
+        """
+        self.size = size
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        Returns a cached entry and marks it as recently used.
+
+        Parameters:
+            key (tuple): The Zobrist key of the position and the player's
+            color
+
+        Returns:
+            {(int, int): (Move)}: The cached moves, or None if they are not
+            cached
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def peek(self, key):
+        """
+        Returns a cached entry without counting the lookup or marking the
+        entry as recently used.
+
+        Parameters:
+            key (tuple): The Zobrist key of the position and the player's
+            color
+
+        Returns:
+            {(int, int): (Move)}: The cached moves, or None
+        """
+        return self._entries.get(key)
+
+    def put(self, key, entry):
+        """
+        Stores an entry, evicting the least recently used one if the cache
+        is full.
+
+        Parameters:
+            key (tuple): The Zobrist key of the position and the player's
+            color
+            entry ({(int, int): (Move)}): The moves being cached
+
+        Returns: None
+        """
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """
+        Removes every entry, keeping the counters.
+
+        Parameters: None
+
+        Returns: None
+        """
+        self._entries.clear()
+
+    def stats(self):
+        """
+        Returns the cache's counters.
+
+        Parameters: None
+
+        Returns:
+            dict: The size, entries, hits, misses, evictions and hit rate
+        """
+        lookups = self.hits + self.misses
+        return {
+            'size': self.size,
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
 class Board:
     """
     A class that represents the checkers board.
     """
-    def __init__(self,filled_rows):
+    def __init__(self,filled_rows, colors=None, sparse=False):
         """
         Initializes an empty checkers board.
 
         Parameters:
             filled_rows (int): Amount of rows that are filled by pieces for each
             player
+            colors ((str, str)): The colors of the player moving down the board
+            and of the player moving up, in the order their pieces are hashed.
+            Defaults to the order the colors are first placed in
+            sparse (bool): Whether only occupied squares are stored, in a
+            dict keyed by square, instead of a full grid
         """
         self.filled_rows = filled_rows
         self.length = 2 * filled_rows + 2
         # Creates grid for checkers game
-        self.squares = [[None for _ in range(self.length)]\
-            for _ in range(self.length)]
+        if sparse:
+            self.cells = {}
+            self.squares = SparseSquares(self.cells, self.length)
+        else:
+            self.cells = None
+            self.squares = [[None for _ in range(self.length)]\
+                for _ in range(self.length)]
+        # Optional bitboard kept in step with the grid
+        self.bits = None
+        # Counts changes to the board so derived state can be reused
+        self.version = 0
+        # Zobrist key of the pieces on the board
+        self.colors = list(colors) if colors else []
+        self.zobrist = piece_keys(self.length)
+        self.key = 0
+
+    def _piece_key(self, piece, pos, is_king):
+        """
+        Returns the Zobrist number of a piece standing on a square.
+
+        Parameters:
+            piece (Piece): The piece being hashed
+            pos ((int, int)): The square of the piece
+            is_king (bool): Whether the piece is hashed as a king
+
+        Returns:
+            int: The 64-bit Zobrist number
+        """
+        if piece.color not in self.colors:
+            self.colors.append(piece.color)
+        side = self.colors.index(piece.color)
+        return self.zobrist[side][is_king][pos[0] * self.length + pos[1]]
+
+    def piece_at(self, pos):
+        """
+        Returns the piece standing on a square.
+
+        Parameters:
+            pos ((int, int)): The square being looked up
+
+        Returns:
+            Piece: The piece on the square, or None if it is empty
+        """
+        if self.cells is not None:
+            return self.cells.get(pos)
+        return self.squares[pos[0]][pos[1]]
+
+    def place_piece(self, piece):
+        """
+        Places a new piece on the board at its own position.
+
+        Parameters:
+            piece (Piece): The piece being placed
+
+        Returns: None
+        """
+        self.version += 1
+        pos = piece.position
+        if self.cells is not None:
+            self.cells[pos] = piece
+        else:
+            self.squares[pos[0]][pos[1]] = piece
+        self.key ^= self._piece_key(piece, pos, piece.is_king)
+        if self.bits is not None:
+            self.bits.add(piece.color, pos, piece.is_king)
 
     def move_piece(self, piece, end):
         """
@@ -417,13 +1063,43 @@ class Board:
 
         Returns: None
         """
+        self.version += 1
         pos = piece.position
-        self.squares[pos[0]][pos[1]] = None
-        self.squares[end[0]][end[1]] = piece
+        if self.cells is not None:
+            del self.cells[pos]
+            self.cells[end] = piece
+        else:
+            self.squares[pos[0]][pos[1]] = None
+            self.squares[end[0]][end[1]] = piece
         piece.change_position(end)
+        self.key ^= self._piece_key(piece, pos, piece.is_king) \
+            ^ self._piece_key(piece, end, piece.is_king)
+        if self.bits is not None:
+            self.bits.move(pos, end)
         # If piece becomes king
         if end[0] == 0 or end[0] == self.length - 1:
+            if not piece.is_king:
+                self.key ^= self._piece_key(piece, end, False) \
+                    ^ self._piece_key(piece, end, True)
             piece.become_king()
+            if self.bits is not None:
+                self.bits.crown(end)
+
+    def demote_piece(self, piece):
+        """
+        Turns a king back into a man when its crowning move is taken back.
+
+        Parameters:
+            piece (Piece): The piece being demoted
+
+        Returns: None
+        """
+        self.version += 1
+        self.key ^= self._piece_key(piece, piece.position, True) \
+            ^ self._piece_key(piece, piece.position, False)
+        piece.become_man()
+        if self.bits is not None:
+            self.bits.uncrown(piece.position)
 
     def remove_piece(self, piece):
         """
@@ -434,13 +1110,97 @@ class Board:
 
         Returns: None
         """
+        self.version += 1
         pos = piece.position
-        self.squares[pos[0]][pos[1]] = None
+        if self.cells is not None:
+            self.cells.pop(pos, None)
+        else:
+            self.squares[pos[0]][pos[1]] = None
+        self.key ^= self._piece_key(piece, pos, piece.is_king)
+        if self.bits is not None:
+            self.bits.remove(pos)
+
+class SparseSquares:
+    """
+    A class that represents a read and write view of a sparse board as the
+    rows of a grid, so code indexing Board.squares[row][col] keeps working.
+    """
+    __slots__ = ('cells', 'length')
+
+    def __init__(self, cells, length):
+        """
+        Initializes the view.
+
+        Parameters:
+            cells ({(int, int): Piece}): The occupied squares of the board
+            length (int): The number of rows and columns on the board
+        """
+        self.cells = cells
+        self.length = length
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(self.length)[row]]
+        if not 0 <= row < self.length:
+            if -self.length <= row < 0:
+                row += self.length
+            else:
+                raise IndexError('board row out of range')
+        return SparseRow(self.cells, row, self.length)
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        for row in range(self.length):
+            yield SparseRow(self.cells, row, self.length)
+
+class SparseRow:
+    """
+    A class that represents one row of a SparseSquares view.
+    """
+    __slots__ = ('cells', 'row', 'length')
+
+    def __init__(self, cells, row, length):
+        """
+        Initializes the view.
+
+        Parameters:
+            cells ({(int, int): Piece}): The occupied squares of the board
+            row (int): The index of the row
+            length (int): The number of columns on the board
+        """
+        self.cells = cells
+        self.row = row
+        self.length = length
+
+    def __getitem__(self, col):
+        if isinstance(col, slice):
+            return [self.cells.get((self.row, i)) 
+                    for i in range(self.length)[col]]
+        if not -self.length <= col < self.length:
+            raise IndexError('board column out of range')
+        return self.cells.get((self.row, col % self.length))
+
+    def __setitem__(self, col, piece):
+        col %= self.length
+        if piece is None:
+            self.cells.pop((self.row, col), None)
+        else:
+            self.cells[(self.row, col)] = piece
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        for col in range(self.length):
+            yield self.cells.get((self.row, col))
 
 class Piece:
     """
     A class that represents a checkers piece.
     """
+    __slots__ = ('color', 'position', 'is_king')
 
     def __init__(self, color, position):
         """
@@ -464,6 +1224,16 @@ class Piece:
         """
         self.is_king = True
 
+    def become_man(self):
+        """
+        Sets the piece to be a regular piece.
+
+        Parameters: None
+
+        Returns: None
+        """
+        self.is_king = False
+
     def change_position(self, pos):
         """
         Changes the position of the piece.
@@ -474,10 +1244,125 @@ class Piece:
         """
         self.position = pos
 
+class PieceSet:
+    """
+    A class that represents the pieces of a player, indexed both by identity
+    and by square so membership, removal and lookup by square are O(1). It
+    behaves like the list it replaces: pieces iterate in the order they were
+    added, and append, remove, len and indexing work as before.
+    """
+    __slots__ = ('_pieces', '_squares')
+
+    def __init__(self, pieces=()):
+        """
+        Initializes the set with the specified pieces.
+
+        Parameters:
+            pieces ([Piece]): The pieces of the player
+        """
+        self._pieces = {}
+        self._squares = {}
+        for piece in pieces:
+            self.append(piece)
+
+    def __reduce__(self):
+        """
+        Copies and pickles the set as its list of pieces, since the identity
+        index does not survive a copy.
+        """
+        return (PieceSet, (list(self._pieces.values()),))
+
+    def append(self, piece):
+        """
+        Adds a piece at its current position.
+
+        Parameters:
+            piece (Piece): The piece being added
+
+        Returns: None
+        """
+        self._pieces[id(piece)] = piece
+        self._squares[piece.position] = piece
+
+    def remove(self, piece):
+        """
+        Removes a piece.
+
+        Parameters:
+            piece (Piece): The piece being removed
+
+        Returns: None
+
+        Raises:
+            ValueError: If the piece is not in the set
+        """
+        if self._pieces.pop(id(piece), None) is None:
+            raise ValueError('PieceSet.remove(piece): piece not in set')
+        if self._squares.get(piece.position) is piece:
+            del self._squares[piece.position]
+
+    def relocate(self, piece, start):
+        """
+        Moves a piece of the set from its previous square to its current one
+        in the square index.
+
+        Parameters:
+            piece (Piece): The piece that moved
+            start ((int, int)): The square the piece moved from
+
+        Returns: None
+        """
+        if self._squares.get(start) is piece:
+            del self._squares[start]
+        self._squares[piece.position] = piece
+
+    def at(self, square):
+        """
+        Returns the piece of the set standing on a square.
+
+        Parameters:
+            square ((int, int)): The square being looked up
+
+        Returns:
+            Piece: The piece on the square, or None if there is none
+        """
+        piece = self._squares.get(square)
+        if piece is None:
+            return None
+        if piece.position != square or id(piece) not in self._pieces:
+            # Pieces moved outside of Game leave the index stale
+            self._squares = {p.position: p for p in self._pieces.values()}
+            return self._squares.get(square)
+        return piece
+
+    def __contains__(self, piece):
+        return self._pieces.get(id(piece)) is piece
+
+    def __iter__(self):
+        return iter(list(self._pieces.values()))
+
+    def __len__(self):
+        return len(self._pieces)
+
+    def __getitem__(self, index):
+        return list(self._pieces.values())[index]
+
+    def __eq__(self, other):
+        if isinstance(other, (list, PieceSet)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f'PieceSet({list(self._pieces.values())!r})'
+
 class Player:
     """
     A class that represents a player.
     """
+    __slots__ = ('name', 'wins', 'losses', 'draws', 'color', '_pieces')
+
     def __init__(self, name, color):
         """
         Initializes a player with a name and a color.
@@ -493,4 +1378,17 @@ class Player:
         self.draws = 0
         # Player within a checkers game
         self.color = color
-        self.pieces = []
\ No newline at end of file
+        self.pieces = []
+
+    @property
+    def pieces(self):
+        """
+        The player's pieces on the board, as a PieceSet.
+        """
+        return self._pieces
+
+    @pieces.setter
+    def pieces(self, pieces):
+        if not isinstance(pieces, PieceSet):
+            pieces = PieceSet(pieces)
+        self._pieces = pieces
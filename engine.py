@@ -0,0 +1,521 @@
+"""
+Computer player for the checkers game.
+
+EnginePlayer picks its moves with a negamax alpha-beta search over Game.push
+and Game.pop, deepened one ply at a time until a wall-clock budget runs out.
+While its opponent thinks it can ponder: search, in a background thread, the
+position after the reply it expects, and answer at once if that reply is
+played.
+"""
+from collections import namedtuple
+import math
+import threading
+import time
+
+from checkers import Player
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
+
+# Score of a won position, reduced by the number of plies needed to win
+WIN = 100000
+# Scores beyond this are wins or losses a known number of plies away
+MATE = WIN - 1000
+MAN = 100
+KING = 160
+# Bonus per row a man has advanced towards being crowned
+ADVANCE = 3
+
+# The outcome of a search and how much work it took
+SearchResult = namedtuple('SearchResult', ['move', 'score', 'depth', 'nodes',
+                                           'seconds', 'nps'])
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside a search when its time budget runs out.
+    """
+
+
+def opponent(game, player):
+    """
+    Returns the opponent of a player.
+
+    Parameters:
+        game (Game): The game being played
+        player (Player): The player whose opponent is wanted
+
+    Returns:
+        Player: The other player of the game
+    """
+    if player is game.player1:
+        return game.player2
+    return game.player1
+
+
+def evaluate(game):
+    """
+    Returns a static score of the position for the player to move.
+
+    Parameters:
+        game (Game): The game being assessed
+
+    Returns:
+        int: Material and advancement of the player to move minus the
+        opponent's
+    """
+    last_row = game.board.length - 1
+    score = 0
+    for player, sign in ((game.current_player, 1),
+                         (opponent(game, game.current_player), -1)):
+        for piece in player.pieces:
+            if piece.is_king:
+                score += sign * KING
+            elif player is game.player1:
+                score += sign * (MAN + ADVANCE * piece.position[0])
+            else:
+                score += sign * (MAN + ADVANCE * (last_row
+                                                  - piece.position[0]))
+    return score
+
+
+def to_table(score, ply):
+    """
+    Returns a score as stored in the transposition table, where a win or
+    loss counts its plies from the stored position rather than the root.
+
+    Parameters:
+        score (int): The score of a position searched ply plies from the root
+        ply (int): The distance of the position from the root
+
+    Returns:
+        int: The score to store
+    """
+    if score > MATE:
+        return score + ply
+    if score < -MATE:
+        return score - ply
+    return score
+
+
+def from_table(score, ply):
+    """
+    Returns a score read from the transposition table as seen from the root
+    of the current search, undoing to_table.
+
+    Parameters:
+        score (int): The stored score
+        ply (int): The distance of the position from the root
+
+    Returns:
+        int: The score of the position in the current search
+    """
+    if score > MATE:
+        return score - ply
+    if score < -MATE:
+        return score + ply
+    return score
+
+
+class Searcher:
+    """
+    A class that represents an iterative deepening alpha-beta search with
+    a transposition table, killer moves and a history heuristic.
+    """
+    def __init__(self, table=None, tablebase=None):
+        """
+        Initializes a searcher.
+
+        Parameters:
+            table (TranspositionTable): The table to store results in, a new
+            one by default
+            tablebase (Tablebase): Endgame tables whose exact results end
+            the search of the positions they hold
+        """
+        if table is None:
+            table = TranspositionTable()
+        self.table = table
+        self.tablebase = tablebase
+        self.killers = {}
+        self.history = {}
+        self.nodes = 0
+        self.deadline = None
+        # Set from another thread to end a search at its next time check
+        self.stopped = False
+
+    def search(self, game, time_limit, max_depth=64, first_depth=1):
+        """
+        Searches the position of a game for the player to move.
+
+        Parameters:
+            game (Game): The game being searched, restored before returning
+            time_limit (float): The wall-clock budget in seconds
+            max_depth (int): The deepest iteration to search
+            first_depth (int): The depth of the first iteration
+
+        Returns:
+            SearchResult: The best move of the deepest completed iteration,
+            or None as the move if the player cannot move
+        """
+        start = time.perf_counter()
+        self.deadline = start + time_limit
+        self.nodes = 0
+        self.killers = {}
+        moves = self.order(game, game.get_legal_moves(game.current_player),
+                           None, 0)
+        best_move = moves[0] if moves else None
+        best_score = -WIN if not moves else evaluate(game)
+        depth_reached = 0
+        if len(moves) > 1:
+            for depth in range(min(first_depth, max_depth), max_depth + 1):
+                try:
+                    score, move = self._root(game, moves, depth)
+                except SearchTimeout:
+                    break
+                best_score, best_move = score, move
+                depth_reached = depth
+                # Searches the best move first on the next iteration
+                moves.remove(move)
+                moves.insert(0, move)
+                if abs(score) > MATE:
+                    break
+        seconds = time.perf_counter() - start
+        nps = self.nodes / seconds if seconds > 0 else 0.0
+        return SearchResult(best_move, best_score, depth_reached, self.nodes,
+                            seconds, nps)
+
+    def _root(self, game, moves, depth):
+        """
+        Searches every root move to a fixed depth.
+
+        Parameters:
+            game (Game): The game being searched
+            moves ([Move]): The ordered moves of the player to move
+            depth (int): The depth to search to
+
+        Returns:
+            (int, Move): The best score and move
+        """
+        alpha, beta = -WIN - 1, WIN + 1
+        best_move = moves[0]
+        for move in moves:
+            game.push(move)
+            try:
+                score = -self.negamax(game, depth - 1, -beta, -alpha, 1)
+            finally:
+                game.pop()
+            if score > alpha:
+                alpha, best_move = score, move
+        self.table.store(game.key, depth, alpha, EXACT, best_move)
+        return alpha, best_move
+
+    def negamax(self, game, depth, alpha, beta, ply):
+        """
+        Returns the score of the position for the player to move.
+
+        Parameters:
+            game (Game): The game being searched
+            depth (int): The remaining depth
+            alpha (int): The score the player to move is already assured of
+            beta (int): The score the opponent is already assured of
+            ply (int): The distance from the root
+
+        Returns:
+            int: The score of the position
+        """
+        self.nodes += 1
+        if self.nodes & 1023 == 0 \
+                and (self.stopped or time.perf_counter() > self.deadline):
+            raise SearchTimeout()
+        if self.tablebase is not None:
+            found = self.tablebase.probe(game)
+            if found is not None:
+                result, plies = found
+                if result > 0:
+                    return WIN - ply - plies
+                if result < 0:
+                    return -WIN + ply + plies
+                return 0
+        if depth <= 0:
+            return self.quiesce(game, alpha, beta, ply)
+        key = game.key
+        entry = self.table.probe(key)
+        tt_move = None
+        if entry is not None:
+            tt_move = entry.move
+            if entry.depth >= depth:
+                score = from_table(entry.score, ply)
+                if entry.flag == EXACT:
+                    return score
+                if entry.flag == LOWER:
+                    alpha = max(alpha, score)
+                elif entry.flag == UPPER:
+                    beta = min(beta, score)
+                if alpha >= beta:
+                    return score
+        moves = game.get_legal_moves(game.current_player)
+        if not moves:
+            return -WIN + ply
+        original_alpha = alpha
+        best_score, best_move = -WIN - 1, None
+        for move in self.order(game, moves, tt_move, ply):
+            game.push(move)
+            try:
+                score = -self.negamax(game, depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                game.pop()
+            if score > best_score:
+                best_score, best_move = score, move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                if not move.captured:
+                    self._remember_cutoff(move, depth, ply)
+                break
+        if best_score <= original_alpha:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table.store(key, depth, to_table(best_score, ply), flag,
+                         best_move)
+        return best_score
+
+    def quiesce(self, game, alpha, beta, ply):
+        """
+        Returns the score of the position once pending captures are
+        resolved. Captures are optional, so the static score is a floor.
+
+        Parameters:
+            game (Game): The game being searched
+            alpha (int): The score the player to move is already assured of
+            beta (int): The score the opponent is already assured of
+            ply (int): The distance from the root
+
+        Returns:
+            int: The score of the position
+        """
+        self.nodes += 1
+        if self.nodes & 1023 == 0 \
+                and (self.stopped or time.perf_counter() > self.deadline):
+            raise SearchTimeout()
+        if not game.has_moves(game.current_player):
+            return -WIN + ply
+        score = evaluate(game)
+        if score >= beta:
+            return score
+        alpha = max(alpha, score)
+        captures = [move for move in
+                    game.get_legal_moves(game.current_player)
+                    if move.captured]
+        captures.sort(key=lambda move: len(move.captured), reverse=True)
+        for move in captures:
+            game.push(move)
+            try:
+                score = -self.quiesce(game, -beta, -alpha, ply + 1)
+            finally:
+                game.pop()
+            if score >= beta:
+                return score
+            alpha = max(alpha, score)
+        return alpha
+
+    def order(self, game, moves, tt_move, ply):
+        """
+        Sorts moves so the likeliest best ones are searched first: the
+        stored best move, then captures by size, promotions, killer moves
+        and finally by history score.
+
+        Parameters:
+            game (Game): The game being searched
+            moves ([Move]): The moves being sorted
+            tt_move (Move): The best move stored for the position, if any
+            ply (int): The distance from the root
+
+        Returns:
+            [Move]: The sorted moves
+        """
+        killers = self.killers.get(ply, ())
+        # Tables shared between processes only keep the move's end squares
+        if tt_move is not None:
+            tt_squares = (tt_move.path[0], tt_move.path[-1])
+        else:
+            tt_squares = None
+
+        def rank(move):
+            if (move.path[0], move.path[-1]) == tt_squares:
+                return (0, 0)
+            if move.captured:
+                return (1, -len(move.captured))
+            if move.promotion:
+                return (2, 0)
+            if move in killers:
+                return (3, 0)
+            return (4, -self.history.get((move.path[0], move.path[-1]), 0))
+
+        return sorted(moves, key=rank)
+
+    def _remember_cutoff(self, move, depth, ply):
+        """
+        Records a quiet move that caused a cutoff as a killer move and in the
+        history table.
+
+        Parameters:
+            move (Move): The move that caused the cutoff
+            depth (int): The remaining depth of the cutoff
+            ply (int): The distance from the root
+
+        Returns: None
+        """
+        killers = self.killers.setdefault(ply, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+        squares = (move.path[0], move.path[-1])
+        self.history[squares] = self.history.get(squares, 0) + depth * depth
+
+
+class EnginePlayer(Player):
+    """
+    A class that represents a player whose moves are chosen by a search.
+    """
+    def __init__(self, name, color, time_limit=1.0, max_depth=64, book=None,
+                 tablebase=None):
+        """
+        Initializes a computer player.
+
+        Parameters:
+            name (str): The name of the player
+            color (str): The color of the player's pieces
+            time_limit (float): The wall-clock budget per move in seconds
+            max_depth (int): The deepest iteration to search
+            book (OpeningBook): Moves played without searching while the
+            position is in the book
+            tablebase (Tablebase): Endgame tables the search plays perfectly
+            from
+        """
+        super().__init__(name, color)
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.book = book
+        self.searcher = Searcher(tablebase=tablebase)
+        # Result of the most recent search
+        self.last_search = None
+        # Background search of the position after the expected reply: the
+        # thread, the position's key, when it started and its result
+        self._ponder_thread = None
+        self._ponder_key = None
+        self._ponder_start = None
+        self._ponder_result = None
+        self.ponder_hits = 0
+        self.ponder_misses = 0
+
+    def ponder(self, game):
+        """
+        Starts searching, in a background thread, the position after the
+        opponent's expected move: the best reply stored by this player's
+        last search. Without an expected move, the opponent's position
+        itself is searched, which still fills the table. Does nothing if
+        already pondering.
+
+        Parameters:
+            game (Game): The game being played, with the opponent to move;
+            it is copied, so it may change while the search runs
+
+        Returns: None
+        """
+        if self._ponder_thread is not None:
+            return
+        copy = game.clone()
+        # The move cache is not safe to share between threads
+        copy.move_cache = None
+        moves = copy.get_legal_moves(copy.current_player)
+        if not moves:
+            return
+        entry = self.searcher.table.probe(copy.key)
+        if entry is not None and entry.move is not None:
+            squares = (entry.move.path[0], entry.move.path[-1])
+            for move in moves:
+                if (move.path[0], move.path[-1]) == squares:
+                    copy.push(move)
+                    break
+        self._ponder_key = copy.key
+        self._ponder_start = time.perf_counter()
+        self._ponder_result = None
+        self.searcher.stopped = False
+        self._ponder_thread = threading.Thread(target=self._ponder,
+                                               args=(copy,), daemon=True)
+        self._ponder_thread.start()
+
+    def _ponder(self, game):
+        """
+        Searches a position until stopped, in the pondering thread.
+        """
+        self._ponder_result = self.searcher.search(game, math.inf,
+                                                   self.max_depth)
+
+    def stop_pondering(self):
+        """
+        Stops the background search and waits for it to finish.
+
+        Parameters: None
+
+        Returns:
+            (int, SearchResult): The key of the position searched and the
+            deepest completed iteration, or None if not pondering
+        """
+        if self._ponder_thread is None:
+            return None
+        self.searcher.stopped = True
+        self._ponder_thread.join()
+        self.searcher.stopped = False
+        self._ponder_thread = None
+        return self._ponder_key, self._ponder_result
+
+    def choose_move(self, game):
+        """
+        Searches the game for this player's next move.
+
+        Parameters:
+            game (Game): The game being played, with this player to move
+
+        Returns:
+            Move: The chosen move, or None if the player cannot move
+        """
+        pondered = self.stop_pondering()
+        if self.book is not None:
+            move = self.book.choose_move(game)
+            if move is not None:
+                self.last_search = SearchResult(move, 0, 0, 0, 0.0, 0.0)
+                return move
+        if pondered is not None:
+            key, result = pondered
+            if key == game.key and result is not None and result.depth:
+                self.ponder_hits += 1
+                self.last_search = self._continue(game, result)
+                return self.last_search.move
+            self.ponder_misses += 1
+        self.last_search = self.searcher.search(game, self.time_limit,
+                                                self.max_depth)
+        return self.last_search.move
+
+    def _continue(self, game, pondered):
+        """
+        Returns the result of a pondered search, deepened with what is left
+        of the time budget once the time spent pondering is counted.
+
+        Parameters:
+            game (Game): The game being played, in the pondered position
+            pondered (SearchResult): The deepest iteration of the pondering
+
+        Returns:
+            SearchResult: The deeper of the two searches
+        """
+        remaining = self.time_limit - pondered.seconds
+        if remaining <= 0 or pondered.depth >= self.max_depth \
+                or abs(pondered.score) > MATE:
+            return pondered
+        result = self.searcher.search(game, remaining, self.max_depth,
+                                      first_depth=pondered.depth + 1)
+        if result.depth <= pondered.depth:
+            return pondered
+        return result
@@ -0,0 +1,238 @@
+"""
+Call counters and timers for the rule checks of checkers.Game.
+
+Instrumentation wraps the methods of one Game instance while it is active
+and removes the wrappers when stopped, so a game that is not instrumented
+runs the plain class methods with no added cost. Times are inclusive: a
+call to get_all_moves also counts in all_moves.
+
+While active it also counts the squares the grid core inspects, the moves
+either core generates (moves served from a move cache are not generated
+again) and the deepest capture chain the grid core follows. Snapshots are plain
+dicts, and can be written as JSON lines every few seconds.
+
+Run as a script to profile random games played through the rules API:
+
+    python instrument.py --games 20 --filled-rows 3 --interval 1
+"""
+import argparse
+import json
+import random
+import sys
+import time
+
+from checkers import Game, Player
+
+# Methods whose calls are counted and timed
+TIMED = ('all_moves', 'get_all_moves', 'move_legality',
+         'is_capture_possible', 'get_winner', 'make_move', 'legal_moves',
+         'get_legal_moves')
+# Methods that generate moves, for one piece or for all of a player's
+GENERATORS = ('_piece_moves', '_generate_moves')
+
+
+class Instrumentation:
+    """
+    A class that represents the counters of one instrumented game.
+    """
+    def __init__(self, game, interval=None, stream=None):
+        """
+        Initializes the counters of a game, without instrumenting it yet.
+
+        Parameters:
+            game (Game): The game being instrumented, which may be replaced
+            while the instrumentation is stopped
+            interval (float): Seconds between JSON lines written to stream,
+            or None to only take snapshots on request
+            stream: The file JSON lines are written to, sys.stdout by default
+        """
+        self.game = game
+        self.interval = interval
+        self.stream = stream
+        self.active = False
+        self.reset()
+
+    def reset(self):
+        """
+        Sets every counter back to zero.
+
+        Parameters: None
+
+        Returns: None
+        """
+        self.calls = {name: 0 for name in TIMED}
+        self.seconds = {name: 0.0 for name in TIMED}
+        self.squares_scanned = 0
+        self.moves_produced = 0
+        self.chain_depth = 0
+        self.max_chain_depth = 0
+        self.started = time.perf_counter()
+        self._last_emit = self.started
+
+    def start(self):
+        """
+        Wraps the game's methods so their calls are counted.
+
+        Parameters: None
+
+        Returns:
+            Instrumentation: This object, for chaining
+        """
+        if self.active:
+            return self
+        game = self.game
+        for name in TIMED:
+            setattr(game, name, self._timed(name, getattr(game, name)))
+        for name in GENERATORS:
+            setattr(game, name, self._counted(getattr(game, name)))
+        on_board = game._on_board
+        capture_chains = game._capture_chains
+
+        def counted_on_board(pos):
+            self.squares_scanned += 1
+            return on_board(pos)
+
+        def counted_capture_chains(*args):
+            self.chain_depth += 1
+            if self.chain_depth > self.max_chain_depth:
+                self.max_chain_depth = self.chain_depth
+            try:
+                return capture_chains(*args)
+            finally:
+                self.chain_depth -= 1
+        game._on_board = counted_on_board
+        game._capture_chains = counted_capture_chains
+        self.active = True
+        return self
+
+    def stop(self):
+        """
+        Removes the wrappers, leaving the counters as they are.
+
+        Parameters: None
+
+        Returns: None
+        """
+        if not self.active:
+            return
+        for name in TIMED + GENERATORS + ('_on_board', '_capture_chains'):
+            del self.game.__dict__[name]
+        self.active = False
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _timed(self, name, method):
+        """
+        Returns a wrapper of a bound method that counts and times its calls.
+        """
+        calls, seconds = self.calls, self.seconds
+        clock = time.perf_counter
+
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                rv = method(*args, **kwargs)
+            finally:
+                calls[name] += 1
+                seconds[name] += clock() - start
+            if self.interval is not None \
+                    and start - self._last_emit >= self.interval:
+                self.emit()
+            return rv
+        return wrapper
+
+    def _counted(self, method):
+        """
+        Returns a wrapper of a bound move generator that counts the moves it
+        returns, as a list or by square.
+        """
+        def wrapper(*args):
+            rv = method(*args)
+            if isinstance(rv, dict):
+                self.moves_produced += sum(len(moves) for moves in rv.values())
+            else:
+                self.moves_produced += len(rv)
+            return rv
+        return wrapper
+
+    def snapshot(self):
+        """
+        Returns the counters as a dict.
+
+        Parameters: None
+
+        Returns:
+            dict: The calls, total seconds and microseconds per call of each
+            method, the squares scanned, moves produced, deepest capture
+            chain and the seconds since the counters were reset
+        """
+        methods = {}
+        for name in TIMED:
+            calls = self.calls[name]
+            methods[name] = {
+                'calls': calls,
+                'seconds': self.seconds[name],
+                'us_per_call': 1e6 * self.seconds[name] / calls
+                if calls else 0.0,
+            }
+        return {
+            'elapsed': time.perf_counter() - self.started,
+            'methods': methods,
+            'squares_scanned': self.squares_scanned,
+            'moves_produced': self.moves_produced,
+            'max_chain_depth': self.max_chain_depth,
+        }
+
+    def emit(self):
+        """
+        Writes a snapshot to the stream as one JSON line.
+
+        Parameters: None
+
+        Returns: None
+        """
+        self._last_emit = time.perf_counter()
+        stream = self.stream if self.stream is not None else sys.stdout
+        stream.write(json.dumps(self.snapshot()) + '\n')
+        stream.flush()
+
+
+def main():
+    """
+    Plays random games through the rules API the interactive game uses and
+    writes the counters as JSON lines.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--games', type=int, default=20)
+    parser.add_argument('--filled-rows', type=int, default=3)
+    parser.add_argument('--max-moves', type=int, default=200)
+    parser.add_argument('--interval', type=float, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    stats = Instrumentation(None, args.interval)
+    for _ in range(args.games):
+        stats.game = Game(Player('Player 1', 'red'),
+                          Player('Player 2', 'white'), args.filled_rows)
+        with stats:
+            game = stats.game
+            for _ in range(args.max_moves):
+                if game.get_winner() is not None:
+                    break
+                moves = game.get_all_moves(game.current_player)
+                piece = rng.choice([piece for piece in moves if moves[piece]])
+                end = rng.choice(moves[piece])
+                if game.move_legality(piece, end):
+                    game.is_capture_possible(piece.position, end,
+                                             piece.is_king)
+                game.make_move(piece, end)
+                game._switch_player()
+    stats.emit()
+
+
+if __name__ == '__main__':
+    main()
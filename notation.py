@@ -0,0 +1,80 @@
+"""
+Square and move names shared by the server and the analysis tools.
+
+A square is written as its row number followed by its column letters, as in
+playgame, such as 3b for (2, 1), and a move joins the squares of its path
+with '-', such as 3b-5d-7b. Columns past z continue as aa, ab, ..., az, ba
+and so on, so every board the server accepts has a name for each square.
+"""
+
+
+def format_square(square):
+    """
+    Returns the name of a square, such as 3b.
+
+    Parameters:
+        square ((int, int)): The row and column of the square
+
+    Returns:
+        str: The row number followed by the column letters
+    """
+    col = square[1] + 1
+    letters = ''
+    while col:
+        col, letter = divmod(col - 1, 26)
+        letters = chr(letter + ord('a')) + letters
+    return f'{square[0] + 1}{letters}'
+
+
+def parse_square(name):
+    """
+    Returns the square of a name such as 3b.
+
+    Parameters:
+        name (str): The row number followed by the column letters
+
+    Returns:
+        (int, int): The row and column of the square
+
+    Raises:
+        ValueError: If the name is not a square name
+    """
+    name = name.strip().lower()
+    letters = name.lstrip('0123456789')
+    digits = name[:len(name) - len(letters)]
+    if not digits or not letters or \
+            not all('a' <= letter <= 'z' for letter in letters):
+        raise ValueError(f'bad square {name!r}')
+    col = 0
+    for letter in letters:
+        col = col * 26 + ord(letter) - ord('a') + 1
+    return int(digits) - 1, col - 1
+
+
+def format_move(move):
+    """
+    Returns the name of a move, its squares joined by '-'.
+
+    Parameters:
+        move (Move): The move being named
+
+    Returns:
+        str: The name of the move, such as 3b-5d
+    """
+    return '-'.join(format_square(square) for square in move.path)
+
+
+def parse_move(name):
+    """
+    Returns the path of a move name such as 3b-5d.
+
+    Parameters:
+        name (str): The squares of the move joined by '-'
+
+    Returns:
+        ((int, int)): The squares the move visits
+
+    Raises:
+        ValueError: If a part of the name is not a square name
+    """
+    return tuple(parse_square(square) for square in name.split('-'))
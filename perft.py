@@ -0,0 +1,178 @@
+"""
+Perft: counting the leaves of the legal move tree of a checkers position.
+
+The counts exercise every part of move generation, so they serve both as a
+throughput benchmark (leaves/sec) and as the correctness oracle any new move
+generator must match. REFERENCE holds the counts of the starting positions.
+
+Run as a script to print a divide per root move, or to check the grid,
+bitboard and sparse cores against the reference counts:
+
+    python perft.py --filled-rows 3 --depth 6 --divide --workers 4
+    python perft.py --verify
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import json
+import time
+
+from checkers import Game, Player
+
+# Leaf counts of the starting position by filled_rows, for depths 0, 1, ...
+REFERENCE = {
+    1: [1, 3, 9, 16, 29, 47, 74, 136, 272, 583, 1301],
+    2: [1, 5, 25, 141, 770, 4222, 22599, 118535, 610154],
+    3: [1, 7, 49, 379, 2872, 23582, 190647, 1607272],
+}
+
+
+def perft(game, depth):
+    """
+    Returns the number of leaves of the move tree of a game's position.
+
+    Parameters:
+        game (Game): The game being counted, restored before returning
+        depth (int): The number of plies to look ahead
+
+    Returns:
+        int: The number of move sequences of exactly depth plies
+    """
+    if depth == 0:
+        return 1
+    moves = game.get_legal_moves(game.current_player)
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        game.push(move)
+        nodes += perft(game, depth - 1)
+        game.pop()
+    return nodes
+
+
+def _divide_worker(game, move, depth):
+    """
+    Counts the leaves below one root move in a worker process.
+
+    Parameters:
+        game (Game): A copy of the game being counted
+        move (Move): The root move
+        depth (int): The number of plies to look ahead from the root
+
+    Returns:
+        int: The number of leaves below the root move
+    """
+    game.push(move)
+    return perft(game, depth - 1)
+
+
+def divide(game, depth, workers=None):
+    """
+    Returns the leaf count below each root move, optionally counting the
+    root moves on a process pool.
+
+    Parameters:
+        game (Game): The game being counted, left unchanged
+        depth (int): The number of plies to look ahead, at least 1
+        workers (int): The number of processes, or None to count in this
+        process
+
+    Returns:
+        [(Move, int)]: Each root move and its leaf count
+    """
+    moves = game.get_legal_moves(game.current_player)
+    if workers is None:
+        counts = []
+        for move in moves:
+            game.push(move)
+            counts.append(perft(game, depth - 1))
+            game.pop()
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            counts = list(executor.map(_divide_worker, [game] * len(moves),
+                                       moves, [depth] * len(moves)))
+    return list(zip(moves, counts))
+
+
+def new_game(filled_rows, bitboard=False):
+    """
+    Returns a game in its starting position.
+
+    Parameters:
+        filled_rows (int): The number of rows with pieces for each player
+        bitboard (bool): Whether the game runs on the bitboard core
+
+    Returns:
+        Game: The new game
+    """
+    return Game(Player('Player 1', 'red'), Player('Player 2', 'white'),
+                filled_rows, bitboard)
+
+
+def verify(max_leaves=10 ** 6, **options):
+    """
+    Checks the counts of the starting positions against REFERENCE.
+
+    Parameters:
+        max_leaves (int): Depths with more reference leaves are skipped
+        options: Keyword arguments of Game, such as bitboard=True
+
+    Returns:
+        [str]: A description of every mismatch, empty if all counts match
+    """
+    errors = []
+    for filled_rows, counts in REFERENCE.items():
+        for depth, expected in enumerate(counts):
+            if expected > max_leaves:
+                break
+            game = Game(Player('Player 1', 'red'),
+                        Player('Player 2', 'white'), filled_rows, **options)
+            found = perft(game, depth)
+            if found != expected:
+                errors.append(f'filled_rows={filled_rows} depth={depth}: '
+                              f'{found} leaves, expected {expected}')
+    return errors
+
+
+def main():
+    """
+    Prints a perft count with its leaves/sec as JSON, or verifies the
+    reference counts.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--filled-rows', type=int, default=3)
+    parser.add_argument('--depth', type=int, default=5)
+    parser.add_argument('--bitboard', action='store_true')
+    parser.add_argument('--divide', action='store_true')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--verify', action='store_true')
+    args = parser.parse_args()
+    if args.verify:
+        failed = False
+        cores = {'grid': {}, 'bitboard': {'bitboard': True},
+                 'sparse': {'sparse': True}}
+        for name, options in cores.items():
+            for error in verify(**options):
+                failed = True
+                print(f'{name}: {error}')
+        print('FAILED' if failed else 'OK')
+        raise SystemExit(1 if failed else 0)
+    game = new_game(args.filled_rows, args.bitboard)
+    start = time.perf_counter()
+    if args.divide or args.workers:
+        counts = divide(game, args.depth, args.workers)
+        leaves = sum(count for _, count in counts)
+    else:
+        counts = []
+        leaves = perft(game, args.depth)
+    seconds = time.perf_counter() - start
+    for move, count in counts:
+        print(json.dumps({'path': move.path, 'captured': move.captured,
+                          'leaves': count}))
+    print(json.dumps({'filled_rows': args.filled_rows, 'depth': args.depth,
+                      'leaves': leaves, 'seconds': seconds,
+                      'leaves_per_sec': leaves / seconds if seconds else 0.0}))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,11 @@
-from checkers import Game, Board, Player, Piece
-from typing import Tuple
-import checkers as ch
-import colorama 
-import copy
-from termcolor import colored
+import sys
+import weakref
+from checkers import Game, Player
+from render import BoardRenderer
+from typing import Tuple, TYPE_CHECKING
 
-colorama.init()
+if TYPE_CHECKING:
+    from engine import EnginePlayer
 
 WELCOME = "\n************************************************************\n" \
           "*                                                          *\n" \
@@ -15,6 +15,39 @@ WELCOME = "\n************************************************************\n" \
 
 TEXT_COLORS_LST = ['red', 'green', 'blue', 'magenta', 'cyan', 'white']
 
+# Seconds the computer may think about each move
+ENGINE_TIME_LIMIT = 1.0
+
+# Positions whose legal moves are kept while prompting for a move
+MOVE_CACHE_SIZE = 64
+
+# The renderer of each game being played, kept so that every frame after the
+# first only rewrites the cells that changed
+_renderers = weakref.WeakKeyDictionary()
+
+# termcolor's colored, imported the first time anything is rendered
+_colored = None
+
+def colored(text: str, color: str) -> str:
+    """
+    Wraps text in the terminal codes of a color. colorama and termcolor are
+    only imported on the first call, so importing this module stays cheap
+    for headless use.
+
+    Input:
+        text: The text to color.
+        color: A termcolor color name.
+    Output:
+        The colored text.
+    """
+    global _colored
+    if _colored is None:
+        import colorama
+        from termcolor import colored as termcolor_colored
+        colorama.init()
+        _colored = termcolor_colored
+    return _colored(text, color)
+
 def get_int_input(prompt, default=None, min_val=None, max_val=None) -> int:
     """
     Gets an integer input from the user, with optional constraints.
@@ -75,11 +108,12 @@ def get_color_input(prompt, color_lst) -> Tuple[bool, str]:
         else:
             print(colored("Invalid input. Please enter a color from the options\n", "red"))
 
-def get_piece_prompt(prompt: str, to_move_there: str) -> Tuple[bool, int, int]:
+def get_piece_prompt(game: Game, prompt: str, to_move_there: bool) -> Tuple[bool, int, int]:
     """
     Prompt to get the piece position from user input in formal rowcol format.
 
     Input:
+        game: The game being played.
         prompt: A string containing the prompt to display.
         to_move_there: A boolean value that is True if the input is for the position to move to,
         and False if the input is for the piece to move.
@@ -99,7 +133,7 @@ def get_piece_prompt(prompt: str, to_move_there: str) -> Tuple[bool, int, int]:
         if (len(raw_input) == 2 and raw_input[0].isdigit()) or (len(raw_input) == 3 and raw_input[0:2].isdigit()):
             
             try:
-                row, col = get_row_col(raw_input, to_move_there)
+                row, col = get_row_col(game, raw_input, to_move_there)
                 return True, row, col
             except ValueError: 
                 print(colored("Invalid input. Please enter a valid position in formal rowcol (eg 1a) \n", "red"))
@@ -121,93 +155,31 @@ def fill_row_prompt() -> int:
                          default=default, min_val=1)
     return rv
 
-def print_board(board: list, length, real: bool) -> None:
+def print_board(game: Game, board: list = None, real: bool = True) -> None:
     """
-    Iterates over a Board object and returns a string representation
-    of what the board looks like. 
-    Pass in the current board or a board that highlights all moves.
+    Prints the board of a game, or a copy of it that highlights potential
+    moves, in a single write. The game keeps one renderer in diff mode, so
+    the board stays at the top of the screen and later frames only rewrite
+    the cells that changed.
 
     Input:
-        array
+        game: The game whose players' colors mark the pieces.
+        board: The rows of squares to print, the game's board by default.
+        real: False if the board highlights potential moves.
     Output:
         None
     """
-    FLOOR = "+---"
-    FLOOR_END = "+"
-    WALL = "|   "
-    WALL_END = "|"
-    POT_MOVE = "| * "
-    rv = []
-    even_rows = FLOOR * length + FLOOR_END
-
-    # Create an array of strings of the board
-    for row_i, row in enumerate(board):
-        rv.append(even_rows)
-        temp = []
-        for sq_i, sq in enumerate(row):
-            if sq is not None:
-                if isinstance(sq, str):
-                    if sq == "potential":
-                        temp.append(POT_MOVE)
-                        if sq_i == (length -1):
-                            temp.append(WALL_END + f" {row_i +1}")
-                elif isinstance(sq, ch.Piece):
-                    if sq.color == p1_color:
-                        if sq.is_king:
-                            temp.append(P1_COLOR_BIGGER)
-                        else:
-                            temp.append(P1_COLOR_SMALLER)
-                        if sq_i == (length -1):
-                            temp.append(WALL_END + f" {row_i +1}")
-                    elif sq.color == p2_color:
-                        if sq.is_king:
-                            temp.append(P2_COLOR_BIGGER)
-                        else:
-                            temp.append(P2_COLOR_SMALLER)
-                        if sq_i == (length -1):
-                            temp.append(WALL_END + f" {row_i +1}")
-
-            else:
-                if sq_i == (length -1):
-                    temp.append(WALL + WALL_END + f" {row_i +1}")
-                else:
-                    temp.append(WALL)
-
-        rv.append(''.join(temp))
-    rv.append(even_rows)
-    rv.append((f"  {chr(i+65)} ") for i in range(length))
-    
-    # Determine Header of the baord
-    if real:
-        print(colored("\nCurrent Board", "yellow"))
-    else:
-        print(colored("\nPotential Moves", "yellow"))
-
-    # Print the board with color
-    for i, lst in enumerate(rv):
-        acc = ""
-        for string in lst:
-            acc += string
-        if i == len(rv) -1:
-            print(acc)
-            break
-        for char in acc:
-            # There cannot be any colors in the list that start with the same color
-            if char == p1_color[0] or char == p1_color[0].upper():
-                print(colored(char, f'{p1_color}'), end='')
-            elif char == p2_color[0] or char == p2_color[0].upper():
-                print(colored(char, f'{p2_color}'), end='')
-            elif char == "*":
-                print(colored(char, "yellow"), end='')
-            else:
-                print(char, end='')
-        print()
+    renderer = _renderers.get(game)
+    if renderer is None:
+        renderer = _renderers[game] = BoardRenderer(game, diff=True)
+    renderer.draw(board, real)
 
-def get_row_col(input_string: str, to_move_there: bool) -> Tuple[int, int]: 
+def get_row_col(game: Game, input_string: str, to_move_there: bool) -> Tuple[int, int]: 
     """
     Gets the row and column coordinates from a user input string.
 
     Input:
+        game: The game whose board the position is on.
         input_string: A string representing a chess board position in the format of "rowcol" (e.g. "1a").
         to_move_there: A boolean value indicating if the piece must exist in the input position.
 
@@ -223,22 +195,32 @@ def get_row_col(input_string: str, to_move_there: bool) -> Tuple[int, int]:
 
     row = int(input_string[:bound]) - 1
     col = ord(input_string[bound:]) - ord('a')
-    if row >= g.board.length or col >= g.board.length:
+    if row >= game.board.length or col >= game.board.length:
         raise ValueError()
-    if g.board.squares[row][col] is None and not to_move_there:
+    if game.board.piece_at((row, col)) is None and not to_move_there:
         raise ValueError()
     return row, col
 
 def convert_tuple_to_coordinate(tup: tuple) -> str:
+    """
+    Converts a (row, col) square to the rowcol format shown to players.
+
+    Input:
+        tup: The row and column of the square.
+
+    Output:
+        The square in rowcol format (eg 1A).
+    """
     row = tup[0] + 1
     col = chr(tup[1] + 65)
     return f"{row}{col}"
 
-def confirm_draw(player: Player) -> bool:
+def confirm_draw(game: Game, player: Player) -> bool:
     """
     Confirms if a player wants to draw the match and returns the result.
 
     Input:
+        game: The game being played.
         player: The player to confirmt the match draw
 
     Output:
@@ -251,14 +233,15 @@ def confirm_draw(player: Player) -> bool:
         return False
     elif draw_match is False:
         print(colored("> Other player did not accept draw!\n", "red"))
-        g._switch_player()
+        game._switch_player()
         return True
     
-def print_clone_board(board: list, potential) -> None:
+def print_clone_board(game: Game, board: list, potential) -> None:
     """
     Prints a clone board with highlighted potential moves.
 
     Input:
+        game: The game the board was cloned from.
         board: A list representing the game board.
         potential: A list of tuples representing potential moves.
 
@@ -269,38 +252,50 @@ def print_clone_board(board: list, potential) -> None:
         for clone_col_i, _ in enumerate(clone_row):
             if (clone_row_i, clone_col_i) in potential:
                 board[clone_row_i][clone_col_i] = "potential"
-    print_board(board, len(board), False)
+    print_board(game, board, False)
+
+def player_choice(game: Game, user_input: str, current: Player):
+    """
+    Carries out the menu option a player picked.
 
-def player_choice(user_input: str, current: Player):
+    Input:
+        game: The game being played.
+        user_input: The option picked from the menu.
+        current: The player to move.
+
+    Output:
+        False if the match ended in a draw or forfeit, None otherwise.
+    """
     user_input = user_input.lower().strip()
 
     if user_input == 'm': 
-        _, curr_pos_row, curr_pos_col = get_piece_prompt(f"> {current.name}, what piece do you want to move? rowcol (eg 1a)\n", False)
-        _, new_pos_row, new_pos_col = get_piece_prompt(f"> {current.name}, where do you want to move it to? rowcol (eg 1a)\n", True)
-        status = g.make_move(g.board.squares[curr_pos_row][curr_pos_col], (new_pos_row, new_pos_col))
+        _, curr_pos_row, curr_pos_col = get_piece_prompt(game, f"> {current.name}, what piece do you want to move? rowcol (eg 1a)\n", False)
+        _, new_pos_row, new_pos_col = get_piece_prompt(game, f"> {current.name}, where do you want to move it to? rowcol (eg 1a)\n", True)
+        status = game.make_move(game.board.squares[curr_pos_row][curr_pos_col], (new_pos_row, new_pos_col))
         if not status:
             print(colored("> This move is not valid. Try again.", 'red'))
-            return player_choice(user_input, current)
+            return player_choice(game, user_input, current)
 
     elif user_input == 'p': # Potential move
-        _, curr_pos_row, curr_pos_col = get_piece_prompt(f"> {current.name}, what piece do you want to see the potential moves for (eg 1a)?\n", False)
-        if g.board.squares[curr_pos_row][curr_pos_col] is None:
+        _, curr_pos_row, curr_pos_col = get_piece_prompt(game, f"> {current.name}, what piece do you want to see the potential moves for (eg 1a)?\n", False)
+        if game.board.squares[curr_pos_row][curr_pos_col] is None:
             raise ValueError()
 
-        clone = copy.deepcopy(g.board.squares)        
+        # Only the grid is marked up, so the pieces themselves are shared
+        clone = [row[:] for row in game.board.squares]
         piece = clone[curr_pos_row][curr_pos_col]
-        pm_lst = g.all_moves(piece)
+        pm_lst = game.all_moves(piece)
         in_board_form = []
         for tup in pm_lst:
             in_board_form.append(convert_tuple_to_coordinate(tup))
         print(colored(f'\n> Potential moves include:\n{", ".join(in_board_form)}\n', 'yellow'))
 
-        print_clone_board(clone, pm_lst)
-        g._switch_player()
+        print_clone_board(game, clone, pm_lst)
+        game._switch_player()
 
     elif user_input == 'a': # All potential moves
-        d =  g.get_all_moves(current)
-        clone = copy.deepcopy(g.board.squares)
+        d =  game.get_all_moves(current)
+        clone = [row[:] for row in game.board.squares]
         pm = []
         moves = ""
         for key in d: # Key is a piece object
@@ -312,61 +307,126 @@ def player_choice(user_input: str, current: Player):
                 moves += (key_temp + "\n")     
 
         print(colored(f"> All potential moves include:\n{moves}", 'yellow'))
-        print_clone_board(clone, pm)
+        print_clone_board(game, clone, pm)
         
-        g._switch_player()
+        game._switch_player()
 
     elif user_input == 'd': # Draw match
         draw_match = get_yes_no_input(f"{current.name}, are you sure you want to draw the match? (y/n)\n")
         if draw_match:
-            if current is g.player1:
-                return confirm_draw(g.player2)
-            elif current is g.player2:
-                return confirm_draw(g.player1)
+            if current is game.player1:
+                return confirm_draw(game, game.player2)
+            elif current is game.player2:
+                return confirm_draw(game, game.player1)
 
     elif user_input == 'f': # Forfeit match
         forfeit_match = get_yes_no_input(f"{current.name}, are you sure you want to forfeit the match? (y/n)\n")
         if forfeit_match:
-            if current is g.player1:
-                winner = g.player2
-            elif current is g.player2:
-                winner = g.player1
+            if current is game.player1:
+                winner = game.player2
+            elif current is game.player2:
+                winner = game.player1
             print(colored(f'{current.name} has forfeited the match. {winner.name} wins!', "yellow"))
             return False
         else:
             print(colored("> Invalid input. Try again.\n", "red"))
-            return player_choice(user_input, current)
+            return player_choice(game, user_input, current)
 
     else:
-        g._switch_player()
+        game._switch_player()
         print(colored("> Invalid input. Try again.\n", "red"))
 
-def play_checkers(board: Board) -> None:
+def play_checkers(game: Game) -> None:
     """
     Plays checkers game, alternating turns between two players until the game is over or forfeited.
 
     Input:
-        board: a CheckersBoard instance representing the game board
+        game: The game to play, with its pieces in place
 
     Output:
         None
     """
-    while True:
-        current = g.current_player
-        print_board(g.board.squares, g.board.length, True)
+    engines = [player for player in (game.player1, game.player2)
+               if is_engine(player)]
+    try:
+        while True:
+            current = game.current_player
+            print_board(game)
+
+            if is_engine(current):
+                rv = engine_turn(game, current)
+            else:
+                # The computer thinks while the human types
+                for engine in engines:
+                    engine.ponder(game)
+                user_input = print_options(current)
 
-        user_input = print_options(current)
+                rv = player_choice(game, user_input, current)
 
-        rv = player_choice(user_input, current)
+            if game.get_winner() is not None:
+                print(colored(f'{current.name}, you are the winner!', "yellow"))
+                break
 
-        if g.get_winner() is not None:
-            print(colored(f'{current.name}, you are the winner!', "yellow"))
-            break
+            if rv is False: # There is a draw or forfeit, message printed earlier
+                break
 
-        if rv is False: # There is a draw or forfeit, message printed earlier
-            break
-    
-        g._switch_player()
+            game._switch_player()
+    finally:
+        for engine in engines:
+            engine.stop_pondering()
+
+def is_engine(player: Player) -> bool:
+    """
+    Checks whether the computer plays for a player. The engine module is
+    only imported once a computer player is created, so a game between
+    humans never loads it.
+
+    Input:
+        player: The player being checked.
+
+    Output:
+        True if the player is an EnginePlayer, False otherwise.
+    """
+    engine = sys.modules.get('engine')
+    return engine is not None and isinstance(player, engine.EnginePlayer)
+
+def engine_turn(game: Game, current: 'EnginePlayer') -> bool:
+    """
+    Lets a computer player search for and make its move.
+
+    Input:
+        game: The game being played.
+        current: The computer player to move.
+
+    Output:
+        False if the computer has no move, None otherwise.
+    """
+    move = current.choose_move(game)
+    if move is None:
+        return False
+    start = move.path[0]
+    game.make_move(game.board.squares[start[0]][start[1]], move)
+    path = "-".join(convert_tuple_to_coordinate(tup) for tup in move.path)
+    result = current.last_search
+    print(colored(f"> {current.name} plays {path}", "yellow"))
+    print(colored(f"  (depth {result.depth}, {result.nodes} nodes, "
+                  f"{result.nps:.0f} nodes/sec)", "yellow"))
+
+def new_player(name: str, color: str) -> Player:
+    """
+    Creates a human or computer player depending on the user's choice.
+
+    Input:
+        name: The name of the player.
+        color: The color of the player's pieces.
+
+    Output:
+        A Player, or an EnginePlayer if the computer plays this chair.
+    """
+    if get_yes_no_input(f"> Should the computer play for {name}? (y/n)\n"):
+        from engine import EnginePlayer
+        return EnginePlayer(name, color, ENGINE_TIME_LIMIT)
+    return Player(name, color)
 
 def print_options(current: Player) -> str:
     """
@@ -386,36 +446,49 @@ def print_options(current: Player) -> str:
               "    'f' to forfeit match\n"
     return input(colored(options, "black"))
 
-def print_text_colors() -> str:
+def print_text_colors(color_lst) -> str:
     """
     Displays a list of available text colors for the user to choose from.
 
+    Input:
+        color_lst: The colors still available.
+
     Output:
         A string prompt that lists the available text colors.
     """
-    rv = ", ".join(TEXT_COLORS_LST)
+    rv = ", ".join(color_lst)
     return f'> Pick a color from the following: {rv}\n'
 
-# Introduction message
-print(colored(WELCOME, 'yellow'))
-
-# Initialize player name and player color
-player1_name = input(colored("> What is the name of Player 1?\n", "black"))
-_, p1_color = get_color_input(print_text_colors(), TEXT_COLORS_LST)
-TEXT_COLORS_LST.remove(p1_color)
-player2_name = input(colored("> What is the name of Player 2\n", "black"))
-_, p2_color = get_color_input(print_text_colors(), TEXT_COLORS_LST)
-filled_rows = fill_row_prompt()
-
-# Create string of player color (regular piece and king piece)
-P1_COLOR_SMALLER = f'| {p1_color[0].lower()} ' 
-P1_COLOR_BIGGER = f'| {p1_color[0].upper()} '
-P2_COLOR_SMALLER = f'| {p2_color[0].lower()} ' 
-P2_COLOR_BIGGER = f'| {p2_color[0].upper()} '
-
-# Initialize game
-g = Game(Player(player1_name, p1_color), Player(player2_name, p2_color), filled_rows)
-g.initialize_pieces()
-
-# Play game (while loop)
-play_checkers(g.board)
\ No newline at end of file
+def main() -> None:
+    """
+    Asks for the players and the board size, then plays a game in the
+    terminal.
+
+    Input:
+        None
+
+    Output:
+        None
+    """
+    # Introduction message
+    print(colored(WELCOME, 'yellow'))
+
+    # Initialize player name and player color
+    colors = list(TEXT_COLORS_LST)
+    player1_name = input(colored("> What is the name of Player 1?\n", "black"))
+    _, p1_color = get_color_input(print_text_colors(colors), colors)
+    colors.remove(p1_color)
+    player2_name = input(colored("> What is the name of Player 2\n", "black"))
+    _, p2_color = get_color_input(print_text_colors(colors), colors)
+    filled_rows = fill_row_prompt()
+
+    # Initialize game
+    game = Game(new_player(player1_name, p1_color), new_player(player2_name, p2_color), filled_rows,
+                move_cache=MOVE_CACHE_SIZE)
+    game.initialize_pieces()
+
+    # Play game (while loop)
+    play_checkers(game)
+
+if __name__ == '__main__':
+    main()
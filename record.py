@@ -0,0 +1,541 @@
+"""
+Compact binary archives of checkers games, with PDN import and export.
+
+An archive starts with MAGIC and holds records back to back. Each record is
+a fixed header (RECORD), the players' names and colors as UTF-8 separated by
+NUL bytes, and the moves as 16-bit little-endian square units. A unit is the
+square's index row * length + col, and the last square of every move has
+LAST set, so a move of n squares takes n units and capture chains are kept
+exactly.
+
+Writing and reading stream one record at a time. RecordIndex memory-maps an
+archive for random access to game N, keeping the record offsets in a
+memory-mapped .idx file next to it. Random access is per game, not per move:
+moves take a variable number of units, so reaching move M of a game means
+decoding its record.
+
+Run as a script to convert between archives and PDN:
+
+    python record.py games.ckr --to-pdn games.pdn
+    python record.py games.ckr --from-pdn games.pdn
+"""
+import argparse
+from array import array
+from collections import namedtuple
+import mmap
+import os
+import re
+import struct
+import sys
+
+from checkers import Game, Player
+
+MAGIC = b'CKR1'
+# Total size in bytes, filled rows, result, size of the names, move units
+RECORD = struct.Struct('<IBbHI')
+# Flag of the unit holding the last square of a move
+LAST = 0x8000
+# Squares are indexed in 15 bits, so boards are at most 181 squares wide
+MAX_LENGTH = 181
+
+# The result of a game: the number of the winning player, or one of these
+DRAW = 0
+UNFINISHED = -1
+
+# An index holds the size of the archive it was built for, then the offset
+# of every record
+INDEX_SUFFIX = '.idx'
+OFFSET = struct.Struct('<Q')
+
+# A game as its size, its players as (name, color), its result and the path
+# of every move in order
+GameRecord = namedtuple('GameRecord', ['filled_rows', 'player1', 'player2',
+                                       'result', 'moves'])
+
+
+def record_game(game, moves, result=UNFINISHED):
+    """
+    Returns the record of a game played from the starting position.
+
+    Parameters:
+        game (Game): The game, for its size and players
+        moves ([Move]): The moves played, in order
+        result (int): 1 or 2 for the winner, DRAW or UNFINISHED
+
+    Returns:
+        GameRecord: The record of the game
+    """
+    return GameRecord((game.board.length - 2) // 2,
+                      (game.player1.name, game.player1.color),
+                      (game.player2.name, game.player2.color),
+                      result, [tuple(move.path) for move in moves])
+
+
+def replay(record, **options):
+    """
+    Plays the moves of a record through a new Game.
+
+    Parameters:
+        record (GameRecord): The game being replayed
+        options: Keyword arguments of Game, such as bitboard=True
+
+    Returns:
+        Game: The game after the last move, with the next player to move
+
+    Raises:
+        ValueError: If a move is not legal in its position
+    """
+    game = Game(Player(*record.player1), Player(*record.player2),
+                record.filled_rows, **options)
+    for number, path in enumerate(record.moves):
+        for move in game.get_legal_moves(game.current_player):
+            if move.path == path:
+                break
+        else:
+            raise ValueError(f'Illegal move {number + 1}: {path}')
+        game.make_move(game.board.piece_at(path[0]), move)
+        game._switch_player()
+    return game
+
+
+def encode(record):
+    """
+    Returns the bytes of a record.
+
+    Parameters:
+        record (GameRecord): The game being encoded
+
+    Returns:
+        bytes: The header, names and move units
+
+    Raises:
+        ValueError: If the board is too large or a name holds a NUL byte
+    """
+    length = 2 * record.filled_rows + 2
+    if length > MAX_LENGTH:
+        raise ValueError(f'Boards wider than {MAX_LENGTH} cannot be recorded')
+    fields = (*record.player1, *record.player2)
+    if any('\0' in field for field in fields):
+        raise ValueError('Player names and colors cannot hold NUL bytes')
+    names = '\0'.join(fields).encode()
+    units = array('H')
+    for path in record.moves:
+        for row, col in path[:-1]:
+            units.append(row * length + col)
+        row, col = path[-1]
+        units.append(row * length + col | LAST)
+    if sys.byteorder != 'little':
+        units.byteswap()
+    body = units.tobytes()
+    size = RECORD.size + len(names) + len(body)
+    return RECORD.pack(size, record.filled_rows, record.result, len(names),
+                       len(units)) + names + body
+
+
+def decode(data, offset=0):
+    """
+    Returns the record stored at an offset of a buffer.
+
+    Parameters:
+        data (bytes): A buffer holding the record, such as an mmap
+        offset (int): The position of the record's header
+
+    Returns:
+        GameRecord: The decoded game
+
+    Raises:
+        ValueError: If the header does not describe a whole record
+    """
+    size, filled_rows, result, names_size, count = \
+        RECORD.unpack_from(data, offset)
+    if size != RECORD.size + names_size + 2 * count \
+            or offset + size > len(data):
+        raise ValueError('Corrupt game record')
+    start = offset + RECORD.size
+    fields = bytes(data[start:start + names_size]).decode().split('\0')
+    start += names_size
+    units = array('H')
+    units.frombytes(data[start:start + 2 * count])
+    if sys.byteorder != 'little':
+        units.byteswap()
+    length = 2 * filled_rows + 2
+    moves, path = [], []
+    for unit in units:
+        square = unit & ~LAST
+        path.append(divmod(square, length))
+        if unit & LAST:
+            moves.append(tuple(path))
+            path = []
+    return GameRecord(filled_rows, tuple(fields[:2]), tuple(fields[2:]),
+                      result, moves)
+
+
+class RecordWriter:
+    """
+    A class that represents an archive being written one game at a time.
+    """
+    def __init__(self, stream):
+        """
+        Initializes a writer, writing MAGIC first if the stream is at its
+        start.
+
+        Parameters:
+            stream: A binary file open for writing or appending
+        """
+        self.stream = stream
+        if stream.tell() == 0:
+            stream.write(MAGIC)
+        self.count = 0
+
+    def write(self, record):
+        """
+        Appends a game to the archive.
+
+        Parameters:
+            record (GameRecord): The game being written
+
+        Returns: None
+        """
+        self.stream.write(encode(record))
+        self.count += 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stream.flush()
+
+
+def read_records(stream):
+    """
+    Reads the games of an archive one at a time.
+
+    Parameters:
+        stream: A binary file positioned at the start of an archive
+
+    Yields:
+        GameRecord: Each game, in the order written
+
+    Raises:
+        ValueError: If the stream is not an archive or ends mid-record
+    """
+    for data in read_record_data(stream):
+        yield decode(data)
+
+
+def read_record_data(stream):
+    """
+    Reads the records of an archive one at a time without decoding them, so
+    a caller can decode each one on its own.
+
+    Parameters:
+        stream: A binary file positioned at the start of an archive
+
+    Yields:
+        bytes: Each record, as decode reads it
+
+    Raises:
+        ValueError: If the stream is not an archive or ends mid-record
+    """
+    if stream.read(len(MAGIC)) != MAGIC:
+        raise ValueError('Not a game archive')
+    while True:
+        header = stream.read(RECORD.size)
+        if not header:
+            return
+        if len(header) < RECORD.size:
+            raise ValueError('Truncated game archive')
+        size = RECORD.unpack(header)[0]
+        if size < RECORD.size:
+            raise ValueError('Corrupt game record')
+        body = stream.read(size - RECORD.size)
+        if len(body) < size - RECORD.size:
+            raise ValueError('Truncated game archive')
+        yield header + body
+
+
+class RecordIndex:
+    """
+    A class that represents random access to the games of an archive. The
+    archive and its offsets are memory-mapped, so opening a large archive
+    reads neither.
+    """
+    def __init__(self, path):
+        """
+        Opens an archive, building its index file if it is missing or was
+        built for an archive of another size.
+
+        Parameters:
+            path (str): The path of the archive
+
+        Raises:
+            ValueError: If the file is not an archive or a record header is
+            corrupt
+        """
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._data[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError('Not a game archive')
+        index_path = path + INDEX_SUFFIX
+        if not self._index_matches(index_path, size):
+            try:
+                self._build_index(index_path, size)
+            except ValueError:
+                self.close()
+                raise
+        self._index_file = open(index_path, 'rb')
+        self._index = mmap.mmap(self._index_file.fileno(), 0,
+                                access=mmap.ACCESS_READ)
+
+    @staticmethod
+    def _index_matches(index_path, size):
+        """
+        Returns whether an index file was built for an archive of a size.
+        """
+        try:
+            with open(index_path, 'rb') as index:
+                stamp = index.read(OFFSET.size)
+        except FileNotFoundError:
+            return False
+        return len(stamp) == OFFSET.size and OFFSET.unpack(stamp)[0] == size
+
+    def _build_index(self, index_path, size):
+        """
+        Writes the archive size and the offset of every record, found by
+        hopping over record headers.
+        """
+        offsets = array('Q', [size])
+        offset = len(MAGIC)
+        while offset < size:
+            offsets.append(offset)
+            if offset + RECORD.size > size:
+                raise ValueError('Truncated game archive')
+            record_size = RECORD.unpack_from(self._data, offset)[0]
+            if record_size < RECORD.size:
+                raise ValueError('Corrupt game record')
+            offset += record_size
+        if offset > size:
+            raise ValueError('Truncated game archive')
+        if sys.byteorder != 'little':
+            offsets.byteswap()
+        with open(index_path, 'wb') as index:
+            offsets.tofile(index)
+
+    def __len__(self):
+        """
+        Returns the number of games in the archive.
+        """
+        return len(self._index) // OFFSET.size - 1
+
+    def __getitem__(self, number):
+        """
+        Returns game number N of the archive, counting from 0.
+        """
+        if number < 0:
+            number += len(self)
+        if not 0 <= number < len(self):
+            raise IndexError('game number out of range')
+        offset = OFFSET.unpack_from(self._index,
+                                    OFFSET.size * (number + 1))[0]
+        return decode(self._data, offset)
+
+    def close(self):
+        """
+        Unmaps the archive and its index.
+
+        Parameters: None
+
+        Returns: None
+        """
+        if getattr(self, '_index', None) is not None:
+            self._index.close()
+            self._index_file.close()
+            self._index = None
+        self._data.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# PDN results from the first player's point of view, as in English draughts
+PDN_RESULTS = {1: '2-0', 2: '0-2', DRAW: '1-1', UNFINISHED: '*'}
+PDN_TAG = re.compile(r'\[(\w+)\s+"([^"]*)"\]')
+
+
+def _pdn_square(square, length):
+    """
+    Returns the PDN number of a dark square, counting from 1 along the rows.
+    """
+    row, col = square
+    return row * (length // 2) + col // 2 + 1
+
+
+def _board_square(number, length):
+    """
+    Returns the square of a PDN number.
+    """
+    row, rank = divmod(number - 1, length // 2)
+    return row, 2 * rank + (1 if row % 2 == 0 else 0)
+
+
+def to_pdn(record):
+    """
+    Returns a game in Portable Draughts Notation. The first player is Black,
+    who moves first, and the board size is kept in a FilledRows tag.
+
+    Parameters:
+        record (GameRecord): The game being exported
+
+    Returns:
+        str: The tags and move text of the game
+    """
+    length = 2 * record.filled_rows + 2
+    result = PDN_RESULTS[record.result]
+    lines = [f'[Black "{record.player1[0]}"]',
+             f'[White "{record.player2[0]}"]',
+             f'[Result "{result}"]',
+             f'[FilledRows "{record.filled_rows}"]', '']
+    words = []
+    for number, path in enumerate(record.moves):
+        if number % 2 == 0:
+            words.append(f'{number // 2 + 1}.')
+        # Every jump moves two rows, every step one
+        separator = 'x' if abs(path[1][0] - path[0][0]) == 2 else '-'
+        words.append(separator.join(str(_pdn_square(square, length))
+                                    for square in path))
+    words.append(result)
+    line = ''
+    for word in words:
+        if len(line) + len(word) >= 80:
+            lines.append(line)
+            line = ''
+        line = f'{line} {word}' if line else word
+    lines.append(line)
+    return '\n'.join(lines) + '\n'
+
+
+def read_pdn(stream):
+    """
+    Reads the games of a PDN file one at a time. Players get the colors
+    'red' and 'white', and games without a FilledRows tag are 8x8.
+
+    Parameters:
+        stream: A text file holding PDN games
+
+    Yields:
+        GameRecord: Each game, in the order of the file
+    """
+    for text in split_pdn(stream):
+        yield parse_pdn(text)
+
+
+def split_pdn(stream):
+    """
+    Reads the text of the games of a PDN file one at a time without parsing
+    them, so a caller can parse each one on its own.
+
+    Parameters:
+        stream: A text file holding PDN games
+
+    Yields:
+        str: The tag lines and move text of each game
+    """
+    lines, has_moves = [], False
+    for line in stream:
+        line = line.strip()
+        if line.startswith('['):
+            if has_moves:
+                yield '\n'.join(lines)
+                lines, has_moves = [], False
+            lines.append(line)
+        elif line:
+            lines.append(line)
+            has_moves = True
+    if lines:
+        yield '\n'.join(lines)
+
+
+def parse_pdn(text):
+    """
+    Returns the record of one PDN game, as read by read_pdn.
+
+    Parameters:
+        text (str): The tag lines and move text of the game
+
+    Returns:
+        GameRecord: The game
+
+    Raises:
+        ValueError: If a tag or a move cannot be read
+    """
+    tags, moves_text = {}, []
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith('['):
+            for name, value in PDN_TAG.findall(line):
+                tags[name] = value
+        elif line:
+            moves_text.append(line)
+    return _pdn_game(tags, ' '.join(moves_text))
+
+
+def _pdn_game(tags, text):
+    """
+    Returns the record of the tags and move text of one PDN game.
+    """
+    filled_rows = int(tags.get('FilledRows', 3))
+    length = 2 * filled_rows + 2
+    results = {value: key for key, value in PDN_RESULTS.items()}
+    results.update({'1-0': 1, '0-1': 2, '1/2-1/2': DRAW})
+    result = results.get(tags.get('Result', '*'), UNFINISHED)
+    # Comments, move numbers and results are not moves
+    text = re.sub(r'\{[^}]*\}|\([^)]*\)', ' ', text)
+    moves = []
+    for word in text.split():
+        if re.fullmatch(r'\d+\.+', word) or word in results or word == '*':
+            continue
+        numbers = re.split(r'[-x]', re.sub(r'^\d+\.+', '', word))
+        moves.append(tuple(_board_square(int(number), length)
+                           for number in numbers))
+    return GameRecord(filled_rows, (tags.get('Black', 'Player 1'), 'red'),
+                      (tags.get('White', 'Player 2'), 'white'), result,
+                      moves)
+
+
+def main():
+    """
+    Converts an archive to PDN or a PDN file to an archive, then prints the
+    number of games converted.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('archive')
+    direction = parser.add_mutually_exclusive_group(required=True)
+    direction.add_argument('--to-pdn', metavar='PDN')
+    direction.add_argument('--from-pdn', metavar='PDN')
+    args = parser.parse_args()
+    count = 0
+    if args.to_pdn:
+        with open(args.archive, 'rb') as archive, \
+                open(args.to_pdn, 'w') as pdn:
+            for record in read_records(archive):
+                if count:
+                    pdn.write('\n')
+                pdn.write(to_pdn(record))
+                count += 1
+    else:
+        with open(args.from_pdn) as pdn, open(args.archive, 'wb') as archive:
+            writer = RecordWriter(archive)
+            for record in read_pdn(pdn):
+                writer.write(record)
+                count += 1
+    print(count)
+
+
+if __name__ == '__main__':
+    main()
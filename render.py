@@ -0,0 +1,263 @@
+"""
+Buffered terminal rendering of checkers boards.
+
+A BoardRenderer builds a whole frame as one string, with ANSI colour codes
+applied per cell, and hands it to the terminal in a single write. In diff
+mode the board is pinned to the top of the screen and later frames only
+rewrite the cells that changed, which keeps large boards and spectator
+views responsive.
+
+Run as a script to watch a game of random moves redrawn in place:
+
+    python render.py --filled-rows 10 --diff --delay 0.05
+"""
+import argparse
+import random
+import sys
+import time
+
+from checkers import Game, Player, Piece
+
+# ANSI foreground codes of the termcolor color names
+COLORS = {
+    'black': 30, 'red': 31, 'green': 32, 'yellow': 33, 'blue': 34,
+    'magenta': 35, 'cyan': 36, 'white': 37,
+}
+RESET = '\x1b[0m'
+HOME = '\x1b[H'
+CLEAR_SCREEN = '\x1b[2J'
+CLEAR_BELOW = '\x1b[J'
+
+FLOOR = '+---'
+FLOOR_END = '+'
+# Width of a cell in characters, and the offset of its mark within it
+CELL_WIDTH = 4
+MARK_OFFSET = 2
+
+# Lines above the first floor: a blank line and the title
+TITLE_LINES = 2
+
+# Set once colorama has been set up for the terminal
+_terminal_ready = False
+
+
+def paint(text, color):
+    """
+    Returns text wrapped in the ANSI codes of a color.
+
+    Parameters:
+        text (str): The text being colored
+        color (str): A key of COLORS
+
+    Returns:
+        str: The colored text
+    """
+    return f'\x1b[{COLORS[color]}m{text}{RESET}'
+
+
+def _move_to(line, column):
+    """
+    Returns the ANSI code moving the cursor to a 0-based line and column
+    of the screen.
+    """
+    return f'\x1b[{line + 1};{column + 1}H'
+
+
+class BoardRenderer:
+    """
+    A class that represents the terminal view of a game's board.
+    """
+    def __init__(self, game, stream=None, diff=False):
+        """
+        Initializes a renderer.
+
+        Parameters:
+            game (Game): The game whose board is drawn
+            stream: The file frames are written to, sys.stdout by default
+            diff (bool): Whether to redraw only the cells that changed
+            since the previous frame
+        """
+        self.game = game
+        self.stream = stream
+        self.diff = diff
+        # Marks and title of the frame on screen, for diff mode
+        self._cells = None
+        self._title = None
+        self._marks = {}
+
+    def _mark(self, square):
+        """
+        Returns the colored mark of a square: the first letter of the
+        piece's color, in capitals for a king, a yellow '*' for a potential
+        move, or a space.
+
+        Parameters:
+            square: A Piece, the string 'potential', or None
+
+        Returns:
+            str: The mark, with its ANSI codes
+        """
+        if isinstance(square, Piece):
+            key = (square.color, square.is_king)
+            mark = self._marks.get(key)
+            if mark is None:
+                letter = square.color[0]
+                letter = letter.upper() if square.is_king else letter.lower()
+                mark = paint(letter, square.color) \
+                    if square.color in COLORS else letter
+                self._marks[key] = mark
+            return mark
+        if square == 'potential':
+            return paint('*', 'yellow')
+        return ' '
+
+    def marks(self, board=None):
+        """
+        Returns the mark of every square of a board.
+
+        Parameters:
+            board ([[]]): The rows of squares, the game's board by default
+
+        Returns:
+            [[str]]: The mark of each square, row by row
+        """
+        if board is None:
+            board = self.game.board.squares
+        return [[self._mark(square) for square in row] for row in board]
+
+    @staticmethod
+    def _title_line(real):
+        """
+        Returns the colored title of a frame.
+        """
+        return paint('Current Board' if real else 'Potential Moves', 'yellow')
+
+    def frame(self, board=None, real=True):
+        """
+        Returns the text of a whole frame.
+
+        Parameters:
+            board ([[]]): The rows of squares to draw, the game's board by
+            default, possibly with 'potential' marks
+            real (bool): False if the board highlights potential moves
+
+        Returns:
+            str: The frame, ending with a newline
+        """
+        return self._frame(self.marks(board), real)
+
+    def _frame(self, cells, real):
+        """
+        Returns the text of a frame from the marks of its squares.
+        """
+        length = len(cells)
+        floor = FLOOR * length + FLOOR_END
+        lines = ['', self._title_line(real)]
+        for row_i, row in enumerate(cells):
+            lines.append(floor)
+            lines.append(''.join(f'| {mark} ' for mark in row)
+                         + f'| {row_i + 1}')
+        lines.append(floor)
+        lines.append(''.join(f'  {chr(i + 65)} ' for i in range(length)))
+        return '\n'.join(lines) + '\n'
+
+    def draw(self, board=None, real=True):
+        """
+        Writes a frame to the stream in one write. In diff mode the first
+        frame clears the screen and later ones rewrite only changed cells,
+        leaving the cursor below the board.
+
+        Parameters:
+            board ([[]]): The rows of squares to draw, the game's board by
+            default
+            real (bool): False if the board highlights potential moves
+
+        Returns: None
+        """
+        cells = self.marks(board)
+        if not self.diff:
+            text = self._frame(cells, real)
+        elif self._cells is None or len(self._cells) != len(cells):
+            text = HOME + CLEAR_SCREEN + self._frame(cells, real)
+        else:
+            text = self._changes(cells, real)
+        if self.diff:
+            self._cells, self._title = cells, real
+        self._write(text)
+
+    def _changes(self, cells, real):
+        """
+        Returns the ANSI codes rewriting the cells and title that differ
+        from the frame on screen.
+        """
+        parts = []
+        if real != self._title:
+            parts.append(_move_to(TITLE_LINES - 1, 0) + '\x1b[2K'
+                         + self._title_line(real))
+        for row_i, (old, new) in enumerate(zip(self._cells, cells)):
+            line = TITLE_LINES + 2 * row_i + 1
+            for col_i, mark in enumerate(new):
+                if mark != old[col_i]:
+                    parts.append(_move_to(line, CELL_WIDTH * col_i
+                                          + MARK_OFFSET) + mark)
+        # The cursor goes back below the board, clearing older prompts
+        parts.append(_move_to(TITLE_LINES + 2 * len(cells) + 2, 0)
+                     + CLEAR_BELOW)
+        return ''.join(parts)
+
+    def invalidate(self):
+        """
+        Forgets the frame on screen, so the next frame is drawn in full.
+
+        Parameters: None
+
+        Returns: None
+        """
+        self._cells = None
+        self._title = None
+
+    def _write(self, text):
+        """
+        Writes text to the stream and flushes it, setting up colorama the
+        first time the terminal is written to.
+        """
+        global _terminal_ready
+        stream = self.stream
+        if stream is None:
+            if not _terminal_ready:
+                import colorama
+                colorama.init()
+                _terminal_ready = True
+            stream = sys.stdout
+        stream.write(text)
+        stream.flush()
+
+
+def main():
+    """
+    Draws a game of random moves until it ends or reaches the move limit.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--filled-rows', type=int, default=3)
+    parser.add_argument('--moves', type=int, default=200)
+    parser.add_argument('--delay', type=float, default=0.1)
+    parser.add_argument('--diff', action='store_true')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    game = Game(Player('Player 1', 'red'), Player('Player 2', 'white'),
+                args.filled_rows)
+    renderer = BoardRenderer(game, diff=args.diff)
+    renderer.draw()
+    for _ in range(args.moves):
+        if game.get_winner() is not None:
+            break
+        move = rng.choice(game.get_legal_moves(game.current_player))
+        game.make_move(game.board.piece_at(move.path[0]), move)
+        game._switch_player()
+        time.sleep(args.delay)
+        renderer.draw()
+
+
+if __name__ == '__main__':
+    main()
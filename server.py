@@ -0,0 +1,363 @@
+"""
+Asyncio server hosting many checkers games over a line protocol.
+
+Every connection is an isolated session owning at most one checkers.Game at a
+time, and all sessions share one event loop, so idle games cost a socket and
+a few objects rather than a thread. Requests and responses are single lines
+of space-separated words:
+
+    NEW [filled_rows]   -> OK <filled_rows> <player to move>
+    BOARD               -> OK <rows separated by />
+    MOVES               -> OK <move> <move> ...
+    MOVE <move>         -> OK <player to move>, or END <winner> <reason>
+    QUIT                -> BYE
+
+Players are 1 and 2, and squares and moves are named as in notation.py: a
+square is its row number then its column letters (a to z, then aa, ab,
+...), and a move joins its squares with '-', e.g. 3b-5d-7b. Any request that cannot be served is
+answered with ERR <message>.
+
+A player who does not move within the move timeout loses the game, and a
+session without a game is closed after the idle timeout. Each session reads
+its next request only once its last response has been flushed, so a client
+that stops reading only stalls itself.
+
+Run as a script to serve on TCP or on a Unix socket:
+
+    python server.py --port 8765
+    python server.py --unix /tmp/checkers.sock
+"""
+import argparse
+import asyncio
+import inspect
+import json
+
+from checkers import NO_MOVES, NO_PIECES, Game, Player
+from notation import format_move, parse_move
+
+# Why a game ended, besides the reasons of checkers
+TIMEOUT = 'timeout'
+
+# Longest request line accepted, in bytes
+LINE_LIMIT = 4096
+
+# Positions whose legal moves each session keeps, since clients list the
+# moves of a position before playing one
+MOVE_CACHE_SIZE = 16
+
+
+class Session:
+    """
+    A class that represents the game of one connection. It only parses and
+    answers requests, so it can be driven without a socket.
+    """
+    def __init__(self, filled_rows=3, max_rows=50):
+        """
+        Initializes a session without a game.
+
+        Parameters:
+            filled_rows (int): The number of rows NEW fills by default
+            max_rows (int): The largest number of filled rows NEW accepts
+        """
+        self.filled_rows = filled_rows
+        self.max_rows = max_rows
+        self.game = None
+        # Counts the turns played, so a new turn can be told from the last
+        self.turn = 0
+        # Set once the client has asked to disconnect
+        self.closed = False
+
+    def _number(self, player):
+        """
+        Returns 1 for the first player of the game and 2 for the second.
+        """
+        return 1 if player is self.game.player1 else 2
+
+    def handle(self, line):
+        """
+        Answers one request line.
+
+        Parameters:
+            line (str): The request, without its line ending
+
+        Returns:
+            str: The response, without its line ending
+        """
+        words = line.split()
+        if not words:
+            return 'ERR empty request'
+        command, args = words[0].upper(), words[1:]
+        handler = getattr(self, f'_do_{command.lower()}', None)
+        if handler is None:
+            return f'ERR unknown command {command}'
+        try:
+            inspect.signature(handler).bind(*args)
+        except TypeError:
+            return f'ERR wrong number of arguments for {command}'
+        try:
+            return handler(*args)
+        except ValueError as error:
+            return f'ERR {error}'
+
+    def _do_new(self, filled_rows=None):
+        """
+        Starts a new game, abandoning the current one.
+        """
+        rows = self.filled_rows if filled_rows is None else int(filled_rows)
+        if not 1 <= rows <= self.max_rows:
+            raise ValueError(f'filled_rows must be 1 to {self.max_rows}')
+        self.game = Game(Player('Player 1', 'red'),
+                         Player('Player 2', 'white'), rows,
+                         move_cache=MOVE_CACHE_SIZE)
+        self.turn += 1
+        return f'OK {rows} 1'
+
+    def _require_game(self):
+        """
+        Raises ValueError if the session has no game in progress.
+        """
+        if self.game is None:
+            raise ValueError('no game, send NEW first')
+
+    def _do_board(self):
+        """
+        Returns the board, one character per square: '.' for an empty
+        square, x and o for the men of players 1 and 2, X and O for kings.
+        """
+        self._require_game()
+        rows = []
+        for row in self.game.board.squares:
+            cells = []
+            for piece in row:
+                if piece is None:
+                    cells.append('.')
+                else:
+                    mark = 'x' if piece.color == self.game.player1.color \
+                        else 'o'
+                    cells.append(mark.upper() if piece.is_king else mark)
+            rows.append(''.join(cells))
+        return 'OK ' + '/'.join(rows)
+
+    def _do_moves(self):
+        """
+        Returns the legal moves of the player to move.
+        """
+        self._require_game()
+        moves = self.game.get_legal_moves(self.game.current_player)
+        return ' '.join(['OK'] + [format_move(move) for move in moves])
+
+    def _do_move(self, name):
+        """
+        Makes a move of the player to move and passes the turn.
+        """
+        self._require_game()
+        path = parse_move(name)
+        game = self.game
+        for move in game.get_legal_moves(game.current_player):
+            if move.path == path:
+                break
+        else:
+            raise ValueError(f'illegal move {name}')
+        game.make_move(game.board.piece_at(path[0]), move)
+        game._switch_player()
+        self.turn += 1
+        color = game.get_winner()
+        if color is not None:
+            loser = game.player2 if color == game.player1.color \
+                else game.player1
+            reason = NO_PIECES if not loser.pieces else NO_MOVES
+            self.game = None
+            return f'END {1 if loser is game.player2 else 2} {reason}'
+        return f'OK {self._number(game.current_player)}'
+
+    def timeout(self):
+        """
+        Ends the game because the player to move ran out of time.
+
+        Parameters: None
+
+        Returns:
+            str: The END response, or None if no game is in progress
+        """
+        if self.game is None:
+            return None
+        winner = 2 if self.game.current_player is self.game.player1 else 1
+        self.game = None
+        return f'END {winner} {TIMEOUT}'
+
+    def _do_quit(self):
+        """
+        Ends the session.
+        """
+        self.closed = True
+        return 'BYE'
+
+
+class GameServer:
+    """
+    A class that represents the server and every session it hosts.
+    """
+    def __init__(self, filled_rows=3, move_timeout=60.0, idle_timeout=300.0,
+                 max_sessions=10000):
+        """
+        Initializes a server.
+
+        Parameters:
+            filled_rows (int): The number of rows NEW fills by default
+            move_timeout (float): The seconds a player has for each move
+            idle_timeout (float): The seconds a session may stay without a
+            game
+            max_sessions (int): The number of sessions served at once; more
+            connections are turned away
+        """
+        self.filled_rows = filled_rows
+        self.move_timeout = move_timeout
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.sessions = set()
+        self.stats = {'sessions': 0, 'rejected': 0, 'requests': 0,
+                      'timeouts': 0}
+
+    async def start_tcp(self, host='127.0.0.1', port=8765):
+        """
+        Starts serving on a TCP socket.
+
+        Parameters:
+            host (str): The address to listen on
+            port (int): The port to listen on, 0 for any free port
+
+        Returns:
+            asyncio.Server: The listening server
+        """
+        return await asyncio.start_server(self.handle, host, port,
+                                          limit=LINE_LIMIT)
+
+    async def start_unix(self, path):
+        """
+        Starts serving on a Unix socket.
+
+        Parameters:
+            path (str): The path of the socket
+
+        Returns:
+            asyncio.Server: The listening server
+        """
+        return await asyncio.start_unix_server(self.handle, path,
+                                               limit=LINE_LIMIT)
+
+    async def _send(self, writer, line):
+        """
+        Writes a response line and waits until the transport can take more,
+        so output never piles up for a client that does not read it.
+        """
+        writer.write(line.encode() + b'\n')
+        await writer.drain()
+
+    async def handle(self, reader, writer):
+        """
+        Serves one connection until it quits, times out or disconnects.
+
+        Parameters:
+            reader (asyncio.StreamReader): The connection's input
+            writer (asyncio.StreamWriter): The connection's output
+
+        Returns: None
+        """
+        if len(self.sessions) >= self.max_sessions:
+            self.stats['rejected'] += 1
+            try:
+                await self._send(writer, 'ERR server full')
+            finally:
+                writer.close()
+            return
+        session = Session(self.filled_rows)
+        self.sessions.add(session)
+        self.stats['sessions'] += 1
+        loop = asyncio.get_running_loop()
+        # The turn the move deadline was set for
+        turn, deadline = None, None
+        try:
+            await self._send(writer, 'HELLO checkers 1')
+            while not session.closed:
+                if session.game is None:
+                    timeout = self.idle_timeout
+                else:
+                    # Requests other than a move do not extend the turn
+                    if session.turn != turn:
+                        turn = session.turn
+                        deadline = loop.time() + self.move_timeout
+                    timeout = max(0.0, deadline - loop.time())
+                try:
+                    raw = await asyncio.wait_for(reader.readline(), timeout)
+                except asyncio.TimeoutError:
+                    self.stats['timeouts'] += 1
+                    response = session.timeout()
+                    if response is None:
+                        break
+                    await self._send(writer, response)
+                    continue
+                except ValueError:
+                    # The line is longer than LINE_LIMIT
+                    await self._send(writer, 'ERR line too long')
+                    break
+                if not raw:
+                    break
+                self.stats['requests'] += 1
+                line = raw.decode(errors='replace').strip()
+                await self._send(writer, session.handle(line))
+        except ConnectionError:
+            pass
+        finally:
+            self.sessions.discard(session)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+
+async def serve(server, host='127.0.0.1', port=8765, unix=None):
+    """
+    Runs a game server until it is cancelled.
+
+    Parameters:
+        server (GameServer): The server to run
+        host (str): The address to listen on over TCP
+        port (int): The port to listen on over TCP
+        unix (str): The path of a Unix socket to listen on instead of TCP
+
+    Returns: None
+    """
+    if unix is not None:
+        listener = await server.start_unix(unix)
+    else:
+        listener = await server.start_tcp(host, port)
+    async with listener:
+        await listener.serve_forever()
+
+
+def main():
+    """
+    Serves checkers games until interrupted, then prints the server's
+    counters as JSON.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', default=None)
+    parser.add_argument('--filled-rows', type=int, default=3)
+    parser.add_argument('--move-timeout', type=float, default=60.0)
+    parser.add_argument('--idle-timeout', type=float, default=300.0)
+    parser.add_argument('--max-sessions', type=int, default=10000)
+    args = parser.parse_args()
+    server = GameServer(args.filled_rows, args.move_timeout,
+                        args.idle_timeout, args.max_sessions)
+    try:
+        asyncio.run(serve(server, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    print(json.dumps(server.stats))
+
+
+if __name__ == '__main__':
+    main()
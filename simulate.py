@@ -0,0 +1,344 @@
+"""
+Headless batch self-play for the checkers game.
+
+Games between two programmatic move policies are played on a process pool
+directly through checkers.Game, and each result is streamed back as soon as
+its game finishes. A policy is any picklable object with a
+choose_move(game) method returning a move of game.legal_moves for the player
+to move, and optionally a reset(seed) method called before every game.
+
+Run as a script to stream one JSON line per game and a closing summary:
+
+    python simulate.py --games 1000 --workers 4 --policy1 random \
+        --policy2 greedy --record games.ckr
+"""
+import argparse
+from collections import namedtuple
+import json
+import multiprocessing
+import os
+import random
+import time
+
+from book import OpeningBook
+from checkers import NO_MOVES, NO_PIECES, Game, Player
+from engine import Searcher
+from record import DRAW, GameRecord, RecordWriter
+from tablebase import Tablebase
+
+# Why a game ended, besides the reasons of checkers
+MOVE_LIMIT = 'move_limit'
+
+# The outcome of one simulated game; winner is 1 or 2, or None for a draw,
+# and moves is the path of every move if the game was recorded
+GameResult = namedtuple('GameResult', ['game_id', 'winner', 'length',
+                                       'reason', 'seconds', 'worker',
+                                       'moves'])
+
+
+class RandomPolicy:
+    """
+    A class that represents a policy playing uniformly random legal moves.
+    """
+    def __init__(self, seed=None):
+        """
+        Initializes the policy.
+
+        Parameters:
+            seed (int): The seed of the random generator
+        """
+        self.rng = random.Random(seed)
+
+    def reset(self, seed):
+        """
+        Reseeds the policy before a game.
+
+        Parameters:
+            seed (int): The seed of the random generator
+
+        Returns: None
+        """
+        self.rng.seed(seed)
+
+    def choose_move(self, game):
+        """
+        Returns a random legal move of the player to move.
+
+        Parameters:
+            game (Game): The game being played
+
+        Returns:
+            Move: The chosen move, or None if the player cannot move
+        """
+        moves = game.get_legal_moves(game.current_player)
+        if not moves:
+            return None
+        return self.rng.choice(moves)
+
+
+class GreedyPolicy(RandomPolicy):
+    """
+    A class that represents a policy playing the longest capture available,
+    and a random move otherwise.
+    """
+    def choose_move(self, game):
+        """
+        Returns a capturing move if there is one, a random move otherwise.
+
+        Parameters:
+            game (Game): The game being played
+
+        Returns:
+            Move: The chosen move, or None if the player cannot move
+        """
+        moves = game.get_legal_moves(game.current_player)
+        if not moves:
+            return None
+        most = max(len(move.captured) for move in moves)
+        return self.rng.choice([move for move in moves
+                                if len(move.captured) == most])
+
+
+class SearchPolicy:
+    """
+    A class that represents a policy playing the move of an alpha-beta
+    search.
+    """
+    def __init__(self, time_limit=0.1, max_depth=64, book=None,
+                 tablebase=None):
+        """
+        Initializes the policy.
+
+        Parameters:
+            time_limit (float): The wall-clock budget per move in seconds
+            max_depth (int): The deepest iteration to search
+            book (OpeningBook): Moves played without searching while the
+            position is in the book
+            tablebase (Tablebase): Endgame tables the search plays perfectly
+            from
+        """
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.book = book
+        self.tablebase = tablebase
+        self.searcher = Searcher(tablebase=tablebase)
+
+    def reset(self, seed):
+        """
+        Forgets what was learned in the previous game.
+
+        Parameters:
+            seed (int): Unused, searches are deterministic
+
+        Returns: None
+        """
+        self.searcher = Searcher(tablebase=self.tablebase)
+
+    def choose_move(self, game):
+        """
+        Returns the best move found by the search.
+
+        Parameters:
+            game (Game): The game being played
+
+        Returns:
+            Move: The chosen move, or None if the player cannot move
+        """
+        if self.book is not None:
+            move = self.book.choose_move(game)
+            if move is not None:
+                return move
+        return self.searcher.search(game, self.time_limit,
+                                    self.max_depth).move
+
+
+POLICIES = {
+    'random': RandomPolicy,
+    'greedy': GreedyPolicy,
+    'search': SearchPolicy,
+}
+
+
+def play_game(policy1, policy2, filled_rows=3, max_moves=200, game_id=0,
+              seed=None, record=False):
+    """
+    Plays one game between two policies.
+
+    Parameters:
+        policy1: The policy of the first player, who moves first
+        policy2: The policy of the second player
+        filled_rows (int): The number of rows with pieces for each player
+        max_moves (int): The number of moves after which the game is drawn
+        game_id (int): The number reported with the result
+        seed (int): The seed policies are reset with, game_id by default
+        record (bool): Whether to return the path of every move
+
+    Returns:
+        GameResult: The outcome of the game
+    """
+    start = time.perf_counter()
+    if seed is None:
+        seed = game_id
+    for number, policy in enumerate((policy1, policy2)):
+        if hasattr(policy, 'reset'):
+            policy.reset(seed * 2 + number)
+    game = Game(Player('Player 1', 'red'), Player('Player 2', 'white'),
+                filled_rows)
+    policies = {game.player1: policy1, game.player2: policy2}
+    winner, reason, length = None, MOVE_LIMIT, 0
+    moves = [] if record else None
+    while length < max_moves:
+        color = game.get_winner()
+        if color is not None:
+            winner = 1 if color == game.player1.color else 2
+            loser = game.player2 if winner == 1 else game.player1
+            reason = NO_PIECES if not loser.pieces else NO_MOVES
+            break
+        move = policies[game.current_player].choose_move(game)
+        start_square = move.path[0]
+        piece = game.board.squares[start_square[0]][start_square[1]]
+        if not game.make_move(piece, move):
+            raise ValueError(f'Illegal move {move} in game {game_id}')
+        game._switch_player()
+        length += 1
+        if record:
+            moves.append(move.path)
+    return GameResult(game_id, winner, length, reason,
+                      time.perf_counter() - start, os.getpid(), moves)
+
+
+def _play_task(task):
+    """
+    Plays one game in a worker process.
+
+    Parameters:
+        task (tuple): The arguments of play_game
+
+    Returns:
+        GameResult: The outcome of the game
+    """
+    return play_game(*task)
+
+
+def simulate(policy1, policy2, games, workers=None, filled_rows=3,
+             max_moves=200, chunksize=8, record=False):
+    """
+    Plays many games between two policies on a process pool.
+
+    Parameters:
+        policy1: The policy of the first player
+        policy2: The policy of the second player
+        games (int): The number of games
+        workers (int): The number of processes, one per core by default
+        filled_rows (int): The number of rows with pieces for each player
+        max_moves (int): The number of moves after which a game is drawn
+        chunksize (int): The number of games handed to a worker at once
+        record (bool): Whether results carry the path of every move
+
+    Yields:
+        GameResult: The outcome of each game, in the order they finish
+    """
+    tasks = ((policy1, policy2, filled_rows, max_moves, game_id, None,
+              record) for game_id in range(games))
+    with multiprocessing.Pool(workers) as pool:
+        for result in pool.imap_unordered(_play_task, tasks, chunksize):
+            yield result
+
+
+def summarize(results, seconds):
+    """
+    Returns the throughput of a simulation overall and per worker.
+
+    Parameters:
+        results ([GameResult]): The outcomes of the simulated games
+        seconds (float): The wall-clock duration of the simulation
+
+    Returns:
+        dict: Game counts by winner and reason, games/sec and moves/sec
+        overall, and for each worker the same rates over its busy time
+    """
+    workers = {}
+    for result in results:
+        stats = workers.setdefault(result.worker,
+                                   {'games': 0, 'moves': 0, 'seconds': 0.0})
+        stats['games'] += 1
+        stats['moves'] += result.length
+        stats['seconds'] += result.seconds
+    for stats in workers.values():
+        busy = stats['seconds'] or 1e-9
+        stats['games_per_sec'] = stats['games'] / busy
+        stats['moves_per_sec'] = stats['moves'] / busy
+    moves = sum(result.length for result in results)
+    return {
+        'games': len(results),
+        'player1_wins': sum(result.winner == 1 for result in results),
+        'player2_wins': sum(result.winner == 2 for result in results),
+        'draws': sum(result.winner is None for result in results),
+        'reasons': {reason: sum(result.reason == reason
+                                for result in results)
+                    for reason in (NO_PIECES, NO_MOVES, MOVE_LIMIT)},
+        'seconds': seconds,
+        'games_per_sec': len(results) / seconds if seconds else 0.0,
+        'moves_per_sec': moves / seconds if seconds else 0.0,
+        'workers': {str(pid): stats for pid, stats in workers.items()},
+    }
+
+
+def main():
+    """
+    Streams the results of a simulation as JSON lines, followed by a
+    summary line.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--filled-rows', type=int, default=3)
+    parser.add_argument('--max-moves', type=int, default=200)
+    parser.add_argument('--policy1', choices=POLICIES, default='random')
+    parser.add_argument('--policy2', choices=POLICIES, default='random')
+    parser.add_argument('--book', default=None,
+                        help='opening book used by search policies')
+    parser.add_argument('--record', default=None,
+                        help='game archive the games are written to')
+    parser.add_argument('--tablebase', default=None,
+                        help='directory of endgame tables for search policies')
+    args = parser.parse_args()
+    book = OpeningBook(args.book) if args.book else None
+    if args.tablebase:
+        tablebase = Tablebase(args.tablebase, args.filled_rows)
+    else:
+        tablebase = None
+    policies = []
+    for name in (args.policy1, args.policy2):
+        if POLICIES[name] is SearchPolicy:
+            policies.append(SearchPolicy(book=book, tablebase=tablebase))
+        else:
+            policies.append(POLICIES[name]())
+    archive = open(args.record, 'ab') if args.record else None
+    writer = RecordWriter(archive) if archive else None
+    start = time.perf_counter()
+    results = []
+    try:
+        for result in simulate(policies[0], policies[1], args.games,
+                               args.workers, args.filled_rows,
+                               args.max_moves, record=writer is not None):
+            if writer is not None:
+                writer.write(GameRecord(
+                    args.filled_rows, ('Player 1', 'red'),
+                    ('Player 2', 'white'),
+                    DRAW if result.winner is None else result.winner,
+                    result.moves))
+                result = result._replace(moves=None)
+            results.append(result)
+            fields = result._asdict()
+            del fields['moves']
+            print(json.dumps(fields), flush=True)
+    finally:
+        if archive is not None:
+            archive.close()
+    print(json.dumps({'summary': summarize(results,
+                                           time.perf_counter() - start)}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+Multi-core search of checkers positions.
+
+Several worker processes search the same root position independently and
+share what they learn through a SharedTranspositionTable (Lazy SMP). The
+workers start on staggered depths so they drift apart in the tree, and the
+deepest completed result is played.
+
+Run as a script to report nodes/sec and time-to-depth for 1 to N workers:
+
+    python smp.py --workers 4 --depth 8
+"""
+import argparse
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import json
+import time
+
+from checkers import Game, Player
+from engine import Searcher
+from transposition import SharedTranspositionTable
+
+# The combined outcome of a parallel search
+ParallelResult = namedtuple('ParallelResult', ['move', 'score', 'depth',
+                                               'nodes', 'seconds', 'nps',
+                                               'time_to_depth', 'workers'])
+
+
+def _search_worker(snapshot, options, table, worker, time_limit, max_depth):
+    """
+    Searches a position in a worker process.
+
+    Parameters:
+        snapshot (Snapshot): The position being searched
+        options (dict): The Game options of the game being searched
+        table (SharedTranspositionTable): The table shared by every worker
+        worker (int): The number of the worker
+        time_limit (float): The wall-clock budget in seconds
+        max_depth (int): The deepest iteration to search
+
+    Returns:
+        SearchResult: The result of this worker's search
+    """
+    try:
+        searcher = Searcher(table)
+        game = Game.from_snapshot(snapshot, **options)
+        return searcher.search(game, time_limit, max_depth,
+                               first_depth=1 + worker % 2)
+    finally:
+        table.close()
+
+
+def parallel_search(game, time_limit, workers=2, max_depth=64,
+                    table_size=1 << 20, executor=None):
+    """
+    Searches the position of a game with several processes sharing one
+    transposition table.
+
+    Parameters:
+        game (Game): The game being searched, left unchanged
+        time_limit (float): The wall-clock budget in seconds
+        workers (int): The number of search processes
+        max_depth (int): The deepest iteration to search
+        table_size (int): The number of slots of the shared table
+        executor (ProcessPoolExecutor): A pool to reuse, a new one by default
+
+    Returns:
+        ParallelResult: The deepest worker's move and score, with the nodes
+        and nodes/sec of all workers together
+    """
+    start = time.perf_counter()
+    table = SharedTranspositionTable(table_size)
+    # Workers get the position rather than a pickled copy of the game
+    snapshot = game.snapshot()
+    options = {'bitboard': game.board.bits is not None}
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(workers)
+    try:
+        futures = [executor.submit(_search_worker, snapshot, options, table,
+                                   worker, time_limit, max_depth)
+                   for worker in range(workers)]
+        results = [future.result() for future in futures]
+    finally:
+        if own_executor:
+            executor.shutdown()
+        table.close()
+    seconds = time.perf_counter() - start
+    # The main worker breaks ties between equally deep results
+    best = max(results, key=lambda result: result.depth)
+    nodes = sum(result.nodes for result in results)
+    nps = nodes / seconds if seconds > 0 else 0.0
+    # A move is ready as soon as the first worker completes the depth
+    time_to_depth = min(result.seconds for result in results
+                        if result.depth == best.depth)
+    return ParallelResult(best.move, best.score, best.depth, nodes, seconds,
+                          nps, time_to_depth, workers)
+
+
+def measure_scaling(game, depth, max_workers, time_limit=600.0):
+    """
+    Searches a position to a fixed depth with 1 to max_workers processes.
+
+    Parameters:
+        game (Game): The game being searched
+        depth (int): The depth every run searches to
+        max_workers (int): The largest number of workers measured
+        time_limit (float): The wall-clock budget of each run in seconds
+
+    Returns:
+        [dict]: For each number of workers, the time-to-depth, nodes,
+        nodes/sec and speedups relative to a single worker
+    """
+    rows = []
+    for workers in range(1, max_workers + 1):
+        with ProcessPoolExecutor(workers) as executor:
+            result = parallel_search(game, time_limit, workers, depth,
+                                     executor=executor)
+        rows.append({
+            'workers': workers,
+            'depth': result.depth,
+            'seconds': result.seconds,
+            'time_to_depth': result.time_to_depth,
+            'nodes': result.nodes,
+            'nps': result.nps,
+        })
+    for row in rows:
+        row['time_speedup'] = rows[0]['time_to_depth'] / row['time_to_depth']
+        row['nps_speedup'] = row['nps'] / rows[0]['nps']
+    return rows
+
+
+def main():
+    """
+    Prints the scaling of a parallel search from the starting position as
+    one JSON line per number of workers.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--depth', type=int, default=8)
+    parser.add_argument('--filled-rows', type=int, default=3)
+    args = parser.parse_args()
+    game = Game(Player('Player 1', 'red'), Player('Player 2', 'white'),
+                args.filled_rows)
+    for row in measure_scaling(game, args.depth, args.workers):
+        print(json.dumps(row))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,508 @@
+"""
+Endgame tablebases for small boards and few pieces.
+
+A table covers one material signature, the numbers of men and kings of
+each side (men0, kings0, men1, kings1), and stores for every position with
+either side to move the exact number of plies to the end of the game under
+perfect play: the side to move wins when it is odd, loses when it is even,
+and the position is drawn when it is absent. A side to move without a
+legal move, including one without pieces, has lost. Values are bit-packed
+with the smallest width that holds them, one file per signature, and
+probes read them straight from memory-mapped files.
+
+Tables are built by retrograde analysis: the positions without moves are
+lost, and results spread backwards one ply at a time through every position
+that can reach them. Captures and promotions lead into tables of fewer
+pieces or fewer men, which are built first, so the signatures of one
+level are independent slices solved in parallel on a process pool.
+
+Side 0 is player1 in Game, whose men move towards higher rows.
+
+Run as a script to build every table of up to 3 pieces for an 8x8 board:
+
+    python tablebase.py tables --filled-rows 3 --max-pieces 3 --workers 4
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+import json
+from math import comb
+import mmap
+import os
+import struct
+import time
+
+from bitboard import BitBoard
+
+MAGIC = b'CKT1'
+# Filled rows, the signature, bits per value and number of values
+HEADER = struct.Struct('<4sBBBBBBxxQ')
+
+# Results of a probe, from the side to move's point of view
+WIN = 1
+DRAW = 0
+LOSS = -1
+
+
+def table_name(filled_rows, signature):
+    """
+    Returns the file name of a table.
+
+    Parameters:
+        filled_rows (int): The board size of the table
+        signature ((int, int, int, int)): The men and kings of each side
+
+    Returns:
+        str: The file name, such as 3-1101.tb
+    """
+    return f'{filled_rows}-{"".join(map(str, signature))}.tb'
+
+
+def signatures(max_pieces):
+    """
+    Returns every signature with both sides on the board and at most
+    max_pieces pieces, in an order where every table comes after the tables
+    its captures and promotions lead to.
+
+    Parameters:
+        max_pieces (int): The largest number of pieces of a table
+
+    Returns:
+        [(int, int, int, int)]: The signatures in build order
+    """
+    rv = []
+    for total in range(2, max_pieces + 1):
+        for men0 in range(total + 1):
+            for kings0 in range(total + 1 - men0):
+                for men1 in range(total + 1 - men0 - kings0):
+                    kings1 = total - men0 - kings0 - men1
+                    if men0 + kings0 and men1 + kings1:
+                        rv.append((men0, kings0, men1, kings1))
+    return sorted(rv, key=_level)
+
+
+def _level(signature):
+    """
+    Returns the build level of a signature: its pieces, then its men.
+    """
+    return sum(signature), signature[0] + signature[2]
+
+
+class Layout:
+    """
+    A class that represents the indexing of positions of one board size.
+    Pieces stand on the dark squares, numbered along the rows, and every
+    group of pieces is ranked as a combination of those numbers.
+    """
+    def __init__(self, filled_rows):
+        """
+        Initializes the layout of a board size.
+
+        Parameters:
+            filled_rows (int): The number of rows with pieces for each player
+        """
+        self.filled_rows = filled_rows
+        self.length = 2 * filled_rows + 2
+        self.squares = [(row, col) for row in range(self.length)
+                        for col in range(self.length) if row % 2 != col % 2]
+        self.numbers = {square: n for n, square in enumerate(self.squares)}
+        self.count = len(self.squares)
+        # Men standing on their crowning row would already be kings
+        self.crowning = (
+            {n for n, (row, _) in enumerate(self.squares)
+             if row == self.length - 1},
+            {n for n, (row, _) in enumerate(self.squares) if row == 0},
+        )
+
+    def size(self, signature):
+        """
+        Returns the number of indices of a table, valid or not.
+        """
+        rv = 2
+        for pieces in signature:
+            rv *= comb(self.count, pieces)
+        return rv
+
+    def index(self, signature, groups, side):
+        """
+        Returns the index of a position in its table.
+
+        Parameters:
+            signature ((int, int, int, int)): The table's signature
+            groups (((int))): The sorted square numbers of men0, kings0,
+            men1 and kings1
+            side (int): The side to move
+
+        Returns:
+            int: The index of the position
+        """
+        rv = 0
+        for pieces, group in zip(signature, groups):
+            rank = 0
+            for i, number in enumerate(group):
+                rank += comb(number, i + 1)
+            rv = rv * comb(self.count, pieces) + rank
+        return rv * 2 + side
+
+    def positions(self, signature):
+        """
+        Yields every valid position of a signature.
+
+        Parameters:
+            signature ((int, int, int, int)): The table's signature
+
+        Yields:
+            (((int)), int): The groups of square numbers and the side to move
+        """
+        numbers = range(self.count)
+
+        def place(depth, used, groups):
+            if depth == 4:
+                yield tuple(groups)
+                return
+            for group in combinations(numbers, signature[depth]):
+                if used.intersection(group):
+                    continue
+                # Men of side 0 are groups[0], men of side 1 groups[2]
+                if depth in (0, 2) and \
+                        self.crowning[depth // 2].intersection(group):
+                    continue
+                groups.append(group)
+                yield from place(depth + 1, used.union(group), groups)
+                groups.pop()
+        for groups in place(0, frozenset(), []):
+            yield groups, 0
+            yield groups, 1
+
+
+def _signature(groups):
+    """
+    Returns the signature of groups of square numbers.
+    """
+    return tuple(len(group) for group in groups)
+
+
+class Tablebase:
+    """
+    A class that represents the tables of one board size on disk. Tables
+    are memory-mapped the first time they are probed.
+    """
+    def __init__(self, directory, filled_rows):
+        """
+        Opens the tables of a directory.
+
+        Parameters:
+            directory (str): The directory holding the table files
+            filled_rows (int): The board size of the tables
+        """
+        self.directory = directory
+        self.filled_rows = filled_rows
+        self.layout = Layout(filled_rows)
+        self.max_pieces = 0
+        self.signatures = set()
+        for name in os.listdir(directory):
+            prefix = f'{filled_rows}-'
+            if name.startswith(prefix) and name.endswith('.tb'):
+                signature = tuple(int(c) for c in name[len(prefix):-3])
+                self.signatures.add(signature)
+                self.max_pieces = max(self.max_pieces, sum(signature))
+        self._tables = {}
+        self.hits = 0
+
+    def __reduce__(self):
+        """
+        Pickles the tablebase as its location, so worker processes map the
+        tables themselves.
+        """
+        return (Tablebase, (self.directory, self.filled_rows))
+
+    def _table(self, signature):
+        """
+        Returns the mapped data and value width of a table, or None if the
+        table was not built.
+        """
+        table = self._tables.get(signature)
+        if table is None:
+            if signature not in self.signatures:
+                return None
+            path = os.path.join(self.directory,
+                                table_name(self.filled_rows, signature))
+            with open(path, 'rb') as stream:
+                data = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+            width = HEADER.unpack_from(data)[6]
+            table = self._tables[signature] = (data, width)
+        return table
+
+    def value(self, groups, side):
+        """
+        Returns the stored value of a position.
+
+        Parameters:
+            groups (((int))): The sorted square numbers of men0, kings0,
+            men1 and kings1
+            side (int): The side to move
+
+        Returns:
+            int: The plies to the end plus one, 0 for a draw, or None if the
+            position's table was not built
+        """
+        signature = _signature(groups)
+        if not signature[2 * side] + signature[2 * side + 1]:
+            # The side to move has no pieces left, so it has lost
+            return 1
+        table = self._table(signature)
+        if table is None:
+            return None
+        data, width = table
+        bit = self.layout.index(signature, groups, side) * width
+        start = HEADER.size + bit // 8
+        word = int.from_bytes(data[start:start + 4], 'little')
+        return word >> bit % 8 & (1 << width) - 1
+
+    def probe(self, game):
+        """
+        Returns the result of a game's position for the player to move.
+
+        Parameters:
+            game (Game): The game being assessed, of the tablebase's size
+
+        Returns:
+            (int, int): WIN, LOSS or DRAW and the plies to the end of the
+            game, or None if the position is not in the tablebase
+        """
+        if game.board.length != self.layout.length:
+            return None
+        if len(game.player1.pieces) + len(game.player2.pieces) \
+                > self.max_pieces:
+            return None
+        numbers = self.layout.numbers
+        groups = []
+        for player in (game.player1, game.player2):
+            men = sorted(numbers[piece.position] for piece in player.pieces
+                         if not piece.is_king)
+            kings = sorted(numbers[piece.position] for piece in player.pieces
+                           if piece.is_king)
+            groups.extend((tuple(men), tuple(kings)))
+        side = 0 if game.current_player is game.player1 else 1
+        value = self.value(tuple(groups), side)
+        if value is None:
+            return None
+        self.hits += 1
+        return decode(value)
+
+    def close(self):
+        """
+        Unmaps every table.
+
+        Parameters: None
+
+        Returns: None
+        """
+        for data, _ in self._tables.values():
+            data.close()
+        self._tables = {}
+
+
+def decode(value):
+    """
+    Returns the result and plies to the end of a stored value.
+
+    Parameters:
+        value (int): The plies to the end plus one, or 0 for a draw
+
+    Returns:
+        (int, int): WIN, LOSS or DRAW and the plies to the end, 0 for a draw
+    """
+    if value == 0:
+        return DRAW, 0
+    plies = value - 1
+    return (WIN if plies % 2 else LOSS), plies
+
+
+def _successors(layout, bits, groups, side):
+    """
+    Returns the position after every legal move of the side to move.
+
+    Parameters:
+        layout (Layout): The indexing of the board
+        bits (BitBoard): A scratch bitboard of the board's size
+        groups (((int))): The square numbers of men0, kings0, men1, kings1
+        side (int): The side to move
+
+    Returns:
+        [(((int)), int)]: The groups and side to move after each move
+    """
+    squares = layout.squares
+    masks = []
+    for group in groups:
+        mask = 0
+        for number in group:
+            mask |= 1 << bits.index(squares[number])
+        masks.append(mask)
+    bits.men = [masks[0], masks[2]]
+    bits.kings = [masks[1], masks[3]]
+    own_men, own_kings = 2 * side, 2 * side + 1
+    rv = []
+    for group, is_king in ((groups[own_men], False),
+                           (groups[own_kings], True)):
+        for number in group:
+            for path, captured, promotion in \
+                    bits.piece_moves(squares[number]):
+                new = [set(g) for g in groups]
+                new[own_kings if is_king else own_men].discard(number)
+                end = layout.numbers[path[-1]]
+                new[own_kings if is_king or promotion else own_men].add(end)
+                for square in captured:
+                    taken = layout.numbers[square]
+                    new[2 * (1 - side)].discard(taken)
+                    new[2 * (1 - side) + 1].discard(taken)
+                rv.append((tuple(tuple(sorted(g)) for g in new), 1 - side))
+    return rv
+
+
+def solve(directory, filled_rows, signature):
+    """
+    Builds the table of one signature by retrograde analysis and writes it.
+    Every table its captures and promotions lead to must already exist.
+
+    Parameters:
+        directory (str): The directory the table is written to
+        filled_rows (int): The board size
+        signature ((int, int, int, int)): The men and kings of each side
+
+    Returns:
+        dict: The signature, its positions, wins, losses and draws, and the
+        seconds taken
+    """
+    start = time.perf_counter()
+    layout = Layout(filled_rows)
+    known = Tablebase(directory, filled_rows)
+    bits = BitBoard(layout.length, 'side0', 'side1')
+    size = layout.size(signature)
+    # Moves into this table not yet known to win for the opponent, the
+    # longest known win of the opponent, and the positions reaching each
+    remaining = {}
+    longest = {}
+    parents = {}
+    # Positions whose result is settled at each number of plies
+    buckets = {}
+    for groups, side in layout.positions(signature):
+        index = layout.index(signature, groups, side)
+        remaining[index] = 0
+        longest[index] = 0
+        win = None
+        for child, child_side in _successors(layout, bits, groups, side):
+            if _signature(child) == signature:
+                child_index = layout.index(signature, child, child_side)
+                parents.setdefault(child_index, []).append(index)
+                remaining[index] += 1
+                continue
+            value = known.value(child, child_side)
+            if value is None:
+                raise ValueError(f'Table {_signature(child)} must be built '
+                                 f'before {signature}')
+            result, plies = decode(value)
+            if result == LOSS and (win is None or plies + 1 < win):
+                win = plies + 1
+            elif result == WIN:
+                longest[index] = max(longest[index], plies + 1)
+            else:
+                # A drawn move keeps the position from being lost
+                remaining[index] += 1
+        if win is not None:
+            # A winning move keeps the position from being lost
+            remaining[index] += 1
+            buckets.setdefault(win, []).append((index, WIN))
+        elif remaining[index] == 0:
+            buckets.setdefault(longest[index], []).append((index, LOSS))
+    known.close()
+    values = {}
+    plies = 0
+    while buckets:
+        for index, result in buckets.pop(plies, ()):
+            if index in values:
+                continue
+            values[index] = plies + 1
+            for parent in parents.get(index, ()):
+                if parent in values:
+                    continue
+                if result == LOSS:
+                    buckets.setdefault(plies + 1, []).append((parent, WIN))
+                else:
+                    remaining[parent] -= 1
+                    longest[parent] = max(longest[parent], plies + 1)
+                    if remaining[parent] == 0:
+                        buckets.setdefault(longest[parent], []).append(
+                            (parent, LOSS))
+        plies += 1
+    _write(directory, filled_rows, signature, size, values)
+    wins = sum(1 for value in values.values() if value % 2 == 0)
+    return {'signature': ''.join(map(str, signature)),
+            'positions': len(remaining), 'wins': wins,
+            'losses': len(values) - wins,
+            'draws': len(remaining) - len(values),
+            'seconds': time.perf_counter() - start}
+
+
+def _write(directory, filled_rows, signature, size, values):
+    """
+    Writes the values of a table, bit-packed, to its file.
+    """
+    width = max(1, max(values.values(), default=0).bit_length())
+    # Probes read 4 bytes at a time, so the data is padded by 3
+    data = bytearray((size * width + 7) // 8 + 3)
+    for index, value in values.items():
+        bit = index * width
+        start = bit // 8
+        word = int.from_bytes(data[start:start + 4], 'little')
+        word |= value << bit % 8
+        data[start:start + 4] = word.to_bytes(4, 'little')
+    path = os.path.join(directory, table_name(filled_rows, signature))
+    with open(path + '.tmp', 'wb') as stream:
+        stream.write(HEADER.pack(MAGIC, filled_rows, *signature, width, size))
+        stream.write(data)
+    os.replace(path + '.tmp', path)
+
+
+def generate(directory, filled_rows, max_pieces=3, workers=None):
+    """
+    Builds every table of a board size up to a number of pieces, solving
+    the independent signatures of each level on a process pool.
+
+    Parameters:
+        directory (str): The directory the tables are written to
+        filled_rows (int): The board size
+        max_pieces (int): The largest number of pieces of a table
+        workers (int): The number of processes, one per core by default
+
+    Yields:
+        dict: The statistics of each table, as it is written
+    """
+    os.makedirs(directory, exist_ok=True)
+    levels = {}
+    for signature in signatures(max_pieces):
+        levels.setdefault(_level(signature), []).append(signature)
+    with ProcessPoolExecutor(workers) as executor:
+        for level in sorted(levels):
+            group = levels[level]
+            yield from executor.map(solve, [directory] * len(group),
+                                    [filled_rows] * len(group), group)
+
+
+def main():
+    """
+    Builds tables and prints the statistics of each as a JSON line.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('directory')
+    parser.add_argument('--filled-rows', type=int, default=3)
+    parser.add_argument('--max-pieces', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+    for stats in generate(args.directory, args.filled_rows, args.max_pieces,
+                          args.workers):
+        print(json.dumps(stats), flush=True)
+
+
+if __name__ == '__main__':
+    main()
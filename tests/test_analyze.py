@@ -0,0 +1,80 @@
+"""
+Tests of the batch analysis of JSON positions, PDN games and archives.
+"""
+import io
+import json
+import math
+
+import pytest
+
+import analyze
+from record import GameRecord, RecordWriter
+
+PDN = """[Event "good"]
+1. 10-14 22-18 *
+
+[Event "bad"]
+1. zz-14 *
+
+[Event "good"]
+1. 9-13 *
+"""
+
+
+@pytest.fixture
+def worker():
+    analyze._init_worker((1, math.inf, False, analyze.MAX_ROWS))
+
+
+@pytest.mark.parametrize('record', [
+    'not json',
+    [1, 2],
+    {'filled_rows': 10 ** 6},
+    {'filled_rows': '3'},
+    {'moves': [32]},
+    {'moves': ['3b-9z']},
+    {'snapshot': [3, 0, 1, 2]},
+    {'snapshot': [10 ** 6, 0, 0, 0, 0]},
+    {'snapshot': {'filled_rows': 1, 'side': 0, 'player1': 2,
+                  'player2': 2, 'kings': 0}},
+    {'snapshot': [1, 0, 'x', 0, 0]},
+])
+def test_bad_records_become_error_lines(worker, record):
+    line = record if isinstance(record, str) else json.dumps(record)
+    [analysis] = analyze._analyze_task((4, 'json', line))
+    assert analysis['index'] == 4
+    assert analysis['error']
+
+
+def test_positions_are_analyzed(worker):
+    line = json.dumps({'moves': ['3b-4a', '6c-5b'], 'id': 'x'})
+    [analysis] = analyze._analyze_task((0, 'json', line))
+    assert analysis['id'] == 'x'
+    assert analysis['to_move'] == 1
+    assert '4a-6c' in analysis['moves']
+
+
+def _analyze_all(stream, kind):
+    return list(analyze.analyze_stream(analyze.read_inputs(stream, kind),
+                                       kind, depth=1, workers=1))
+
+
+def test_a_bad_pdn_game_costs_only_its_own_line():
+    lines = _analyze_all(io.StringIO(PDN), 'pdn')
+    assert [line['index'] for line in lines] == [0, 1, 2]
+    assert 'error' not in lines[0] and 'error' not in lines[2]
+    assert lines[0]['ply'] == 2 and lines[2]['ply'] == 1
+    assert lines[1]['error']
+
+
+def test_a_truncated_archive_ends_with_an_error_line():
+    stream = io.BytesIO()
+    writer = RecordWriter(stream)
+    for _ in range(2):
+        writer.write(GameRecord(2, ('a', 'red'), ('b', 'white'), -1,
+                                [((1, 0), (2, 1))]))
+    data = stream.getvalue()
+    lines = _analyze_all(io.BytesIO(data[:-3]), 'ckr')
+    assert [line['index'] for line in lines] == [0, 1]
+    assert 'error' not in lines[0]
+    assert lines[1]['error'] == 'Truncated game archive'
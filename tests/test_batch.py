@@ -0,0 +1,60 @@
+"""
+Tests of batched move generation against Game.
+"""
+import random
+
+import numpy as np
+import pytest
+
+from batch import BoardBatch, play_random
+from checkers import Game, Player, Snapshot
+
+
+def random_games(filled_rows, seed, count=40, plies=80):
+    """
+    Returns copies of a random game at every ply, up to count positions,
+    including games that are over.
+    """
+    rng = random.Random(seed)
+    game = Game(Player('Player 1', 'red'), Player('Player 2', 'white'),
+                filled_rows)
+    games = []
+    for _ in range(plies):
+        games.append(game.clone())
+        moves = game.get_legal_moves(game.current_player)
+        if not moves:
+            break
+        game.push(rng.choice(moves))
+    return rng.sample(games, min(count, len(games)))
+
+
+@pytest.mark.parametrize('filled_rows', [1, 2, 3, 4])
+@pytest.mark.parametrize('seed', range(6))
+def test_batch_agrees_with_game(filled_rows, seed):
+    games = random_games(filled_rows, seed)
+    batch = BoardBatch.from_games(games)
+    winners = batch.winners()
+    for game, moves, mobile, winner in zip(games, batch.legal_moves(),
+                                           batch.mobility(), winners):
+        expected = sorted(game.get_legal_moves(game.current_player))
+        assert sorted(moves) == expected
+        assert mobile == bool(expected)
+        color = game.get_winner()
+        assert winner == {None: 0, game.player1.color: 1,
+                          game.player2.color: -1}[color]
+
+
+def test_a_waiting_player_without_moves_loses():
+    # Player 2's man on (1, 0) is blocked by player 1's man on (0, 1),
+    # which can still move
+    game = Game.from_snapshot(Snapshot(1, 0, 1 << 1, 1 << 4, 0))
+    batch = BoardBatch.from_games([game])
+    assert batch.mobility().tolist() == [True]
+    assert batch.winners().tolist() == [1]
+    assert game.get_winner() == game.player1.color
+
+
+def test_random_games_end_by_the_rule_of_game():
+    winners, lengths = play_random(64, filled_rows=2, max_moves=100, seed=0)
+    assert set(winners.tolist()) <= {-1, 0, 1}
+    assert np.all((winners == 0) | (lengths < 100))
@@ -0,0 +1,29 @@
+"""
+Tests of the bitboard position core.
+"""
+from checkers import Game, Snapshot
+
+
+def square_mask(squares, length=8):
+    mask = 0
+    for row, col in squares:
+        mask |= 1 << row * length + col
+    return mask
+
+
+def test_king_chain_returning_to_its_start_square():
+    # The white king at (2, 3) can capture all four men around (4, 3) and
+    # land back where it started
+    king = square_mask([(2, 3)])
+    men = square_mask([(3, 4), (5, 4), (5, 2), (3, 2)])
+    snapshot = Snapshot(3, 1, men, king, king)
+    game = Game.from_snapshot(snapshot, bitboard=True)
+    loop = [move for move in game.get_legal_moves(game.current_player)
+            if len(move.captured) == 4]
+    assert [move.path for move in loop] == [
+        ((2, 3), (4, 5), (6, 3), (4, 1), (2, 3)),
+        ((2, 3), (4, 1), (6, 3), (4, 5), (2, 3))]
+    game.push(loop[0])
+    assert game.snapshot() == Snapshot(3, 0, 0, king, king)
+    game.pop()
+    assert game.snapshot() == snapshot
@@ -0,0 +1,28 @@
+"""
+Tests of the alpha-beta engine.
+"""
+from checkers import Game, Snapshot
+from engine import WIN, Searcher, from_table, to_table
+from transposition import TranspositionTable
+
+# Player 1 to move wins in 9 plies
+WON = Snapshot(2, 0, 537264456, 4434436096, 0)
+
+
+def test_table_scores_round_trip():
+    for score in (0, 250, -250, WIN - 9, -WIN + 4):
+        for ply in (0, 1, 7):
+            assert from_table(to_table(score, ply), ply) == score
+
+
+def test_mate_scores_from_the_table_count_plies_from_the_root():
+    game = Game.from_snapshot(WON)
+    table = TranspositionTable()
+    result = Searcher(table).search(game, 60, 8)
+    assert result.score == WIN - 9
+    # The reply is searched with the table the first search filled, in
+    # which its mate scores were stored one ply below the root
+    game.push(result.move)
+    warm = Searcher(table).search(game, 60, 8)
+    fresh = Searcher(TranspositionTable()).search(game, 60, 8)
+    assert warm.score == fresh.score == -WIN + 8
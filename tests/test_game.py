@@ -0,0 +1,209 @@
+"""
+Tests of move generation, make/unmake, Zobrist keys and snapshots on every
+board layout.
+"""
+import random
+
+import pytest
+
+from checkers import Game, Move, MoveCache, Player, Snapshot
+from zobrist import SIDE_KEY
+
+LAYOUTS = {
+    'grid': {},
+    'bitboard': {'bitboard': True},
+    'sparse': {'sparse': True},
+}
+SEEDS = range(8)
+
+
+def new_game(filled_rows=3, **options):
+    return Game(Player('Player 1', 'red'), Player('Player 2', 'white'),
+                filled_rows, **options)
+
+
+def random_line(filled_rows, seed, plies=40):
+    """
+    Returns the moves of a random game from the starting position.
+    """
+    rng = random.Random(seed)
+    game = new_game(filled_rows)
+    line = []
+    for _ in range(plies):
+        moves = game.get_legal_moves(game.current_player)
+        if not moves:
+            break
+        move = rng.choice(moves)
+        game.push(move)
+        line.append(move)
+    return line
+
+
+def recomputed_key(game):
+    """
+    Returns the Zobrist key of the game computed from scratch.
+    """
+    board = game.board
+    key = 0
+    for player in (game.player1, game.player2):
+        for piece in player.pieces:
+            key ^= board._piece_key(piece, piece.position, piece.is_king)
+    if game.current_player is game.player2:
+        key ^= SIDE_KEY
+    return key
+
+
+def state(game):
+    """
+    Returns everything push and pop must restore, as comparable values.
+    """
+    squares = {}
+    for row in range(game.board.length):
+        for col in range(game.board.length):
+            piece = game.board.piece_at((row, col))
+            if piece is not None:
+                assert piece.position == (row, col)
+                squares[row, col] = (piece.color, piece.is_king)
+    pieces = [sorted((piece.position, piece.is_king)
+                     for piece in player.pieces)
+              for player in (game.player1, game.player2)]
+    bits = game.board.bits
+    masks = None if bits is None else (tuple(bits.men), tuple(bits.kings))
+    return (squares, pieces, masks, game.board.key, game.key,
+            game.current_player.color)
+
+
+def sorted_moves(game):
+    return sorted(game.get_legal_moves(game.current_player))
+
+
+@pytest.mark.parametrize('layout', LAYOUTS)
+@pytest.mark.parametrize('seed', SEEDS)
+def test_push_pop_restores_board_and_key(layout, seed):
+    game = new_game(3, **LAYOUTS[layout])
+    states = []
+    for move in random_line(3, seed):
+        states.append(state(game))
+        game.push(move)
+    while states:
+        assert game.pop() is not None
+        assert state(game) == states.pop()
+    assert game.history == []
+
+
+@pytest.mark.parametrize('layout', LAYOUTS)
+@pytest.mark.parametrize('seed', SEEDS)
+def test_incremental_key_matches_recomputed_key(layout, seed):
+    game = new_game(3, **LAYOUTS[layout])
+    for move in random_line(3, seed):
+        game.push(move)
+        assert game.key == recomputed_key(game)
+        assert game.key == Game.from_snapshot(game.snapshot()).key
+
+
+@pytest.mark.parametrize('filled_rows', [2, 3, 4])
+@pytest.mark.parametrize('seed', SEEDS)
+def test_layouts_agree_on_legal_moves(filled_rows, seed):
+    games = []
+    for options in LAYOUTS.values():
+        games.append(new_game(filled_rows, **options))
+        games.append(new_game(filled_rows, move_cache=MoveCache(16),
+                              **options))
+    for move in random_line(filled_rows, seed):
+        expected = sorted_moves(games[0])
+        for game in games[1:]:
+            assert sorted_moves(game) == expected
+            assert game.has_moves(game.current_player) == bool(expected)
+        for game in games:
+            game.push(move)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_layouts_agree_on_possible_captures(seed):
+    games = []
+    for options in LAYOUTS.values():
+        games.append(new_game(3, **options))
+        games.append(new_game(3, move_cache=MoveCache(16), **options))
+    squares = [(row, col) for row in range(8) for col in range(8)
+               if row % 2 != col % 2]
+    for ply, move in enumerate(random_line(3, seed)):
+        if ply % 8 == 0:
+            # Hypothetical kings and men, on empty and occupied squares
+            for start in squares:
+                for end in squares:
+                    for is_king in (False, True):
+                        results = {game.is_capture_possible(start, end,
+                                                            is_king)
+                                   for game in games}
+                        assert len(results) == 1
+        for game in games:
+            game.push(move)
+
+
+@pytest.mark.parametrize('layout', LAYOUTS)
+@pytest.mark.parametrize('seed', SEEDS)
+def test_snapshot_round_trip(layout, seed):
+    game = new_game(3, **LAYOUTS[layout])
+    for move in random_line(3, seed):
+        game.push(move)
+        snapshot = game.snapshot()
+        copy = Game.from_snapshot(snapshot, **LAYOUTS[layout])
+        assert copy.snapshot() == snapshot
+        assert state(copy) == state(game)
+        assert sorted_moves(copy) == sorted_moves(game)
+
+
+@pytest.mark.parametrize('layout', LAYOUTS)
+def test_clone_is_independent(layout):
+    game = new_game(3, **LAYOUTS[layout])
+    line = random_line(3, 0)
+    for move in line[:10]:
+        game.push(move)
+    copy = game.clone()
+    assert copy.snapshot() == game.snapshot()
+    assert state(copy) == state(game)
+    before = state(game)
+    for move in line[10:]:
+        copy.push(move)
+    assert state(game) == before
+    assert copy.snapshot() != game.snapshot()
+
+
+@pytest.mark.parametrize('layout', LAYOUTS)
+@pytest.mark.parametrize('move_cache', [None, 16])
+def test_make_move_rejects_moves_not_legal_for_the_piece(layout, move_cache):
+    game = new_game(3, move_cache=move_cache, **LAYOUTS[layout])
+    piece = game.board.piece_at((2, 1))
+    forged = Move(((2, 1), (4, 3)), ((3, 2),), False)
+    assert not game.make_move(piece, forged)
+    assert not game.make_move(piece, Move(((2, 1), (3, 4)), (), False))
+    assert game.board.piece_at((2, 1)) is piece
+    assert game.make_move(piece, Move(((2, 1), (3, 2)), (), False))
+    assert game.board.piece_at((3, 2)) is piece
+
+
+@pytest.mark.parametrize('snapshot', [
+    # Both players on square (0, 1)
+    Snapshot(1, 0, 0b10, 0b10, 0),
+    # A piece on the light square (0, 0)
+    Snapshot(1, 0, 0b1, 0, 0),
+    # A piece past the last square of a 4x4 board
+    Snapshot(1, 0, 1 << 16, 0, 0),
+    Snapshot(1, 2, 0b10, 0, 0),
+    # A king on an empty square
+    Snapshot(1, 0, 0b10, 0, 0b1000),
+    # Men of player 1 on row 3 and of player 2 on row 0 of a 4x4 board
+    Snapshot(1, 0, 1 << 14, 0b10, 0b10),
+    Snapshot(1, 0, 1 << 14, 0b10, 1 << 14),
+    Snapshot(0, 0, 0, 0, 0),
+])
+def test_invalid_snapshots_are_rejected(snapshot):
+    with pytest.raises(ValueError):
+        Game.from_snapshot(snapshot)
+
+
+def test_kings_may_stand_on_their_crowning_row():
+    game = Game.from_snapshot(Snapshot(1, 0, 1 << 14, 0b10,
+                                       1 << 14 | 0b10))
+    assert game.board.piece_at((3, 2)).is_king
+    assert game.board.piece_at((0, 1)).is_king
@@ -0,0 +1,26 @@
+"""
+Tests of the rule check counters.
+"""
+import pytest
+
+from checkers import Game, Player
+from instrument import Instrumentation
+
+
+@pytest.mark.parametrize('options', [{}, {'bitboard': True},
+                                     {'sparse': True}])
+@pytest.mark.parametrize('move_cache', [None, 16])
+def test_moves_produced_counts_generated_moves(options, move_cache):
+    game = Game(Player('Player 1', 'red'), Player('Player 2', 'white'), 3,
+                move_cache=move_cache, **options)
+    with Instrumentation(game) as stats:
+        moves = game.get_legal_moves(game.current_player)
+        game.get_legal_moves(game.current_player)
+        all_moves = game.get_all_moves(game.current_player)
+    assert len(moves) == 7
+    assert sum(len(ends) for ends in all_moves.values()) == 7
+    assert stats.calls['get_legal_moves'] == 2
+    assert stats.calls['get_all_moves'] == 1
+    # A cache generates the moves once and serves the other calls
+    assert stats.moves_produced == (7 if move_cache else 21)
+    assert 'get_legal_moves' not in game.__dict__
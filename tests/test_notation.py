@@ -0,0 +1,25 @@
+"""
+Tests of square and move names.
+"""
+import pytest
+
+from checkers import Move
+from notation import format_move, format_square, parse_move, parse_square
+
+
+def test_names_round_trip():
+    for square in [(0, 1), (2, 1), (11, 25)]:
+        assert parse_square(format_square(square)) == square
+    assert format_square((12, 26)) == '13aa'
+    assert format_square((49, 101)) == '50cx'
+    for col in range(2 * 50 + 2):
+        assert parse_square(format_square((0, col))) == (0, col)
+    move = Move(((2, 1), (4, 3), (6, 1)), ((3, 2), (5, 2)), False)
+    assert format_move(move) == '3b-5d-7b'
+    assert parse_move('3B-5d-7b') == move.path
+
+
+@pytest.mark.parametrize('name', ['', 'b', '3', 'b3', '3b-', '3b3', '50\u00e1'])
+def test_bad_names_are_rejected(name):
+    with pytest.raises(ValueError):
+        parse_move(name)
@@ -0,0 +1,33 @@
+"""
+Tests of perft counts against the reference counts on every core.
+"""
+import pytest
+
+from checkers import Game, MoveCache, Player
+from perft import REFERENCE, divide, perft
+
+CORES = {
+    'grid': {},
+    'bitboard': {'bitboard': True},
+    'sparse': {'sparse': True},
+    'cached': {'move_cache': MoveCache(4096)},
+}
+
+
+def new_game(filled_rows, **options):
+    return Game(Player('Player 1', 'red'), Player('Player 2', 'white'),
+                filled_rows, **options)
+
+
+@pytest.mark.parametrize('core', CORES)
+@pytest.mark.parametrize('filled_rows', sorted(REFERENCE))
+def test_perft_matches_reference(core, filled_rows):
+    game = new_game(filled_rows, **CORES[core])
+    for depth in range(1, 5):
+        assert perft(game, depth) == REFERENCE[filled_rows][depth]
+    assert game.history == []
+
+
+def test_divide_sums_to_perft():
+    counts = divide(new_game(2), 4, workers=1)
+    assert sum(count for _, count in counts) == REFERENCE[2][4]
@@ -0,0 +1,40 @@
+"""
+Tests of the terminal game's import and board drawing.
+"""
+import os
+import subprocess
+import sys
+
+from checkers import Game, Move, Player
+import playgame
+import render
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_import_does_not_load_the_engine():
+    loaded = subprocess.run(
+        [sys.executable, '-c',
+         'import sys, playgame; print(sorted(set(sys.modules) & '
+         '{"engine", "colorama", "termcolor"}))'],
+        cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    assert loaded.strip() == '[]'
+
+
+def test_a_second_draw_writes_only_the_changed_cells(capsys, monkeypatch):
+    monkeypatch.setattr(render, '_terminal_ready', True)
+    game = Game(Player('Ann', 'red'), Player('Bob', 'white'), 3)
+    playgame.print_board(game)
+    first = capsys.readouterr().out
+    assert first.startswith(render.HOME + render.CLEAR_SCREEN)
+    game.push(Move(((2, 1), (3, 2)), (), False))
+    playgame.print_board(game)
+    second = capsys.readouterr().out
+
+    def cell(row, col):
+        return render._move_to(render.TITLE_LINES + 2 * row + 1,
+                               render.CELL_WIDTH * col + render.MARK_OFFSET)
+
+    below = render._move_to(render.TITLE_LINES + 2 * 8 + 2, 0)
+    assert second == (cell(2, 1) + ' ' + cell(3, 2) + render.paint('r', 'red')
+                      + below + render.CLEAR_BELOW)
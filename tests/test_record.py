@@ -0,0 +1,98 @@
+"""
+Tests of game archives, their index and PDN import and export.
+"""
+import io
+import random
+import struct
+
+import pytest
+
+from checkers import Game, Player
+from record import (MAGIC, RECORD, RecordIndex, RecordWriter, decode,
+                    encode, read_pdn, read_records, record_game, replay,
+                    to_pdn)
+
+
+def random_record(filled_rows, seed, plies=60):
+    """
+    Returns the record of a random game and the game after its last move.
+    """
+    rng = random.Random(seed)
+    game = Game(Player('Ann', 'red'), Player('Bob', 'white'), filled_rows)
+    moves = []
+    for _ in range(plies):
+        legal = game.get_legal_moves(game.current_player)
+        if not legal:
+            break
+        move = rng.choice(legal)
+        game.push(move)
+        moves.append(move)
+    return record_game(game, moves, seed % 3 - 1), game
+
+
+def records():
+    return [random_record(filled_rows, seed)
+            for filled_rows in (1, 2, 3, 4) for seed in range(3)]
+
+
+def test_replay_reproduces_the_game():
+    for record, game in records():
+        assert replay(record).snapshot() == game.snapshot()
+        assert replay(record, bitboard=True).snapshot() == game.snapshot()
+
+
+def test_archive_round_trip():
+    stream = io.BytesIO()
+    with RecordWriter(stream) as writer:
+        for record, _ in records():
+            writer.write(record)
+    data = stream.getvalue()
+    assert [decode(encode(record)) for record, _ in records()] \
+        == [record for record, _ in records()]
+    assert list(read_records(io.BytesIO(data))) \
+        == [record for record, _ in records()]
+
+
+def test_pdn_round_trip():
+    text = '\n'.join(to_pdn(record) for record, _ in records())
+    games = list(read_pdn(io.StringIO(text)))
+    for (record, game), read in zip(records(), games, strict=True):
+        assert read.filled_rows == record.filled_rows
+        assert read.result == record.result
+        assert read.moves == record.moves
+        assert replay(read).snapshot() == game.snapshot()
+
+
+def test_index_gives_each_game(tmp_path):
+    path = str(tmp_path / 'games.ckr')
+    with open(path, 'wb') as archive:
+        writer = RecordWriter(archive)
+        for record, _ in records():
+            writer.write(record)
+    expected = [record for record, _ in records()]
+    for _ in range(2):
+        # The second pass reuses the index file the first one built
+        with RecordIndex(path) as index:
+            assert len(index) == len(expected)
+            for number in random.Random(0).sample(range(len(index)),
+                                                  len(index)):
+                assert index[number] == expected[number]
+            assert index[-1] == expected[-1]
+            with pytest.raises(IndexError):
+                index[len(index)]
+
+
+def test_corrupt_archives_are_rejected(tmp_path):
+    record, _ = random_record(2, 0)
+    data = encode(record)
+    # A record header giving a size of 0, which would never advance
+    corrupt = MAGIC + struct.pack('<I', 0) + data[4:]
+    for contents in (b'XXXX' + data, corrupt, MAGIC + data[:-1]):
+        path = tmp_path / 'games.ckr'
+        path.write_bytes(contents)
+        with pytest.raises(ValueError):
+            RecordIndex(str(path))
+        with pytest.raises(ValueError):
+            list(read_records(io.BytesIO(contents)))
+    with pytest.raises(ValueError):
+        decode(data[:RECORD.size] + data[RECORD.size + 1:])
@@ -0,0 +1,65 @@
+"""
+Tests of the game server's sessions and move timeout.
+"""
+import asyncio
+
+import pytest
+
+from server import GameServer, Session
+
+
+def test_wrong_number_of_arguments():
+    session = Session()
+    assert session.handle('NEW 2 3') \
+        == 'ERR wrong number of arguments for NEW'
+    assert session.handle('NEW 2') == 'OK 2 1'
+    assert session.handle('MOVE') \
+        == 'ERR wrong number of arguments for MOVE'
+    assert session.handle('MOVES') == 'OK 2a-3b 2c-3d 2c-3b 2e-3f 2e-3d'
+
+
+@pytest.mark.parametrize('rows', [13, 50])
+def test_moves_on_wide_boards_can_be_played(rows):
+    session = Session()
+    session.handle(f'NEW {rows}')
+    moves = session.handle('MOVES').split()[1:]
+    # The last move is on columns past z
+    assert moves[-1] in ('13ab-14aa', '50cw-51cv')
+    assert session.handle(f'MOVE {moves[-1]}') == 'OK 2'
+    moves = session.handle('MOVES').split()[1:]
+    assert session.handle(f'MOVE {moves[-1]}') == 'OK 1'
+
+
+def test_type_errors_inside_a_command_are_not_hidden(monkeypatch):
+    session = Session()
+    session.handle('NEW 2')
+    monkeypatch.setattr(session.game, 'get_legal_moves', None)
+    with pytest.raises(TypeError):
+        session.handle('MOVES')
+
+
+def test_requests_do_not_extend_the_move_timeout():
+    async def play():
+        server = GameServer(move_timeout=0.3)
+        listener = await server.start_tcp(port=0)
+        port = listener.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        await reader.readline()
+        writer.write(b'NEW 2\n')
+        await reader.readline()
+        start = asyncio.get_running_loop().time()
+        # Asks for the board every 0.1 seconds without ever moving
+        for _ in range(20):
+            writer.write(b'BOARD\n')
+            response = (await reader.readline()).decode().strip()
+            if response.startswith('END'):
+                break
+            await asyncio.sleep(0.1)
+        seconds = asyncio.get_running_loop().time() - start
+        writer.close()
+        listener.close()
+        return response, seconds
+
+    response, seconds = asyncio.run(play())
+    assert response == 'END 2 timeout'
+    assert seconds < 1.0
@@ -0,0 +1,65 @@
+"""
+Tests of endgame tables against the moves of Game.
+"""
+import pytest
+
+from checkers import Game, Snapshot
+from tablebase import (DRAW, LOSS, WIN, Layout, Tablebase, decode, generate,
+                       signatures)
+
+FILLED_ROWS = 2
+MAX_PIECES = 3
+
+
+@pytest.fixture(scope='module')
+def tables(tmp_path_factory):
+    directory = str(tmp_path_factory.mktemp('tables'))
+    list(generate(directory, FILLED_ROWS, MAX_PIECES, workers=1))
+    tablebase = Tablebase(directory, FILLED_ROWS)
+    yield tablebase
+    tablebase.close()
+
+
+def position(layout, groups, side):
+    """
+    Returns a game in the position of groups of square numbers.
+    """
+    masks = []
+    for group in groups:
+        mask = 0
+        for number in group:
+            row, col = layout.squares[number]
+            mask |= 1 << row * layout.length + col
+        masks.append(mask)
+    men0, kings0, men1, kings1 = masks
+    return Game.from_snapshot(Snapshot(FILLED_ROWS, side, men0 | kings0,
+                                       men1 | kings1, kings0 | kings1))
+
+
+def one_ply_result(tables, game):
+    """
+    Returns the result and plies to the end of a position from the probed
+    results of the positions after each of its legal moves.
+    """
+    results = []
+    for move in game.get_legal_moves(game.current_player):
+        game.push(move)
+        results.append(tables.probe(game))
+        game.pop()
+    if not results:
+        return LOSS, 0
+    losses = [plies for result, plies in results if result == LOSS]
+    if losses:
+        return WIN, min(losses) + 1
+    if all(result == WIN for result, _ in results):
+        return LOSS, max(plies for _, plies in results) + 1
+    return DRAW, 0
+
+
+@pytest.mark.parametrize('signature', signatures(MAX_PIECES))
+def test_tables_agree_with_one_ply_of_game_moves(tables, signature):
+    layout = Layout(FILLED_ROWS)
+    for groups, side in layout.positions(signature):
+        game = position(layout, groups, side)
+        assert decode(tables.value(groups, side)) == tables.probe(game)
+        assert tables.probe(game) == one_ply_result(tables, game)
@@ -0,0 +1,25 @@
+"""
+Tests of tournament pairing.
+"""
+import random
+from collections import Counter
+
+import pytest
+
+from tournament import Outcome, swiss_round
+
+
+@pytest.mark.parametrize('players', [6, 7])
+def test_swiss_balances_colours_with_one_game_per_pairing(players):
+    rng = random.Random(players)
+    names = [f'p{number}' for number in range(players)]
+    outcomes, byes = [], []
+    for round_ in range(players - 1):
+        for pairing in swiss_round(names, outcomes, byes, round_, 1,
+                                   len(outcomes)):
+            outcomes.append(Outcome(*pairing, rng.choice([1, 2, None]), 40,
+                                    'no_moves', 0.1))
+    first = Counter(outcome.player1 for outcome in outcomes)
+    second = Counter(outcome.player2 for outcome in outcomes)
+    for name in names:
+        assert abs(first[name] - second[name]) <= 1
@@ -0,0 +1,546 @@
+"""
+Round-robin and Swiss tournaments between programmatic move policies.
+
+Every pairing plays a few games with the colours alternating, and the games
+run on a process pool as in simulate.py. A round-robin schedules every game
+up front; a Swiss tournament pairs players with similar scores one round at
+a time. Ratings are maximum-likelihood Elo (draws count as half a win) with
+a 95% confidence interval per player.
+
+Finished games are appended to a checkpoint file as JSON lines, after a
+header line describing the tournament. Pairings and seeds only depend on
+the tournament and the games already played, so a run started again with
+the same checkpoint plays only the games that are missing.
+
+Run as a script with entrants given as POLICY, POLICY:TIME_LIMIT for search
+or NAME=POLICY:
+
+    python tournament.py random greedy search:0.05 --system swiss \
+        --rounds 5 --workers 4 --checkpoint run.jsonl
+"""
+import argparse
+from collections import namedtuple
+from itertools import chain
+import json
+import math
+import multiprocessing
+import os
+import time
+
+from book import OpeningBook
+from simulate import POLICIES, SearchPolicy, play_game
+from tablebase import Tablebase
+
+ROUND_ROBIN = 'round-robin'
+SWISS = 'swiss'
+SYSTEMS = (ROUND_ROBIN, SWISS)
+
+# Rating of a player who scores evenly against the field
+BASE_ELO = 1500.0
+# Virtual draws each player is given against the field, which keeps the
+# ratings of players who won or lost every game finite
+PRIOR_DRAWS = 1.0
+# Pairings tried when looking for a Swiss round without rematches
+SWISS_SEARCH_LIMIT = 10000
+# Standard normal quantile of a 95% confidence interval
+Z_95 = 1.959964
+
+# One scheduled game; player1 moves first
+Pairing = namedtuple('Pairing', ['game_id', 'round', 'player1', 'player2'])
+# One finished game; winner is 1 or 2, or None for a draw
+Outcome = namedtuple('Outcome', ['game_id', 'round', 'player1', 'player2',
+                                 'winner', 'length', 'reason', 'seconds'])
+
+# The policies of the tournament in a worker process, by entrant name
+_entrants = None
+
+
+def _init_worker(entrants):
+    """
+    Stores the entrants in a worker process, so tasks only carry names.
+    """
+    global _entrants
+    _entrants = entrants
+
+
+def _play_task(task):
+    """
+    Plays one scheduled game in a worker process.
+
+    Parameters:
+        task (tuple): The pairing, board size, move limit and seed
+
+    Returns:
+        Outcome: The result of the game
+    """
+    pairing, filled_rows, max_moves, seed = task
+    result = play_game(_entrants[pairing.player1], _entrants[pairing.player2],
+                       filled_rows, max_moves, pairing.game_id, seed)
+    return Outcome(pairing.game_id, pairing.round, pairing.player1,
+                   pairing.player2, result.winner, result.length,
+                   result.reason, result.seconds)
+
+
+def elo_ratings(outcomes, names):
+    """
+    Returns the maximum-likelihood Elo ratings of players from their games.
+
+    Parameters:
+        outcomes ([Outcome]): The finished games
+        names ([str]): Every player, including those without games
+
+    Returns:
+        {str: (float, float)}: The rating of each player and the half width
+        of its 95% confidence interval, which is infinite without games
+    """
+    games = {name: {} for name in names}
+    points = {name: PRIOR_DRAWS / 2 for name in names}
+    for outcome in outcomes:
+        a, b = outcome.player1, outcome.player2
+        games[a][b] = games[a].get(b, 0) + 1
+        games[b][a] = games[b].get(a, 0) + 1
+        if outcome.winner is None:
+            points[a] += 0.5
+            points[b] += 0.5
+        else:
+            points[a if outcome.winner == 1 else b] += 1
+    # Minorization-maximization of the Bradley-Terry model, where the prior
+    # draws are played against a virtual player of strength 1
+    strength = {name: 1.0 for name in names}
+    for _ in range(1000):
+        change = 0.0
+        for name in names:
+            total = PRIOR_DRAWS / (strength[name] + 1.0)
+            for other, count in games[name].items():
+                total += count / (strength[name] + strength[other])
+            value = points[name] / total
+            change = max(change, abs(math.log(value / strength[name])))
+            strength[name] = value
+        if change < 1e-10:
+            break
+    scale = 400 / math.log(10)
+    rv = {}
+    for name in names:
+        information = 0.0
+        for other, count in games[name].items():
+            p = strength[name] / (strength[name] + strength[other])
+            information += count * p * (1 - p)
+        if information:
+            error = Z_95 * scale / math.sqrt(information)
+        else:
+            error = math.inf
+        rv[name] = (BASE_ELO + scale * math.log(strength[name]), error)
+    return rv
+
+
+def round_robin_round(names, round_, games_per_pairing, first_id):
+    """
+    Returns the games of one cycle of a round-robin, in which every player
+    meets every other one.
+
+    Parameters:
+        names ([str]): The players
+        round_ (int): The number of the cycle
+        games_per_pairing (int): The games of each pair, alternating colours
+        first_id (int): The game number of the first game
+
+    Returns:
+        [Pairing]: The scheduled games
+    """
+    rv = []
+    for i, a in enumerate(names):
+        for b in names[i + 1:]:
+            for game in range(games_per_pairing):
+                # Colours also alternate from one cycle to the next
+                first, second = (a, b) if (game + round_) % 2 == 0 else (b, a)
+                rv.append(Pairing(first_id + len(rv), round_, first, second))
+    return rv
+
+
+def swiss_round(names, outcomes, byes, round_, games_per_pairing, first_id):
+    """
+    Returns the games of one Swiss round: players are ranked by points and
+    each is paired with the next ranked player they have not met yet, if
+    any. With an odd number of players, the lowest ranked player without a
+    bye sits the round out. Of each pair, the player who has had the first
+    move less often so far moves first.
+
+    Parameters:
+        names ([str]): The players
+        outcomes ([Outcome]): The games of the previous rounds
+        byes ([str]): The players who sat out previous rounds, updated
+        with the player sitting out this one
+        round_ (int): The number of the round
+        games_per_pairing (int): The games of each pair, alternating colours
+        first_id (int): The game number of the first game
+
+    Returns:
+        [Pairing]: The scheduled games
+    """
+    table = standings(names, outcomes, byes, games_per_pairing)
+    ranked = [row['name'] for row in table]
+    if len(ranked) % 2:
+        bye = next((name for name in reversed(ranked) if name not in byes),
+                   ranked[-1])
+        byes.append(bye)
+        ranked.remove(bye)
+    met = set()
+    for outcome in outcomes:
+        met.add((outcome.player1, outcome.player2))
+        met.add((outcome.player2, outcome.player1))
+    pairs = _pair_unmet(ranked, met, [SWISS_SEARCH_LIMIT])
+    if pairs is None:
+        # Rematches cannot be avoided, or finding out takes too long
+        pairs = []
+        while ranked:
+            a = ranked.pop(0)
+            b = next((name for name in ranked if (a, name) not in met),
+                     ranked[0])
+            ranked.remove(b)
+            pairs.append((a, b))
+    # Games each player has had the first move in, minus the other games
+    balance = dict.fromkeys(names, 0)
+    for outcome in outcomes:
+        balance[outcome.player1] += 1
+        balance[outcome.player2] -= 1
+    rv = []
+    for a, b in pairs:
+        # The player who has had the first move less often gets it, and
+        # ties alternate from round to round
+        if balance[a] > balance[b] \
+                or (balance[a] == balance[b] and round_ % 2):
+            a, b = b, a
+        for game in range(games_per_pairing):
+            first, second = (a, b) if game % 2 == 0 else (b, a)
+            rv.append(Pairing(first_id + len(rv), round_, first, second))
+    return rv
+
+
+def _pair_unmet(ranked, met, budget):
+    """
+    Returns pairs of ranked players who have not met, each player as close
+    in rank to its opponent as possible, by backtracking.
+
+    Parameters:
+        ranked ([str]): An even number of players, best first
+        met ({(str, str)}): The pairs of players who have met
+        budget ([int]): The number of pairs still allowed to be tried,
+        shared by the recursive calls
+
+    Returns:
+        [(str, str)]: The pairs, or None if there are none or the budget
+        ran out
+    """
+    if not ranked:
+        return []
+    a = ranked[0]
+    for b in ranked[1:]:
+        if (a, b) in met:
+            continue
+        budget[0] -= 1
+        if budget[0] < 0:
+            return None
+        rest = _pair_unmet([name for name in ranked[1:] if name != b], met,
+                           budget)
+        if rest is not None:
+            return [(a, b)] + rest
+    return None
+
+
+def standings(names, outcomes, byes=(), games_per_pairing=2):
+    """
+    Returns the players ranked by points, then by rating.
+
+    Parameters:
+        names ([str]): The players
+        outcomes ([Outcome]): The finished games
+        byes ([str]): The players who sat out a Swiss round, each scoring a
+        win for every game of a pairing
+        games_per_pairing (int): The points of a bye
+
+    Returns:
+        [dict]: For each player its games, wins, losses, draws, points,
+        score fraction, Elo and the bounds of its confidence interval
+    """
+    rows = {name: {'name': name, 'games': 0, 'wins': 0, 'losses': 0,
+                   'draws': 0, 'points': 0.0} for name in names}
+    for outcome in outcomes:
+        for number, name in ((1, outcome.player1), (2, outcome.player2)):
+            row = rows[name]
+            row['games'] += 1
+            if outcome.winner is None:
+                row['draws'] += 1
+                row['points'] += 0.5
+            elif outcome.winner == number:
+                row['wins'] += 1
+                row['points'] += 1
+            else:
+                row['losses'] += 1
+    for name in byes:
+        rows[name]['points'] += games_per_pairing
+    ratings = elo_ratings(outcomes, names)
+    for name, row in rows.items():
+        elo, error = ratings[name]
+        row['score'] = (row['wins'] + row['draws'] / 2) / row['games'] \
+            if row['games'] else 0.0
+        row['elo'] = elo
+        row['elo_low'] = elo - error if error != math.inf else None
+        row['elo_high'] = elo + error if error != math.inf else None
+    return sorted(rows.values(),
+                  key=lambda row: (-row['points'], -row['elo'], row['name']))
+
+
+class Tournament:
+    """
+    A class that represents a tournament, its schedule and its checkpoint.
+    """
+    def __init__(self, entrants, system=ROUND_ROBIN, rounds=1,
+                 games_per_pairing=2, filled_rows=3, max_moves=200, seed=0,
+                 checkpoint=None):
+        """
+        Initializes a tournament, resuming from its checkpoint if the file
+        exists.
+
+        Parameters:
+            entrants ({str: policy}): The picklable policy of each player, by
+            name, as accepted by simulate.play_game
+            system (str): ROUND_ROBIN or SWISS
+            rounds (int): The number of round-robin cycles or Swiss rounds
+            games_per_pairing (int): The games each pair plays per round,
+            alternating colours
+            filled_rows (int): The number of rows with pieces for each player
+            max_moves (int): The number of moves after which a game is drawn
+            seed (int): The seed every game's seed is derived from
+            checkpoint (str): The path of the JSON lines file finished games
+            are appended to, or None to keep them in memory only
+        """
+        if system not in SYSTEMS:
+            raise ValueError(f'Unknown system {system!r}')
+        if len(entrants) < 2:
+            raise ValueError('A tournament needs at least 2 entrants')
+        self.entrants = entrants
+        self.names = sorted(entrants)
+        self.system = system
+        self.rounds = rounds
+        self.games_per_pairing = games_per_pairing
+        self.filled_rows = filled_rows
+        self.max_moves = max_moves
+        self.seed = seed
+        self.checkpoint = checkpoint
+        self.outcomes = {}
+        self.byes = []
+        # Bytes of the checkpoint holding complete lines
+        self._size = 0
+        if checkpoint is not None and os.path.exists(checkpoint):
+            self._resume()
+
+    def settings(self):
+        """
+        Returns what identifies the tournament in its checkpoint.
+
+        Parameters: None
+
+        Returns:
+            dict: The entrant names, system, rounds, games per pairing,
+            board size, move limit and seed
+        """
+        return {'entrants': self.names, 'system': self.system,
+                'rounds': self.rounds,
+                'games_per_pairing': self.games_per_pairing,
+                'filled_rows': self.filled_rows,
+                'max_moves': self.max_moves, 'seed': self.seed}
+
+    def _resume(self):
+        """
+        Reads the games of the checkpoint, ignoring a last line cut short by
+        an interruption.
+        """
+        with open(self.checkpoint, 'rb') as checkpoint:
+            data = checkpoint.read()
+        # New games are appended after the last complete line
+        self._size = data.rfind(b'\n') + 1
+        lines = data[:self._size].decode().splitlines()
+        if not lines:
+            return
+        if json.loads(lines[0]).get('tournament') != self.settings():
+            raise ValueError(f'{self.checkpoint} is the checkpoint of '
+                             'another tournament')
+        for line in lines[1:]:
+            try:
+                outcome = Outcome(**json.loads(line))
+            except (ValueError, TypeError):
+                continue
+            self.outcomes[outcome.game_id] = outcome
+
+    def _save(self, outcome, stream):
+        """
+        Appends a finished game to the checkpoint.
+        """
+        stream.write(json.dumps(outcome._asdict()).encode() + b'\n')
+        stream.flush()
+
+    def _rounds(self):
+        """
+        Yields the games of each round, Swiss rounds once the games of the
+        previous rounds have finished.
+
+        Yields:
+            [Pairing]: The games of one round
+        """
+        first_id = 0
+        self.byes = []
+        for round_ in range(self.rounds):
+            if self.system == ROUND_ROBIN:
+                pairings = round_robin_round(self.names, round_,
+                                             self.games_per_pairing, first_id)
+            else:
+                previous = [outcome for outcome in self.outcomes.values()
+                            if outcome.round < round_]
+                pairings = swiss_round(self.names, previous, self.byes, round_,
+                                       self.games_per_pairing, first_id)
+            first_id += len(pairings)
+            yield pairings
+
+    def run(self, workers=None, chunksize=1):
+        """
+        Plays the games missing from the checkpoint on a process pool.
+
+        Parameters:
+            workers (int): The number of processes, one per core by default
+            chunksize (int): The number of games handed to a worker at once
+
+        Yields:
+            Outcome: The result of each game played, in the order they
+            finish
+        """
+        stream = None
+        if self.checkpoint is not None:
+            stream = open(self.checkpoint, 'ab')
+            stream.truncate(self._size)
+            if self._size == 0:
+                stream.write(json.dumps({'tournament': self.settings()})
+                             .encode() + b'\n')
+                stream.flush()
+        try:
+            with multiprocessing.Pool(workers, _init_worker,
+                                      (self.entrants,)) as pool:
+                batches = self._rounds()
+                if self.system == ROUND_ROBIN:
+                    # The cycles of a round-robin do not depend on each
+                    # other, so they are played as one batch
+                    batches = [list(chain.from_iterable(batches))]
+                for pairings in batches:
+                    tasks = [(pairing, self.filled_rows, self.max_moves,
+                              (self.seed << 32) + pairing.game_id)
+                             for pairing in pairings
+                             if pairing.game_id not in self.outcomes]
+                    for outcome in pool.imap_unordered(_play_task, tasks,
+                                                       chunksize):
+                        self.outcomes[outcome.game_id] = outcome
+                        if stream is not None:
+                            self._save(outcome, stream)
+                        yield outcome
+        finally:
+            if stream is not None:
+                self._size = stream.tell()
+                stream.close()
+
+    def report(self, played=(), seconds=0.0):
+        """
+        Returns the standings and the throughput of this run.
+
+        Parameters:
+            played ([Outcome]): The games played by this run, excluding
+            those read from the checkpoint
+            seconds (float): The wall-clock duration of this run
+
+        Returns:
+            dict: The settings, the standings, and the games, games/sec and
+            moves/sec of this run
+        """
+        outcomes = sorted(self.outcomes.values(),
+                          key=lambda outcome: outcome.game_id)
+        moves = sum(outcome.length for outcome in played)
+        return {
+            'tournament': self.settings(),
+            'games': len(outcomes),
+            'standings': standings(self.names, outcomes, self.byes,
+                                   self.games_per_pairing),
+            'played': len(played),
+            'seconds': seconds,
+            'games_per_sec': len(played) / seconds if seconds else 0.0,
+            'moves_per_sec': moves / seconds if seconds else 0.0,
+        }
+
+
+def make_policy(spec, book=None, tablebase=None):
+    """
+    Returns the policy of an entrant spec.
+
+    Parameters:
+        spec (str): A name of simulate.POLICIES, with the time limit per
+        move after a colon for search
+        book (OpeningBook): The book of search policies
+        tablebase (Tablebase): The endgame tables of search policies
+
+    Returns:
+        The policy
+    """
+    kind, _, limit = spec.partition(':')
+    if kind not in POLICIES:
+        raise ValueError(f'Unknown policy {kind!r}')
+    if POLICIES[kind] is SearchPolicy:
+        options = {'book': book, 'tablebase': tablebase}
+        if limit:
+            options['time_limit'] = float(limit)
+        return SearchPolicy(**options)
+    return POLICIES[kind]()
+
+
+def main():
+    """
+    Streams the result of every game played as JSON lines, followed by the
+    report of the tournament.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('entrants', nargs='+')
+    parser.add_argument('--system', choices=SYSTEMS, default=ROUND_ROBIN)
+    parser.add_argument('--rounds', type=int, default=1)
+    parser.add_argument('--games-per-pairing', type=int, default=2)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--filled-rows', type=int, default=3)
+    parser.add_argument('--max-moves', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--checkpoint', default=None,
+                        help='JSON lines file the run resumes from')
+    parser.add_argument('--book', default=None,
+                        help='opening book used by search policies')
+    parser.add_argument('--tablebase', default=None,
+                        help='directory of endgame tables for search policies')
+    args = parser.parse_args()
+    book = OpeningBook(args.book) if args.book else None
+    if args.tablebase:
+        tablebase = Tablebase(args.tablebase, args.filled_rows)
+    else:
+        tablebase = None
+    entrants = {}
+    for entrant in args.entrants:
+        name, _, spec = entrant.rpartition('=')
+        name = name or spec
+        if name in entrants:
+            parser.error(f'duplicate entrant {name!r}, name it with NAME=')
+        entrants[name] = make_policy(spec, book, tablebase)
+    tournament = Tournament(entrants, args.system, args.rounds,
+                            args.games_per_pairing, args.filled_rows,
+                            args.max_moves, args.seed, args.checkpoint)
+    start = time.perf_counter()
+    played = []
+    for outcome in tournament.run(args.workers):
+        played.append(outcome)
+        print(json.dumps(outcome._asdict()), flush=True)
+    print(json.dumps({'report': tournament.report(
+        played, time.perf_counter() - start)}))
+
+
+if __name__ == '__main__':
+    main()
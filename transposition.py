@@ -0,0 +1,271 @@
+"""
+Fixed-size transposition tables keyed by Zobrist position keys.
+"""
+from collections import namedtuple
+from multiprocessing import shared_memory
+import struct
+
+from checkers import Move
+
+# Bound types of a stored score
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+Entry = namedtuple('Entry', ['key', 'depth', 'score', 'flag', 'move'])
+
+
+class TranspositionTable:
+    """
+    A class that represents a two-tier transposition table. Each slot has a 
+    depth-preferred entry, which is only replaced by a search at least as 
+    deep, and an always-replace entry that catches everything else.
+    """
+    def __init__(self, size=1 << 16):
+        """
+        Initializes an empty table.
+
+        Parameters:
+            size (int): The number of slots in each tier
+        """
+        self.size = size
+        self.deep = [None] * size
+        self.recent = [None] * size
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    def probe(self, key):
+        """
+        Returns the stored entry of a position.
+
+        Parameters:
+            key (int): The Zobrist key of the position
+
+        Returns:
+            Entry: The stored entry, or None if the position is not stored
+        """
+        slot = key % self.size
+        for entry in (self.deep[slot], self.recent[slot]):
+            if entry is not None and entry.key == key:
+                self.hits += 1
+                return entry
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, score, flag, move=None):
+        """
+        Stores the result of a search.
+
+        Parameters:
+            key (int): The Zobrist key of the position
+            depth (int): The remaining depth the position was searched to
+            score (int): The score of the position
+            flag (int): EXACT, LOWER or UPPER bound
+            move (Move): The best move found, if any
+
+        Returns: None
+        """
+        slot = key % self.size
+        entry = Entry(key, depth, score, flag, move)
+        self.stores += 1
+        deep = self.deep[slot]
+        if deep is None or deep.key == key or depth >= deep.depth:
+            if deep is not None and deep.key != key:
+                self.overwrites += 1
+            self.deep[slot] = entry
+            return
+        recent = self.recent[slot]
+        if recent is not None and recent.key != key:
+            self.overwrites += 1
+        self.recent[slot] = entry
+
+    def clear(self):
+        """
+        Empties the table and resets its statistics.
+
+        Parameters: None
+
+        Returns: None
+        """
+        self.__init__(self.size)
+
+    def stats(self):
+        """
+        Returns the usage statistics of the table.
+
+        Parameters: None
+
+        Returns:
+            dict: The probe hits and misses, stores, overwrites and hit rate
+        """
+        probes = self.hits + self.misses
+        return {
+            'size': self.size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'stores': self.stores,
+            'overwrites': self.overwrites,
+            'hit_rate': self.hits / probes if probes else 0.0,
+        }
+
+
+class SharedTranspositionTable:
+    """
+    A class that represents a depth-preferred transposition table held in
+    multiprocessing shared memory, so several search processes can read and
+    write it at once. Each slot is two 64-bit words: the packed entry data
+    and the position key XORed with that data. A slot torn by two processes
+    writing at the same time no longer matches its key and reads as a miss,
+    so no locking is needed.
+
+    Stored moves keep only their first and last squares, which is enough to
+    order moves but not to replay them.
+    """
+    SLOT = struct.Struct('<QQ')
+
+    def __init__(self, size=1 << 16, name=None):
+        """
+        Creates a new table, or attaches to an existing one by name.
+
+        Parameters:
+            size (int): The number of slots
+            name (str): The shared memory block of an existing table
+        """
+        self.size = size
+        self.owner = name is None
+        if self.owner:
+            self.memory = shared_memory.SharedMemory(
+                create=True, size=size * self.SLOT.size)
+            self.memory.buf[:size * self.SLOT.size] = \
+                bytes(size * self.SLOT.size)
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+        self.name = self.memory.name
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    def __getstate__(self):
+        """
+        Pickles the table as the name of its shared memory block.
+        """
+        return {'size': self.size, 'name': self.name}
+
+    def __setstate__(self, state):
+        """
+        Attaches to the shared memory block of a pickled table.
+        """
+        self.__init__(state['size'], state['name'])
+
+    def _pack(self, depth, score, flag, move):
+        """
+        Packs the data of an entry into 63 bits: the score offset into 24
+        bits, the depth into 8, the flag into 2, and the first and last
+        squares of the move into 7 bits per coordinate behind a presence bit.
+        """
+        data = (score + (1 << 23)) & 0xFFFFFF
+        data |= (max(0, min(depth, 255))) << 24
+        data |= flag << 32
+        if move is not None:
+            (r0, c0), (r1, c1) = move.path[0], move.path[-1]
+            data |= 1 << 34
+            data |= (r0 | c0 << 7 | r1 << 14 | c1 << 21) << 35
+        return data
+
+    def _unpack(self, key, data):
+        """
+        Unpacks the data of an entry.
+        """
+        score = (data & 0xFFFFFF) - (1 << 23)
+        depth = data >> 24 & 0xFF
+        flag = data >> 32 & 0x3
+        move = None
+        if data >> 34 & 1:
+            squares = data >> 35
+            start = (squares & 0x7F, squares >> 7 & 0x7F)
+            end = (squares >> 14 & 0x7F, squares >> 21 & 0x7F)
+            move = Move((start, end), (), False)
+        return Entry(key, depth, score, flag, move)
+
+    def probe(self, key):
+        """
+        Returns the stored entry of a position.
+
+        Parameters:
+            key (int): The Zobrist key of the position
+
+        Returns:
+            Entry: The stored entry, or None if the position is not stored
+        """
+        offset = key % self.size * self.SLOT.size
+        check, data = self.SLOT.unpack_from(self.memory.buf, offset)
+        if check ^ data == key and (check or data):
+            self.hits += 1
+            return self._unpack(key, data)
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, score, flag, move=None):
+        """
+        Stores the result of a search unless a deeper search of another
+        position holds the slot.
+
+        Parameters:
+            key (int): The Zobrist key of the position
+            depth (int): The remaining depth the position was searched to
+            score (int): The score of the position
+            flag (int): EXACT, LOWER or UPPER bound
+            move (Move): The best move found, if any
+
+        Returns: None
+        """
+        offset = key % self.size * self.SLOT.size
+        check, data = self.SLOT.unpack_from(self.memory.buf, offset)
+        if check or data:
+            stored_key = check ^ data
+            if stored_key != key:
+                if depth < (data >> 24 & 0xFF):
+                    return
+                self.overwrites += 1
+        data = self._pack(depth, score, flag, move)
+        self.SLOT.pack_into(self.memory.buf, offset, key ^ data, data)
+        self.stores += 1
+
+    def clear(self):
+        """
+        Empties the table and resets this process's statistics.
+
+        Parameters: None
+
+        Returns: None
+        """
+        self.memory.buf[:self.size * self.SLOT.size] = \
+            bytes(self.size * self.SLOT.size)
+        self.hits = self.misses = self.stores = self.overwrites = 0
+
+    def stats(self):
+        """
+        Returns the usage statistics of this process.
+
+        Parameters: None
+
+        Returns:
+            dict: The probe hits and misses, stores, overwrites and hit rate
+        """
+        return TranspositionTable.stats(self)
+
+    def close(self):
+        """
+        Detaches from the shared memory, and frees it if this process
+        created the table.
+
+        Parameters: None
+
+        Returns: None
+        """
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
@@ -0,0 +1,34 @@
+"""
+Zobrist keys for checkers positions.
+
+Every (side, king, square) combination gets a fixed random 64-bit number and
+a position's key is the XOR of the numbers of its pieces, so a move only has
+to XOR out the old squares and XOR in the new ones. The numbers come from a
+seeded generator, which makes keys identical across processes and runs.
+"""
+import random
+
+SEED = 20230307
+# XORed into the key when the second player is to move
+SIDE_KEY = random.Random(SEED).getrandbits(64)
+
+_tables = {}
+
+
+def piece_keys(length):
+    """
+    Returns the Zobrist numbers of a board size, indexed as
+    [side][is_king][row * length + col].
+
+    Parameters:
+        length (int): The number of rows and columns on the board
+
+    Returns:
+        [[[int]]]: The 64-bit numbers of every piece on every square
+    """
+    if length not in _tables:
+        rng = random.Random(SEED + length)
+        _tables[length] = [[[rng.getrandbits(64) 
+                             for _ in range(length * length)]
+                            for _ in range(2)] for _ in range(2)]
+    return _tables[length]